@@ -0,0 +1,104 @@
+"""
+Import Time Benchmark
+
+Script that measures how long the headless data path (everything except the
+pygame interface) takes to import, using python's -X importtime option, and
+fails if it goes over a budget or imports one of the heavy libraries that
+should only be loaded when they are used.
+
+Run from the project folder:
+    python benchmarks/import_time.py --budget-ms 300
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# modules that make up the headless data path
+HEADLESS_MODULES = ['modules.read_data', 'modules.data_cache', 'modules.regression',
+                    'modules.model_table', 'modules.selection', 'report']
+
+# libraries the headless data path must not import until they are used
+LAZY_LIBRARIES = ['pygame', 'plotly', 'pandas', 'sklearn']
+
+# the project folder, which the modules are imported from
+PROJECT_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_imports(modules: List[str]) -> Dict[str, Tuple[int, int]]:
+    """ Return a mapping of the name of every module imported when importing <modules>
+    in a new python process to its (self, cumulative) import time in microseconds.
+
+    >>> times = measure_imports(['modules.read_data'])
+    >>> 'numpy' in times and 'modules.read_data' in times
+    True
+    """
+    command = [sys.executable, '-X', 'importtime', '-c',
+               'import ' + ', '.join(modules)]
+    process = subprocess.run(command, cwd=PROJECT_FOLDER, capture_output=True, text=True,
+                             check=True)
+
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_time, cumulative_time, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_time), int(cumulative_time))
+
+    return times
+
+
+def total_time(times: Dict[str, Tuple[int, int]]) -> int:
+    """Return the total import time in microseconds of the measured modules.
+
+    >>> total_time({'a': (10, 30), 'b': (20, 20)})
+    30
+    """
+    return sum(self_time for self_time, _ in times.values())
+
+
+def lazy_libraries_imported(times: Dict[str, Tuple[int, int]]) -> List[str]:
+    """Return the libraries in LAZY_LIBRARIES that were imported.
+
+    >>> lazy_libraries_imported({'numpy': (1, 1), 'sklearn.base': (1, 1)})
+    ['sklearn']
+    """
+    return [library for library in LAZY_LIBRARIES
+            if any(name == library or name.startswith(library + '.') for name in times)]
+
+
+def run(budget_ms: float, repeats: int, top: int) -> bool:
+    """ Measure the import time of HEADLESS_MODULES <repeats> times, print the best
+    total and the slowest imports, and return whether the import stayed under
+    <budget_ms> milliseconds without importing any of LAZY_LIBRARIES.
+    """
+    measurements = [measure_imports(HEADLESS_MODULES) for _ in range(repeats)]
+    best = min(measurements, key=total_time)
+    best_ms = total_time(best) / 1000
+
+    print(f'headless import time: {best_ms:.1f} ms (budget {budget_ms:.1f} ms)')
+    print('slowest imports (cumulative ms):')
+    top_level = [(cumulative, name) for name, (_, cumulative) in best.items()
+                 if '.' not in name or name in HEADLESS_MODULES]
+    for cumulative, name in sorted(top_level, reverse=True)[:top]:
+        print(f'  {cumulative / 1000:8.1f}  {name}')
+
+    imported = lazy_libraries_imported(best)
+    if imported:
+        print('imported libraries that should load lazily: ' + ', '.join(imported))
+
+    return best_ms <= budget_ms and not imported
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check the import time of the headless '
+                                                 'data path.')
+    parser.add_argument('--budget-ms', type=float, default=300.0)
+    parser.add_argument('--repeats', type=int, default=3,
+                        help='number of measurements; the fastest one is used')
+    parser.add_argument('--top', type=int, default=10,
+                        help='number of slowest imports to show')
+    args = parser.parse_args()
+
+    sys.exit(0 if run(args.budget_ms, args.repeats, args.top) else 1)
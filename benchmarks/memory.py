@@ -0,0 +1,142 @@
+"""
+Memory Benchmark
+
+Script that measures, with tracemalloc, how much memory the greenhouse gas and bird
+data take at the scale of the full dataset (every row of 'GHG.csv'), comparing the
+slotted GreenhouseGas rows and the array-backed Region and Bird classes with plain
+dataclass rows and the dicts of lists the classes used to copy the data into.
+
+Run from the project folder:
+    python benchmarks/memory.py
+"""
+import argparse
+import csv
+import dataclasses
+import gc
+import os
+import sys
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+# the project folder, which the modules are imported from
+PROJECT_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_FOLDER)
+
+from modules.read_data import (GAS_NAMES, Bird, GreenhouseGas, Region,  # noqa: E402
+                               filter_bird_data, read_bird_data, read_ghg_store)
+
+# the same fields as GreenhouseGas, as a regular dataclass with a __dict__ per row
+PlainGreenhouseGas = dataclasses.make_dataclass(
+    'PlainGreenhouseGas', [(field.name, field.type) for field in
+                           dataclasses.fields(GreenhouseGas)])
+
+
+def measure(build: Callable[[], Any]) -> Tuple[int, int]:
+    """ Return the number of bytes still allocated for the result of build once it
+    returns, and the most bytes that were allocated while it ran.
+
+    >>> retained, peak = measure(lambda: bytearray(10 ** 6))
+    >>> retained >= 10 ** 6 and peak >= retained
+    True
+    """
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return (retained, peak)
+
+
+def read_rows(file_path: str) -> List[List[str]]:
+    """Return the data rows of the greenhouse gas csv file at <file_path>, as strings."""
+    with open(file_path) as csvfile:
+        reader = csv.reader(csvfile)
+        next(reader)
+        return list(reader)
+
+
+def to_records(rows: List[List[str]], record_type: type) -> Dict[Tuple[str, int], list]:
+    """ Return a mapping of each (region, CategoryID) to its rows as instances of
+    record_type, which has the fields of GreenhouseGas.
+
+    >>> rows = [['1990', 'Yukon', '0', 'TOTAL', 'TRUE', '1', '2', '0', '3', '0', '4', '5',
+    ...          '6', '7', '8', 'kt']]
+    >>> to_records(rows, GreenhouseGas)[('Yukon', 0)][0].total
+    8.0
+    """
+    records = {}
+    for row in rows:
+        values = [float('nan') if row[column] == 'x' else float(row[column])
+                  for column in (5, 6, 8, 10, 11, 12, 13, 14)]
+        record = record_type(int(row[0]), row[1], *values)
+        records.setdefault((row[1], int(row[2])), []).append(record)
+    return records
+
+
+def plain_region(records: list) -> Tuple[Dict[int, List[float]], List[List[float]]]:
+    """ Return the data of a region as a dict mapping year to a list of the emissions
+    of each gas, and the lists of every gas copied out of it for every year.
+    """
+    dict_data = {record.year: [getattr(record, gas) for gas in GAS_NAMES]
+                 for record in records}
+    years = sorted(dict_data)
+    return (dict_data, [[dict_data[year][i] for year in years]
+                        for i in range(len(GAS_NAMES))])
+
+
+def array_region(records: list) -> Region:
+    """Return the Region of records with every gas initialized."""
+    region = Region(records)
+    region.initialize_lists(records[0].year, records[-1].year)
+    return region
+
+
+def run(file_path: str) -> List[Tuple[str, int, int]]:
+    """ Measure the data structures at the scale of the csv file at <file_path>, print
+    a table of them and return its rows of (name, retained bytes, peak bytes).
+    """
+    rows = read_rows(file_path)
+    plain_records = to_records(rows, PlainGreenhouseGas)
+    slotted_records = to_records(rows, GreenhouseGas)
+    store = read_ghg_store(file_path)
+    bird_data = read_bird_data()
+    bird_columns = [filter_bird_data(bird_data, bird) for bird in range(9)]
+
+    measurements = [
+        ('rows: plain dataclass', lambda: to_records(rows, PlainGreenhouseGas)),
+        ('rows: slotted GreenhouseGas', lambda: to_records(rows, GreenhouseGas)),
+        ('rows: GHGStore columns', lambda: read_ghg_store(file_path)),
+        ('regions: dicts of lists', lambda: [plain_region(records)
+                                             for records in plain_records.values()]),
+        ('regions: Region of rows', lambda: [array_region(records)
+                                             for records in slotted_records.values()]),
+        ('regions: Region of GHGStore', lambda: [Region(store, region, category)
+                                                 for region in store.region_names
+                                                 for category in store.category_names
+                                                 if store.has_series(region, category)]),
+        ('birds: dicts and lists', lambda: [(dict(column), list(column.values()))
+                                            for column in bird_columns]),
+        ('birds: Bird', lambda: [Bird(column) for column in bird_columns]),
+    ]
+
+    print(f'{len(rows)} rows, {len(slotted_records)} region and sector series')
+    print(f'{"":30}{"retained MB":>14}{"peak MB":>10}')
+    results = []
+    for name, build in measurements:
+        retained, peak = measure(build)
+        print(f'{name:30}{retained / 1e6:14.2f}{peak / 1e6:10.2f}')
+        results.append((name, retained, peak))
+
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure the memory used by the data '
+                                                 'structures at the scale of the dataset.')
+    parser.add_argument('--file', default=os.path.join(PROJECT_FOLDER, 'dataset', 'GHG.csv'),
+                        help='greenhouse gas csv file to measure with')
+    args = parser.parse_args()
+
+    os.chdir(PROJECT_FOLDER)
+    run(args.file)
@@ -0,0 +1,267 @@
+"""
+Benchmarks
+
+Script that times loading the datasets, building models, predicting and drawing
+frames of the interface (headless, with SDL's dummy video driver), writes the
+results to a JSON file, and can compare them with the results of an earlier run
+to catch slowdowns.
+
+Run from the project folder:
+    python benchmarks/run_benchmarks.py --output before.json
+    python benchmarks/run_benchmarks.py --output after.json --compare before.json
+
+The second command exits with status 1 if a benchmark got slower than the earlier
+run by more than the threshold (20% by default).
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+# the project folder, which the modules are imported from
+PROJECT_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_FOLDER)
+
+# the interface is drawn without opening a window
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+# a benchmark is set up by a function that returns the function to time and how many
+# times to call it for each measurement
+Benchmark = Callable[[], Tuple[Callable[[], object], int]]
+
+
+def time_function(function: Callable[[], object], number: int,
+                  repeats: int) -> Dict[str, float]:
+    """ Return the best and median time in seconds of one call of function, from
+    <repeats> measurements of <number> calls each.
+
+    >>> result = time_function(lambda: sum(range(100)), 10, 3)
+    >>> sorted(result), 0 < result['best'] <= result['median']
+    (['best', 'median', 'number', 'repeats'], True)
+    """
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        times.append((time.perf_counter() - start) / number)
+
+    return {'best': min(times), 'median': statistics.median(times), 'number': number,
+            'repeats': repeats}
+
+
+def compare_results(old: Dict[str, dict], new: Dict[str, dict],
+                    threshold: float) -> List[Tuple[str, float, bool]]:
+    """ Return, for each benchmark in both old and new, its name, the ratio of its new
+    best time to its old best time, and whether it got slower by more than
+    <threshold> (as a fraction of the old time).
+
+    >>> compare_results({'a': {'best': 1.0}, 'b': {'best': 1.0}},
+    ...                 {'a': {'best': 1.5}, 'b': {'best': 0.9}, 'c': {'best': 1.0}}, 0.2)
+    [('a', 1.5, True), ('b', 0.9, False)]
+    """
+    return [(name, new[name]['best'] / old[name]['best'],
+             new[name]['best'] > old[name]['best'] * (1 + threshold))
+            for name in old if name in new]
+
+
+def get_benchmarks() -> Dict[str, Benchmark]:
+    """Return a mapping of the name of each benchmark to the function that sets it up."""
+    import numpy as np
+    from modules.data_cache import load_bird_data, load_ghg_store
+    from modules.read_data import read_bird_data, read_ghg_data, read_ghg_store
+    from modules.selection import Selection
+    from modules.model_table import ModelTable, fit_model_table, fit_rolling_table
+
+    def datasets() -> tuple:
+        return (load_ghg_store(), load_bird_data())
+
+    def selection(ghg: str, model_table: Optional[ModelTable] = None) -> Selection:
+        new_selection = Selection()
+        new_selection.use_model_table(model_table)
+        new_selection.change_region('Alberta')
+        new_selection.change_bird('Forest Birds')
+        new_selection.change_ghg(ghg)
+        return new_selection
+
+    def get_model(ghg: str, table: bool) -> Benchmark:
+        def setup() -> Tuple[Callable[[], object], int]:
+            ghg_data, bird_data = datasets()
+            model_table = fit_model_table(ghg_data, bird_data) if table else None
+            # every call uses a new selection with an empty cache, so the model is built
+            return (lambda: selection(ghg, model_table).get_model(ghg_data, bird_data), 50)
+        return setup
+
+    def predict_y() -> Tuple[Callable[[], object], int]:
+        model = selection('CO2').get_model(*datasets())
+        return (lambda: [model.predict_y(amount) for amount in range(1000)], 20)
+
+    def predict_value() -> Tuple[Callable[[], object], int]:
+        model = selection('Multiple Regression').get_model(*datasets())
+        return (lambda: [model.predict_value(amount, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0)
+                         for amount in range(1000)], 20)
+
+    def predict_many(ghg: str) -> Tuple[Callable[[], object], int]:
+        model = selection(ghg).get_model(*datasets())
+        amounts = np.linspace(0.0, 1000.0, 100000)
+        if ghg == 'Multiple Regression':
+            amounts = np.column_stack([amounts] + [np.ones(len(amounts))] * 6)
+        return (lambda: model.predict_many(amounts), 20)
+
+    def bootstrap() -> Tuple[Callable[[], object], int]:
+        model = selection('Multiple Regression').get_model(*datasets())
+        return (lambda: model.get_confidence_intervals(resamples=1000, seed=0), 5)
+
+    def rolling() -> Tuple[Callable[[], object], int]:
+        ghg_data, bird_data = datasets()
+        regions = fit_model_table(ghg_data, bird_data).regions
+        return (lambda: fit_rolling_table(ghg_data, bird_data, regions, 10), 10)
+
+    def regularization_path() -> Tuple[Callable[[], object], int]:
+        model = selection('Multiple Regression').get_model(*datasets())
+        penalties = np.geomspace(10.0, 0.01, 50)
+        return (lambda: model.get_path(penalties, l1_ratio=0.5), 20)
+
+    def choose_penalty() -> Tuple[Callable[[], object], int]:
+        model = selection('Multiple Regression').get_model(*datasets())
+        return (lambda: model.choose_penalty(l1_ratio=0.5), 5)
+
+    def read_all_rows() -> Tuple[Callable[[], object], int]:
+        row_count = len(read_ghg_store())
+        return (lambda: read_ghg_data(row_count), 3)
+
+    return {
+        'read_ghg_data_398': lambda: (lambda: read_ghg_data(398), 20),
+        'read_ghg_data_all': read_all_rows,
+        'read_ghg_store': lambda: (read_ghg_store, 3),
+        'load_ghg_store_cached': lambda: (load_ghg_store, 20),
+        'read_bird_data': lambda: (read_bird_data, 200),
+        'fit_model_table': lambda: (lambda: fit_model_table(*datasets()), 10),
+        'fit_rolling_table_10_years': rolling,
+        'get_model_single': get_model('CO2', False),
+        'get_model_single_table': get_model('CO2', True),
+        'get_model_multiple': get_model('Multiple Regression', False),
+        'predict_y_1000': predict_y,
+        'predict_value_1000': predict_value,
+        'predict_many_y_100000': lambda: predict_many('CO2'),
+        'predict_many_value_100000': lambda: predict_many('Multiple Regression'),
+        'bootstrap_multiple_1000': bootstrap,
+        'elastic_net_path_50': regularization_path,
+        'choose_penalty_cv': choose_penalty,
+        'draw_frame_full': lambda: _draw_setup(full=True),
+        'draw_frame_hover': lambda: _draw_setup(full=False),
+        'hit_test_500_buttons': _hit_test_setup,
+    }
+
+
+def run(names: Optional[List[str]], repeats: int) -> Dict[str, dict]:
+    """ Run the benchmarks with the given names (all of them if names is None),
+    print their times and return a mapping of name to result.
+    """
+    results = {}
+    for name, setup in get_benchmarks().items():
+        if names is not None and name not in names:
+            continue
+        function, number = setup()
+        function()  # warm up caches and lazy imports
+        results[name] = time_function(function, number, repeats)
+        print(f'{name:26}{results[name]["best"] * 1000:10.3f} ms'
+              f'{results[name]["median"] * 1000:10.3f} ms (median)')
+
+    return results
+
+
+def _draw_setup(full: bool) -> Tuple[Callable[[], object], int]:
+    """ Return a function that draws one headless frame of the interface on the map
+    page, and how many times to call it.
+
+    If full is True, the whole screen is redrawn every frame; otherwise the mouse
+    moves between two buttons, so only their highlights are redrawn.
+    """
+    import pygame
+    from modules.data_cache import load_bird_data, load_ghg_store
+    from modules.interface_system import InterfaceSystem
+
+    pygame.init()
+    screen = pygame.display.set_mode((960, 720))
+    system = InterfaceSystem(load_ghg_store(), load_bird_data())
+    while not system.is_idle():
+        system.handle_events()
+        system.draw(screen)
+
+    buttons = system.pages[system.current_page].buttons[:2]
+    frame = [0]
+
+    def draw() -> None:
+        frame[0] += 1
+        if full:
+            system.redraw_all()
+        else:
+            system.mouse_pos = buttons[frame[0] % 2].rect.center
+        system.draw(screen)
+
+    return (draw, 100)
+
+
+def _hit_test_setup() -> Tuple[Callable[[], object], int]:
+    """ Return a function that finds the buttons under 1000 different mouse positions
+    on a page with 500 buttons, and how many times to call it.
+    """
+    import pygame
+    from modules.interface_objects import Button, Page
+
+    pygame.init()
+    font = pygame.font.Font(None, 20)
+    buttons = []
+    for i in range(500):
+        button = Button('normal', f'Item {i}', font)
+        button.rect.topleft = (i % 20 * 48, i // 20 * 28)
+        buttons.append(button)
+    page = Page(pygame.Surface((960, 720)), buttons)
+    positions = [(i * 37 % 960, i * 53 % 720) for i in range(1000)]
+
+    return (lambda: [page.get_buttons_at(position) for position in positions], 20)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time loading, fitting, predicting and '
+                                                 'drawing, and compare with an earlier run.')
+    parser.add_argument('--only', nargs='+', default=None, metavar='NAME',
+                        help='benchmarks to run (default: all of them)')
+    parser.add_argument('--repeats', type=int, default=5,
+                        help='number of measurements of each benchmark; the best is compared')
+    parser.add_argument('--output', default=None,
+                        help='JSON file to write the results to')
+    parser.add_argument('--compare', default=None, metavar='JSON',
+                        help='results of an earlier run to compare with')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='slowdown (as a fraction) that counts as a regression')
+    args = parser.parse_args()
+
+    os.chdir(PROJECT_FOLDER)
+    benchmark_results = run(args.only, args.repeats)
+
+    if args.output is not None:
+        with open(args.output, 'w') as json_file:
+            json.dump({'python': platform.python_version(),
+                       'platform': platform.platform(),
+                       'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                       'results': benchmark_results}, json_file, indent=2)
+
+    regressed = []
+    if args.compare is not None:
+        with open(args.compare) as json_file:
+            old_results = json.load(json_file)['results']
+        print(f'compared with {args.compare} (threshold {args.threshold:.0%}):')
+        for benchmark_name, ratio, slower in compare_results(old_results, benchmark_results,
+                                                             args.threshold):
+            print(f'  {benchmark_name:26}{ratio:7.2f}x' + ('  REGRESSION' if slower else ''))
+            if slower:
+                regressed.append(benchmark_name)
+
+    sys.exit(1 if regressed else 0)
@@ -2,49 +2,105 @@
 Main
 
 Module to with a function to run the main program.
+
+Options (run python main.py --help for all of them):
+    --fps: the most frames drawn per second (0 for no limit)
+    --no-idle: keep running frames even when nothing is happening
+    --measure-frames: print the frame time distribution and CPU use on exit
+    --plot: how "Show Graph" shows graphs: in a web browser (browser), in the
+            program's window (window) or as an HTML file in the plots folder (html)
 """
 
+import argparse
+from typing import Optional
 import pygame
-from modules.interface_objects import InputButton
-from modules.interface_system import InterfaceSystem
-from modules.read_data import read_bird_data, read_ghg_data
+from pygame.locals import KEYDOWN, MOUSEBUTTONDOWN, MOUSEMOTION, QUIT, VIDEOEXPOSE
+from modules.interface_system import PLOT_MODES, WINDOW_TITLE, InterfaceSystem
+from modules.data_cache import load_bird_data, load_ghg_store
+from modules.frame_timer import FrameTimer
+
 
+def run(i_system: InterfaceSystem, fps: int = 60, idle_timeout: Optional[int] = 1000,
+        frame_timer: Optional[FrameTimer] = None) -> None:
+    """Runs the main program allowing the user to use the program.
 
-def run(i_system: InterfaceSystem) -> None:
-    """Runs the main program allowing the user to use the program."""
+    At most <fps> frames are drawn per second (no limit if fps is 0). If idle_timeout
+    is not None, whenever there is nothing to update the program sleeps until an input
+    event arrives or idle_timeout milliseconds pass. If frame_timer is given, the time
+    of every frame is recorded in it.
+    """
     pygame.init()
 
     # Set up screen
     screen = pygame.display.set_mode((960, 720))
-    pygame.display.set_caption('CSC110 Final Project')
+    pygame.display.set_caption(WINDOW_TITLE)
+
+    # Only the events the program handles are queued, so no other event wakes it up
+    pygame.event.set_blocked(None)
+    pygame.event.set_allowed([QUIT, MOUSEMOTION, MOUSEBUTTONDOWN, KEYDOWN, VIDEOEXPOSE])
+    clock = pygame.time.Clock()
 
     # Program Loop
     while True:
+        if frame_timer is not None:
+            frame_timer.start_frame()
+
+        # Sleeps until there is something to do
+        if idle_timeout is not None:
+            i_system.wait_for_events(idle_timeout)
+
+        if frame_timer is not None:
+            frame_timer.start_work()
+
         i_system.mouse_clicked = False
-        page = i_system.pages[i_system.current_page]
 
         # Handling events
         i_system.handle_events()
 
-        # Handles mouse motion and selection
-        for button in page.buttons:
-            if button.rect.collidepoint(i_system.mouse_pos) \
-                    and i_system.mouse_clicked:
-                i_system.handle_mouse_click(button)
+        # Handles mouse selection
+        for button in i_system.get_clicked_buttons():
+            i_system.handle_mouse_click(button)
 
-            # Updates output displayed
-            if isinstance(button, InputButton):
-                i_system.update_output(button)
+        # Updates the outputs whose inputs changed
+        i_system.update_outputs()
 
         # Draws to screen
-        i_system.draw(screen)
+        dirty_rects = i_system.draw(screen)
+
+        # Updates the parts of the screen that were drawn on
+        pygame.display.update(dirty_rects)
+
+        if frame_timer is not None:
+            frame_timer.end_work()
 
-        # Updates screen
-        pygame.display.update()
+        # Limits the frame rate
+        if fps > 0:
+            clock.tick(fps)
+
+        if frame_timer is not None:
+            frame_timer.end_frame()
 
 
 if __name__ == '__main__':
-    ghg_data = read_ghg_data(398)
-    bird_data = read_bird_data()
-    interface_system = InterfaceSystem(ghg_data, bird_data)
-    run(interface_system)
+    parser = argparse.ArgumentParser(description='CSC110 Final Project')
+    parser.add_argument('--fps', type=int, default=60,
+                        help='the most frames drawn per second (0 for no limit)')
+    parser.add_argument('--no-idle', action='store_true',
+                        help='keep running frames even when nothing is happening')
+    parser.add_argument('--idle-timeout', type=int, default=1000,
+                        help='the longest time (ms) to sleep while waiting for input')
+    parser.add_argument('--measure-frames', action='store_true',
+                        help='print the frame time distribution and CPU use on exit')
+    parser.add_argument('--plot', default='browser', choices=PLOT_MODES,
+                        help='show graphs in a web browser, in the window or as HTML files')
+    args = parser.parse_args()
+
+    ghg_data = load_ghg_store()
+    bird_data = load_bird_data()
+    interface_system = InterfaceSystem(ghg_data, bird_data, plot_mode=args.plot)
+    timer = FrameTimer() if args.measure_frames else None
+    try:
+        run(interface_system, args.fps, None if args.no_idle else args.idle_timeout, timer)
+    finally:
+        if timer is not None:
+            print(timer.report())
@@ -0,0 +1,185 @@
+"""
+Analysis
+
+Module that contains a function to rank every greenhouse gas series (region x
+sector x gas) by how well it explains the trend of each bird group, without
+going through the interface.
+"""
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from modules.model_table import fit_stacked
+from modules.read_data import BIRD_NAMES, GAS_NAMES, GHGStore, filter_bird_data, get_year_range
+
+# the datasets used by rank_features in the current process, set by _set_datasets
+_datasets: Optional[Tuple[GHGStore, Dict[int, List[str]]]] = None
+
+
+@dataclass
+class Feature:
+    """A greenhouse gas series and how well it explains the trend of a bird group.
+
+    Instance Attributes:
+        - region: the region of the series
+        - category: the CategoryID of the sector of the series
+        - sector: the name of the sector of the series
+        - gas: the name of the gas of the series, from GAS_NAMES
+        - r_squared: the r squared value of the regression of the bird group on the series
+        - correlation: the correlation of the series with the bird group
+        - years: the number of years used, leaving out years where the series is missing
+
+    Representation Invariants:
+        - 0.0 <= self.r_squared <= 1.0
+        - -1.0 <= self.correlation <= 1.0
+    """
+    region: str
+    category: int
+    sector: str
+    gas: str
+    r_squared: float
+    correlation: float
+    years: int
+
+
+def rank_features(store: GHGStore, bird_data: Dict[int, List[str]], top: int = 10,
+                  regions: Optional[List[str]] = None, categories: Optional[List[int]] = None,
+                  start_year: Optional[int] = None, end_year: Optional[int] = None,
+                  min_years: int = 10,
+                  workers: int = 1) -> Dict[str, List[Feature]]:
+    """ Return a mapping of each bird group name to the <top> greenhouse gas series with
+    the highest r squared value for that bird group, best first.
+
+    Every gas of every region in regions and sector in categories is a candidate (all
+    of them if regions or categories is None), using the years <start_year> to
+    <end_year>, which are the first and last years both datasets have if they are
+    None. Candidates with fewer than <min_years> years of data are left out.
+
+    The r squared values of all the candidates are computed at once with fit_stacked,
+    and the best ones are kept in a heap of size <top>. The sectors are split across
+    <workers> processes.
+
+    Preconditions:
+        - top >= 1
+        - start_year is None or end_year is None or start_year <= end_year
+        - min_years >= 2
+        - workers >= 1
+
+    >>> from modules.read_data import read_bird_data, read_ghg_store
+    >>> store, bird_data = read_ghg_store(), read_bird_data()
+    >>> ranking = rank_features(store, bird_data, top=3, categories=[0])
+    >>> sorted(ranking) == sorted(BIRD_NAMES)
+    True
+    >>> best = ranking['Forest Birds']
+    >>> len(best), best[0].r_squared >= best[1].r_squared >= best[2].r_squared
+    (3, True)
+    >>> round(best[0].correlation ** 2, 6) == round(best[0].r_squared, 6)
+    True
+
+    Years before 1990 where a bird group isn't available ('n/a') are left out:
+
+    >>> early = rank_features(store, bird_data, top=1, categories=[0], start_year=1975)
+    >>> sorted(early) == sorted(BIRD_NAMES)
+    True
+    """
+    first_year, last_year = get_year_range(store, bird_data)
+    start_year = first_year if start_year is None else start_year
+    end_year = last_year if end_year is None else end_year
+    regions = store.region_names if regions is None else regions
+    categories = sorted(store.category_names) if categories is None else categories
+    years = np.arange(start_year, end_year + 1)
+    bird_series = np.array([[filter_bird_data(bird_data, bird, start_year).get(year, np.nan)
+                             for year in years] for bird in range(len(BIRD_NAMES))],
+                           dtype=float)
+
+    tasks = [(regions, chunk, start_year, end_year, min_years, top, bird_series)
+             for chunk in np.array_split(np.array(categories, dtype=int), workers)
+             if len(chunk) > 0]
+    if workers == 1:
+        _set_datasets(store, bird_data)
+        results = [_rank_chunk(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_set_datasets,
+                                 initargs=(store, bird_data)) as executor:
+            results = list(executor.map(_rank_chunk, tasks))
+
+    ranking = {}
+    for bird, bird_name in enumerate(BIRD_NAMES):
+        best = heapq.nlargest(top, (feature for result in results for feature in result[bird]),
+                              key=lambda feature: feature.r_squared)
+        ranking[bird_name] = best
+
+    return ranking
+
+
+def _set_datasets(store: GHGStore, bird_data: Dict[int, List[str]]) -> None:
+    """Set the datasets used by _rank_chunk in this process."""
+    global _datasets
+    _datasets = (store, bird_data)
+
+
+def _rank_chunk(task: tuple) -> List[List[Feature]]:
+    """ Return, for each bird group, the best candidates of a chunk of sectors, best
+    first, where task is a tuple of the regions, CategoryIDs, start year, end year,
+    minimum years, number of candidates to keep and bird series.
+    """
+    regions, categories, start_year, end_year, min_years, top, bird_series = task
+    store, _ = _datasets
+
+    # ghg[s, g, t] is the emission of gas g of series s in the year start_year + t
+    series = [(region, int(category)) for category in categories for region in regions
+              if store.has_series(region, int(category))]
+    ghg = np.full((len(series), len(GAS_NAMES), end_year - start_year + 1), np.nan)
+    for i, (region, category) in enumerate(series):
+        first, stop = store.get_span(region, category, start_year, end_year)
+        ghg[i][:, store.years[first:stop] - start_year] = store.gases[:, first:stop]
+
+    # Years where a bird group has no data are left out like missing emissions
+    x = np.where(np.isfinite(bird_series)[np.newaxis, np.newaxis, :, :],
+                 ghg[:, :, np.newaxis, :], np.nan)
+    y = np.nan_to_num(bird_series)[np.newaxis, np.newaxis, :, :]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fit = fit_stacked(x, y)
+    counts = np.isfinite(x).sum(axis=-1)
+    r_squared = np.where((counts >= min_years) & np.isfinite(fit['r_squared']),
+                         fit['r_squared'], -np.inf)
+    correlation = np.sign(fit['slopes']) * np.sqrt(np.clip(r_squared, 0.0, 1.0))
+
+    best = []
+    for bird in range(bird_series.shape[0]):
+        heap = []
+        scores = r_squared[:, :, bird].ravel()
+        for candidate in np.flatnonzero(np.isfinite(scores)).tolist():
+            entry = (float(scores[candidate]), candidate)
+            if len(heap) < top:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+
+        kept = []
+        for score, candidate in sorted(heap, reverse=True):
+            i, gas = divmod(candidate, len(GAS_NAMES))
+            region, category = series[i]
+            kept.append(Feature(region, category, store.category_names[category],
+                                GAS_NAMES[gas], score, float(correlation[i, gas, bird]),
+                                int(counts[i, gas, bird])))
+        best.append(kept)
+
+    return best
+
+
+if __name__ == '__main__':
+    # import python_ta
+    # python_ta.check_all(config={
+    #     'max-line-length': 100,
+    #     'extra-imports': ['python_ta.contracts', 'dataclasses', 'datetime'],
+    #     'disable': ['R1705', 'C0200'],
+    # })
+
+    # import python_ta.contracts
+    # python_ta.contracts.DEBUG_CONTRACTS = False
+    # python_ta.contracts.check_all_contracts()
+
+    import doctest
+    doctest.testmod()
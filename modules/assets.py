@@ -0,0 +1,204 @@
+"""
+Assets
+
+Module contains functions to load the interface images at the size they are
+displayed, using a cache of pre-scaled images on disk, and the AssetLoader
+class, which loads images on a background thread while the program runs.
+
+The cache keeps each image as raw RGB pixels at the displayed size, in
+images/.cache, so it can be read without decoding and scaling the JPEG again.
+A cached image is rebuilt when its source image is newer than it.
+"""
+
+import os
+import queue
+import threading
+from typing import Dict, List, Optional, Tuple
+import pygame
+
+# the folder the pre-scaled images are cached in
+CACHE_FOLDER = os.path.join('images', '.cache')
+
+# colour shown in place of an image that hasn't loaded yet
+PLACEHOLDER_COLOUR = (200, 200, 200)
+
+
+def cache_path(file_path: str, size: Tuple[int, int]) -> str:
+    """Return the path of the pre-scaled cache of the image at file_path.
+
+    >>> cache_path('images/sky.jpg', (960, 720)) == os.path.join(CACHE_FOLDER, 'sky_960x720.rgb')
+    True
+    """
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(CACHE_FOLDER, f'{name}_{size[0]}x{size[1]}.rgb')
+
+
+def load_image(file_path: str, size: Tuple[int, int], use_cache: bool = True) -> pygame.Surface:
+    """Return the image at file_path scaled to size.
+
+    If use_cache is True, the image is read from the pre-scaled cache if it is up to
+    date, and otherwise loaded, scaled and written to the cache for the next time.
+
+    >>> image = load_image('images/grass.jpeg', (96, 72), use_cache=False)
+    >>> image.get_size()
+    (96, 72)
+    """
+    path = cache_path(file_path, size)
+    if use_cache:
+        image = _read_cache(path, file_path, size)
+        if image is not None:
+            return image
+
+    image = pygame.transform.scale(pygame.image.load(file_path), size)
+    if use_cache:
+        _write_cache(path, image)
+    return image
+
+
+class AssetLoader:
+    """Class to load images on a background thread.
+
+    Each requested image gets a placeholder surface right away, which is filled in
+    with the image by poll once the image has loaded, so every surface that uses the
+    placeholder shows the image from then on.
+
+    Instance Attributes:
+        - use_cache: whether images are loaded through the pre-scaled cache
+
+    Sample Usage:
+    >>> loader = AssetLoader(use_cache=False)
+    >>> grass = loader.request('images/grass.jpeg', (96, 72))
+    >>> grass is loader.request('images/grass.jpeg', (96, 72))
+    True
+    >>> grass.get_at((0, 0)) == PLACEHOLDER_COLOUR
+    True
+    >>> loader.start()
+    >>> loader.wait()
+    >>> loader.poll(), loader.is_loading()
+    (True, False)
+    >>> grass.get_at((0, 0)) == PLACEHOLDER_COLOUR
+    False
+    """
+    use_cache: bool
+
+    # Private Instance Attributes:
+    #   - _placeholders: mapping of (file path, size) to the surface the image is shown on
+    #   - _requests: the (file path, size) of the images not yet given to the thread
+    #   - _loaded: the images the thread finished loading, that poll hasn't used yet
+    #   - _pending: the number of requested images poll hasn't filled in yet
+    #   - _thread: the thread loading the images, or None if it wasn't started
+    _placeholders: Dict[Tuple[str, Tuple[int, int]], pygame.Surface]
+    _requests: List[Tuple[str, Tuple[int, int]]]
+    _loaded: queue.Queue
+    _pending: int
+    _thread: Optional[threading.Thread] = None
+
+    def __init__(self, use_cache: bool = True) -> None:
+        self.use_cache = use_cache
+        self._placeholders = {}
+        self._requests = []
+        self._loaded = queue.Queue()
+        self._pending = 0
+        self._thread = None
+
+    def request(self, file_path: str, size: Tuple[int, int]) -> pygame.Surface:
+        """Return the placeholder surface of the image at file_path scaled to size. The
+        same image and size always returns the same surface.
+
+        Preconditions:
+            - self._thread is None
+        """
+        key = (file_path, size)
+        if key not in self._placeholders:
+            placeholder = pygame.Surface(size)
+            placeholder.fill(PLACEHOLDER_COLOUR)
+            self._placeholders[key] = placeholder
+            self._requests.append(key)
+            self._pending += 1
+        return self._placeholders[key]
+
+    def start(self) -> None:
+        """Starts loading the requested images on a background thread."""
+        self._thread = threading.Thread(target=self._load_all, args=(self._requests,),
+                                        daemon=True)
+        self._requests = []
+        self._thread.start()
+
+    def wait(self) -> None:
+        """Waits for the background thread to finish loading."""
+        if self._thread is not None:
+            self._thread.join()
+
+    def poll(self) -> bool:
+        """Fills in the placeholders of the images that finished loading, and returns
+        whether any placeholder changed. Must be called from the main thread.
+        """
+        changed = False
+        while True:
+            try:
+                key, image = self._loaded.get_nowait()
+            except queue.Empty:
+                return changed
+            self._placeholders[key].blit(image, (0, 0))
+            self._pending -= 1
+            changed = True
+
+    def is_loading(self) -> bool:
+        """Returns whether there are requested images that poll hasn't filled in yet."""
+        return self._pending > 0
+
+    def _load_all(self, requests: List[Tuple[str, Tuple[int, int]]]) -> None:
+        """Loads each requested image, in order, putting it in self._loaded."""
+        for file_path, size in requests:
+            image = load_image(file_path, size, self.use_cache)
+            self._loaded.put(((file_path, size), image))
+
+
+def _read_cache(path: str, file_path: str, size: Tuple[int, int]) -> Optional[pygame.Surface]:
+    """Return the cached image at path, or None if it doesn't exist, is older than the
+    source image at file_path or doesn't have the expected size.
+    """
+    try:
+        if os.path.getmtime(path) < os.path.getmtime(file_path):
+            return None
+        with open(path, 'rb') as cache_file:
+            pixels = cache_file.read()
+    except OSError:
+        return None
+
+    if len(pixels) != size[0] * size[1] * 3:
+        return None
+    return pygame.image.frombuffer(pixels, size, 'RGB')
+
+
+def _write_cache(path: str, image: pygame.Surface) -> None:
+    """Write the pixels of image to path. The cache is only an optimization, so
+    nothing happens if it can't be written.
+    """
+    temporary_path = f'{path}.{threading.get_ident()}.tmp'
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(temporary_path, 'wb') as cache_file:
+            cache_file.write(pygame.image.tostring(image, 'RGB'))
+        os.replace(temporary_path, path)
+    except OSError:
+        pass
+
+
+if __name__ == '__main__':
+    # import python_ta
+
+    # python_ta.check_all(config={
+    #     'max-line-length': 100,
+    #     'extra-imports': ['python_ta.contracts', 'dataclasses', 'datetime'],
+    #     'disable': ['R1705', 'C0200'],
+    # })
+
+    # import python_ta.contracts
+
+    # python_ta.contracts.DEBUG_CONTRACTS = False
+    # python_ta.contracts.check_all_contracts()
+
+    import doctest
+
+    doctest.testmod()
@@ -5,15 +5,20 @@ Module that contains a function to initialize needed classes
 for the main program.
 """
 
-from typing import List
+from typing import List, Optional, Tuple
 import pygame
+from modules.assets import AssetLoader, load_image
 from modules.interface_objects import Button, InputButton, Page
 
 
-def create_pages() -> List[Page]:
+def create_pages(loader: Optional[AssetLoader] = None) -> List[Page]:
     """Returns a list of Page objects for the system.
 
     First gets images, then creates buttons, then creates pages.
+
+    The image of the first page is always loaded right away. If loader is given, the
+    other images are requested from it (and show a placeholder until it loads them),
+    otherwise they are loaded right away too.
     """
     pygame.init()
 
@@ -21,18 +26,15 @@ def create_pages() -> List[Page]:
     large_font = pygame.font.SysFont('arial', 40)
 
     # Images
-    canada_map_img = pygame.transform.scale(pygame.image.load('images/canada_map.jpg'),
-                                            (960, 720))
-    grass_img = pygame.transform.scale(pygame.image.load('images/grass.jpeg'),
-                                       (960, 720))
-    sky_img = pygame.transform.scale(pygame.image.load('images/sky.jpg'),
-                                     (960, 720))
+    canada_map_img = load_image('images/canada_map.jpg', (960, 720))
+    grass_img = get_image('images/grass.jpeg', (960, 720), loader)
+    sky_img = get_image('images/sky.jpg', (960, 720), loader)
 
     # Button objects
     back = Button('normal', 'BACK', large_font)
     back.rect.topleft = (10, 10)
     all_regions = create_region_buttons(small_font)
-    all_birds = create_bird_buttons(small_font, 180, 60, 200)
+    all_birds = create_bird_buttons(small_font, 180, 60, 200, loader)
     all_ghgs = create_ghg_buttons(small_font, large_font, 180, 60, 200)
     page3_buttons = create_page3_buttons(small_font, large_font, 960, 720, 180)
     page4_buttons = create_page4_buttons(small_font, large_font, 960, 720, 180)
@@ -63,11 +65,11 @@ def create_region_buttons(font: pygame.font.Font) -> List[Button]:
 
 
 def create_bird_buttons(font: pygame.font.Font, x_margin: int, y_margin: int,
-                        grid_box_size: int) -> List[Button]:
+                        grid_box_size: int, loader: Optional[AssetLoader] = None) -> List[Button]:
     """Returns a list of Button objects that represent birds."""
     bird_names = ['Waterfowl', 'Birds of Prey', 'Wetland Birds', 'Seabirds', 'Forest Birds',
                   'Shorebirds', 'Grassland Birds', 'Aerial Insectivores', 'All Other Birds']
-    bird_images = create_bird_images()
+    bird_images = create_bird_images(loader)
 
     buttons = [Button('normal', bird_names[j], font, bird_images[j])
                for j in range(len(bird_names))]
@@ -82,9 +84,13 @@ def create_bird_buttons(font: pygame.font.Font, x_margin: int, y_margin: int,
 
 def create_ghg_buttons(small_font: pygame.font.Font, large_font: pygame.font.Font,
                        x_margin: int, y_margin: int, grid_box_size: int) -> List[Button]:
-    """Returns a list of Button objects that represent greenhouse gases."""
+    """Returns a list of Button objects that represent greenhouse gases, and a button
+    that changes the sector of the emissions when clicked.
+    """
     total = Button('normal', 'Total', large_font)
     multiple_regression = Button('normal', 'Multiple Regression', small_font)
+    sector = Button('sector', 'Sector: TOTAL', small_font)
+    sector.rect.center = (x_margin + grid_box_size * 3 // 2, y_margin // 2)
 
     ghg_names = ['CO2', 'CH4', 'N2O', 'HFC', 'PFC', 'SF6', 'NF3']
     buttons = [Button('normal', ghg, large_font) for ghg in ghg_names] + \
@@ -95,7 +101,7 @@ def create_ghg_buttons(small_font: pygame.font.Font, large_font: pygame.font.Fon
             ((x_margin + grid_box_size * (i % 3) + grid_box_size // 2),
              (y_margin + grid_box_size * (i // 3) + grid_box_size // 2))
 
-    return buttons
+    return buttons + [sector]
 
 
 def create_page3_buttons(small_font: pygame.font.Font, large_font: pygame.font.Font,
@@ -143,15 +149,26 @@ def create_page4_buttons(small_font: pygame.font.Font, large_font: pygame.font.F
     return all_ghg_coef + all_ghg_input + [multiple_regression_output]
 
 
-def create_bird_images() -> List[pygame.Surface]:
+def create_bird_images(loader: Optional[AssetLoader] = None) -> List[pygame.Surface]:
     """Returns a list of bird images."""
     image_files = ['waterfowl.jpg', 'birds_of_prey.jpg', 'wetland_birds.jpg', 'seabirds.jpg',
                    'forest_birds.jpg', 'shorebirds.jpg', 'grassland_birds.jpg',
                    'aerial_insectivores.jpg', 'all_other_birds.png']
-    return [pygame.transform.scale(pygame.image.load(f'images/{image_file}'), (200, 200))
+    return [get_image(f'images/{image_file}', (200, 200), loader)
             for image_file in image_files]
 
 
+def get_image(file_path: str, size: Tuple[int, int],
+              loader: Optional[AssetLoader] = None) -> pygame.Surface:
+    """Returns the image at file_path scaled to size, or its placeholder from loader
+    if loader is given.
+    """
+    if loader is None:
+        return load_image(file_path, size)
+    else:
+        return loader.request(file_path, size)
+
+
 if __name__ == '__main__':
     # import python_ta
 
@@ -0,0 +1,294 @@
+"""
+Data Cache
+
+Module that contains functions to save the parsed datasets to a binary file
+next to the csv file, and to load them back on later runs instead of parsing
+the csv file again.
+
+The cache of 'dataset/GHG.csv' is saved as 'dataset/GHG.csv.npz'. It is rebuilt
+when the size of the csv file changes, or when its modification time changes and
+its content hash no longer matches the one the cache was built from. When rows were
+only added to the end of 'GHG.csv', just the new rows are parsed and added to the
+cached store.
+"""
+import csv
+import hashlib
+import io
+import os
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from modules.read_data import GHGStore, ghg_store_from_rows, read_bird_data, read_ghg_header, \
+    read_ghg_store
+
+# increase when the layout of the cached arrays or how they are parsed changes, so old
+# caches are rebuilt
+_CACHE_VERSION = 2
+
+# number of bytes read at a time when hashing a csv file
+_HASH_CHUNK_SIZE = 1 << 20
+
+
+def load_ghg_store(file_path: str = 'dataset/GHG.csv', use_cache: bool = True) -> GHGStore:
+    """ Return the GHGStore of the csv file at <file_path>, loading it from the cache
+    when the cache is up to date and parsing the csv file (and saving the cache)
+    otherwise.
+
+    >>> import shutil, tempfile
+    >>> folder = tempfile.mkdtemp()
+    >>> csv_path = shutil.copy('dataset/GHG.csv', folder)
+    >>> len(load_ghg_store(csv_path))  # parses the csv file and saves the cache
+    33348
+    >>> os.path.exists(cache_path(csv_path))
+    True
+    >>> len(load_ghg_store(csv_path))  # loads the cache
+    33348
+    >>> with open(csv_path, 'a') as csvfile:
+    ...     _ = csvfile.write('2019,Yukon,0,TOTAL,TRUE,1,2,3,4,5,6,7,8,9,10,kt\\n')
+    >>> store = load_ghg_store(csv_path)  # only the new row is parsed
+    >>> len(store), store.get_years('Yukon').tolist()[-2:]
+    (33349, [2018, 2019])
+    >>> bool(np.allclose(store.gases, read_ghg_store(csv_path).gases, rtol=0, atol=0,
+    ...                  equal_nan=True))
+    True
+    >>> with open(csv_path, 'a') as csvfile:  # rows that aren't data are skipped
+    ...     _ = csvfile.write('Source: Environment Canada, 2020\\n')
+    >>> store, full = load_ghg_store(csv_path), read_ghg_store(csv_path)
+    >>> len(store), bool(np.allclose(store.gases, full.gases, rtol=0, atol=0, equal_nan=True))
+    (33349, True)
+    >>> shutil.rmtree(folder)
+    """
+    if not use_cache:
+        return read_ghg_store(file_path)
+
+    arrays = _load_arrays(file_path, lambda path: _ghg_store_to_arrays(read_ghg_store(path)),
+                          _append_ghg_rows)
+    return _arrays_to_ghg_store(arrays)
+
+
+def load_bird_data(file_path: str = 'dataset/bird_data.csv',
+                   use_cache: bool = True) -> Dict[int, List[str]]:
+    """ Return the bird data of the csv file at <file_path> in the same format as
+    read_bird_data, loading it from the cache when the cache is up to date.
+
+    >>> import shutil, tempfile
+    >>> folder = tempfile.mkdtemp()
+    >>> csv_path = shutil.copy('dataset/bird_data.csv', folder)
+    >>> parsed = load_bird_data(csv_path)
+    >>> load_bird_data(csv_path) == parsed == read_bird_data()
+    True
+    >>> shutil.rmtree(folder)
+    """
+    if not use_cache:
+        return read_bird_data(file_path)
+
+    arrays = _load_arrays(file_path, lambda path: _bird_data_to_arrays(read_bird_data(path)))
+    return _arrays_to_bird_data(arrays)
+
+
+def cache_path(file_path: str) -> str:
+    """Return the path of the cache file of the csv file at <file_path>
+
+    >>> cache_path('dataset/GHG.csv')
+    'dataset/GHG.csv.npz'
+    """
+    return file_path + '.npz'
+
+
+def _load_arrays(file_path: str, parse: Callable[[str], Dict[str, np.ndarray]],
+                 append: Optional[Callable[[str, Dict[str, np.ndarray], bytes],
+                                           Optional[Dict[str, np.ndarray]]]] = None
+                 ) -> Dict[str, np.ndarray]:
+    """ Return the arrays cached for the csv file at <file_path>, calling parse and
+    saving its result as the new cache if the cache is missing or out of date.
+
+    If append is given and the csv file only grew at the end since the cache was
+    saved (the start of the file still has the cached hash), append is called with
+    the path, the cached arrays and the new bytes instead of parsing the whole file.
+    It returns the updated arrays, or None if the new bytes can't be added that way.
+
+    If the cache can't be written (for example, the dataset folder is read only),
+    the parsed arrays are still returned.
+    """
+    stat = os.stat(file_path)
+    cached = _read_cache(cache_path(file_path))
+    arrays = None
+
+    if cached is not None and int(cached['source_size']) == stat.st_size:
+        if int(cached['source_mtime_ns']) == stat.st_mtime_ns:
+            return cached
+
+        # the file was touched, so only rebuild if the content is different
+        content_hash = _hash_file(file_path)
+        if str(cached['source_hash']) == content_hash:
+            cached['source_mtime_ns'] = np.array(stat.st_mtime_ns)
+            _write_cache(cache_path(file_path), cached)
+            return cached
+    elif cached is not None and append is not None \
+            and int(cached['source_size']) < stat.st_size:
+        old_size = int(cached['source_size'])
+        prefix_hash, content_hash, new_bytes = _hash_file_prefix(file_path, old_size)
+        if str(cached['source_hash']) == prefix_hash:
+            arrays = append(file_path, cached, new_bytes)
+    else:
+        content_hash = _hash_file(file_path)
+
+    if arrays is None:
+        arrays = parse(file_path)
+    arrays['version'] = np.array(_CACHE_VERSION)
+    arrays['source_size'] = np.array(stat.st_size)
+    arrays['source_mtime_ns'] = np.array(stat.st_mtime_ns)
+    arrays['source_hash'] = np.array(content_hash)
+    _write_cache(cache_path(file_path), arrays)
+
+    return arrays
+
+
+def _read_cache(path: str) -> Optional[Dict[str, np.ndarray]]:
+    """ Return the arrays saved in the cache file at <path>, or None if the file
+    doesn't exist, can't be read or was saved by a different cache version.
+    """
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with np.load(path, allow_pickle=False) as npz_file:
+            if int(npz_file['version']) != _CACHE_VERSION:
+                return None
+            return {name: npz_file[name] for name in npz_file.files}
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _write_cache(path: str, arrays: Dict[str, np.ndarray]) -> None:
+    """ Save arrays to the cache file at <path>.
+
+    The arrays are first written to a temporary file which then replaces the cache
+    file, so a program that is closed while saving never leaves a broken cache.
+    The arrays are saved uncompressed since loading them is then just a read.
+    """
+    temporary_path = path + '.tmp'
+    try:
+        with open(temporary_path, 'wb') as cache_file:
+            np.savez(cache_file, **arrays)
+        os.replace(temporary_path, path)
+    except OSError:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+
+def _hash_file(file_path: str) -> str:
+    """Return the sha256 hash of the content of the file at <file_path>"""
+    file_hash = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(_HASH_CHUNK_SIZE), b''):
+            file_hash.update(chunk)
+
+    return file_hash.hexdigest()
+
+
+def _hash_file_prefix(file_path: str, size: int) -> Tuple[str, str, bytes]:
+    """ Return the sha256 hash of the first <size> bytes of the file at <file_path>,
+    the hash of its whole content, and the bytes after the first <size> bytes,
+    starting with the last byte of the first <size> bytes.
+    """
+    file_hash = hashlib.sha256()
+    last_byte = b''
+    with open(file_path, 'rb') as file:
+        remaining = size
+        while remaining > 0:
+            chunk = file.read(min(_HASH_CHUNK_SIZE, remaining))
+            if chunk == b'':
+                break
+            file_hash.update(chunk)
+            remaining -= len(chunk)
+            last_byte = chunk[-1:]
+
+        prefix_hash = file_hash.hexdigest()
+        new_bytes = file.read()
+        file_hash.update(new_bytes)
+
+    return (prefix_hash, file_hash.hexdigest(), last_byte + new_bytes)
+
+
+def _append_ghg_rows(file_path: str, arrays: Dict[str, np.ndarray],
+                     new_bytes: bytes) -> Optional[Dict[str, np.ndarray]]:
+    """ Return the arrays of the GHGStore saved in arrays with the rows in new_bytes
+    added to the end of the csv file at <file_path>, or None if the old part of the
+    file didn't end with a full row or the new rows can't be read.
+
+    The new rows are filtered like in stream_ghg_store, where the rows before any
+    header in new_bytes have the columns of the first header of the file.
+
+    >>> row = b'2019,Yukon,0,TOTAL,TRUE,1,2,3,4,5,6,7,8,9,10,kt\\n'
+    >>> store = GHGStore(np.array([2018]), np.array([0]), np.array([0]),
+    ...                  np.zeros((8, 1)), ['Yukon'], {0: 'TOTAL'})
+    >>> arrays = _append_ghg_rows('dataset/GHG.csv', _ghg_store_to_arrays(store),
+    ...                           b'\\n' + row + b'Source: Environment Canada, 2020\\n')
+    >>> _arrays_to_ghg_store(arrays).get_years('Yukon').tolist()
+    [2018, 2019]
+    >>> _append_ghg_rows('dataset/GHG.csv', _ghg_store_to_arrays(store), b'8' + row) is None
+    True
+    >>> _append_ghg_rows('dataset/GHG.csv', _ghg_store_to_arrays(store),
+    ...                  b'\\n2019,Yukon\\n') is None  # a row that is cut short
+    True
+    """
+    if not new_bytes.startswith(b'\n'):
+        return None
+
+    try:
+        rows = csv.reader(io.StringIO(new_bytes[1:].decode()))
+        store = _arrays_to_ghg_store(arrays)
+        store.extend(ghg_store_from_rows(rows, read_ghg_header(file_path)))
+    except (ValueError, IndexError):
+        return None
+    return _ghg_store_to_arrays(store)
+
+
+def _ghg_store_to_arrays(store: GHGStore) -> Dict[str, np.ndarray]:
+    """Return a mapping of names to the arrays needed to rebuild store"""
+    return {'years': store.years,
+            'region_codes': store.region_codes,
+            'category_ids': store.category_ids,
+            'gases': store.gases,
+            'region_names': np.array(store.region_names),
+            'category_keys': np.array(list(store.category_names), dtype=np.int16),
+            'category_values': np.array(list(store.category_names.values()))}
+
+
+def _arrays_to_ghg_store(arrays: Dict[str, np.ndarray]) -> GHGStore:
+    """Return the GHGStore saved as arrays by _ghg_store_to_arrays"""
+    category_names = dict(zip(arrays['category_keys'].tolist(),
+                              arrays['category_values'].tolist()))
+    return GHGStore(years=arrays['years'],
+                    region_codes=arrays['region_codes'],
+                    category_ids=arrays['category_ids'],
+                    gases=arrays['gases'],
+                    region_names=arrays['region_names'].tolist(),
+                    category_names=category_names)
+
+
+def _bird_data_to_arrays(bird_data: Dict[int, List[str]]) -> Dict[str, np.ndarray]:
+    """Return a mapping of names to the arrays needed to rebuild bird_data"""
+    return {'years': np.array(list(bird_data), dtype=np.int16),
+            'rows': np.array(list(bird_data.values()))}
+
+
+def _arrays_to_bird_data(arrays: Dict[str, np.ndarray]) -> Dict[int, List[str]]:
+    """Return the bird data saved as arrays by _bird_data_to_arrays"""
+    return dict(zip(arrays['years'].tolist(), arrays['rows'].tolist()))
+
+
+if __name__ == '__main__':
+    # import python_ta
+    # python_ta.check_all(config={
+    #     'max-line-length': 100,
+    #     'extra-imports': ['python_ta.contracts', 'dataclasses', 'datetime'],
+    #     'disable': ['R1705', 'C0200'],
+    # })
+
+    # import python_ta.contracts
+    # python_ta.contracts.DEBUG_CONTRACTS = False
+    # python_ta.contracts.check_all_contracts()
+
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,135 @@
+"""
+Frame Timer
+
+Module contains the FrameTimer class, which records how long each frame of the
+main loop takes, so the frame time distribution and CPU use can be checked.
+"""
+
+import time
+from typing import Dict, List
+
+
+class FrameTimer:
+    """Class to record the time taken by each frame of the main loop.
+
+    Instance Attributes:
+        - frame_times: the wall clock time of each finished frame, in seconds,
+          including time spent waiting for events or for the frame rate cap
+        - work_times: the time of each finished frame spent doing work (handling
+          events, updating and drawing), in seconds, not counting time spent waiting
+
+    Representation Invariants:
+        - len(self.frame_times) == len(self.work_times)
+
+    >>> timer = FrameTimer()
+    >>> timer.start_frame()
+    >>> timer.start_work()
+    >>> timer.end_work()
+    >>> timer.end_frame()
+    >>> summary = timer.summary()
+    >>> summary['frames']
+    1
+    >>> summary['work_p50_ms'] <= summary['frame_p50_ms']
+    True
+    """
+    frame_times: List[float]
+    work_times: List[float]
+
+    # Private Instance Attributes:
+    #   - _frame_start: the time the current frame started
+    #   - _work_start: the time the work of the current frame started
+    #   - _work_end: the time the work of the current frame ended
+    #   - _cpu_start: the process CPU time when the timer was created
+    #   - _wall_start: the wall clock time when the timer was created
+    _frame_start: float
+    _work_start: float
+    _work_end: float
+    _cpu_start: float
+    _wall_start: float
+
+    def __init__(self) -> None:
+        self.frame_times = []
+        self.work_times = []
+        self._frame_start = time.perf_counter()
+        self._work_start = self._frame_start
+        self._work_end = self._frame_start
+        self._cpu_start = time.process_time()
+        self._wall_start = self._frame_start
+
+    def start_frame(self) -> None:
+        """Records that a frame started."""
+        self._frame_start = time.perf_counter()
+        self._work_start = self._frame_start
+        self._work_end = self._frame_start
+
+    def start_work(self) -> None:
+        """Records that the current frame is done waiting for events and started
+        its work.
+        """
+        self._work_start = time.perf_counter()
+
+    def end_work(self) -> None:
+        """Records that the work of the current frame is done (what is left of the
+        frame is waiting for the frame rate cap).
+        """
+        self._work_end = time.perf_counter()
+
+    def end_frame(self) -> None:
+        """Records that the current frame ended."""
+        now = time.perf_counter()
+        self.frame_times.append(now - self._frame_start)
+        self.work_times.append(self._work_end - self._work_start)
+
+    def summary(self) -> Dict[str, float]:
+        """Returns the number of frames, the 50th, 90th and 99th percentile and maximum
+        frame and work times in milliseconds, and the percentage of one CPU core used
+        since the timer was created.
+        """
+        summary = {'frames': len(self.frame_times)}
+        for name, times in (('frame', self.frame_times), ('work', self.work_times)):
+            ordered = sorted(times) or [0.0]
+            for percentile in (50, 90, 99):
+                index = min(len(ordered) - 1, len(ordered) * percentile // 100)
+                summary[f'{name}_p{percentile}_ms'] = ordered[index] * 1000
+            summary[f'{name}_max_ms'] = ordered[-1] * 1000
+
+        wall_time = time.perf_counter() - self._wall_start
+        cpu_time = time.process_time() - self._cpu_start
+        summary['cpu_percent'] = 100 * cpu_time / wall_time if wall_time > 0 else 0.0
+
+        return summary
+
+    def report(self) -> str:
+        """Returns the summary as readable text.
+
+        >>> 'cpu' in FrameTimer().report()
+        True
+        """
+        summary = self.summary()
+        return (f"{summary['frames']} frames, "
+                f"frame time p50/p90/p99/max: {summary['frame_p50_ms']:.2f}/"
+                f"{summary['frame_p90_ms']:.2f}/{summary['frame_p99_ms']:.2f}/"
+                f"{summary['frame_max_ms']:.2f} ms, "
+                f"work time p50/p90/p99/max: {summary['work_p50_ms']:.2f}/"
+                f"{summary['work_p90_ms']:.2f}/{summary['work_p99_ms']:.2f}/"
+                f"{summary['work_max_ms']:.2f} ms, "
+                f"cpu: {summary['cpu_percent']:.1f}%")
+
+
+if __name__ == '__main__':
+    # import python_ta
+
+    # python_ta.check_all(config={
+    #     'max-line-length': 100,
+    #     'extra-imports': ['python_ta.contracts', 'dataclasses', 'datetime'],
+    #     'disable': ['R1705', 'C0200'],
+    # })
+
+    # import python_ta.contracts
+
+    # python_ta.contracts.DEBUG_CONTRACTS = False
+    # python_ta.contracts.check_all_contracts()
+
+    import doctest
+
+    doctest.testmod()
@@ -4,11 +4,17 @@ Interface Objects
 Module Contains classes for program interface.
 """
 
-from typing import Dict, List, Optional, Union
-from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from dataclasses import dataclass, field
 import pygame
-from modules.read_data import Bird, GreenhouseGas, Region, filter_bird_data
-from modules.regression import RegressionModel, MultipleRegression
+# Selection is now in modules.selection (which doesn't need pygame), and is
+# imported here so code that imports it from this module keeps working
+from modules.selection import Selection
+from modules.spatial_index import GridIndex
+from modules.text_cache import TEXT_CACHE
+
+# colour of the text of every button
+TEXT_COLOUR = (0, 0, 0)
 
 
 class Button:
@@ -20,34 +26,94 @@ class Button:
         - text: a pygame surface that displays the name
         - image: the image of the button that will be displayed
         - rect: a pygame rect that holds the button's dimensions and coordinates
+        - computing: whether what the button shows is being computed in the background
     """
     # Private Instance Attributes:
     #   - _font: the font the button text will be displayed in
+    #   - _changed: whether the text changed since the button was last drawn
+    #   - _drawn_area: the area of the screen the button covered when it was
+    #     last drawn, or None if it hasn't been drawn
 
     tag: str
     name: str
     text: pygame.Surface
     image: Optional[pygame.Surface] = None
     rect: pygame.Rect
+    computing: bool
     _font: pygame.font.Font
+    _changed: bool
+    _drawn_area: Optional[pygame.Rect] = None
 
     def __init__(self, tag: str, name: str, font: pygame.font.Font,
                  image: Optional[pygame.Surface] = None) -> None:
         self.tag = tag
         self.name = name
         self._font = font
-        self.text = font.render(self.name, True, (0, 0, 0))
+        self.text = TEXT_CACHE.render(font, self.name, TEXT_COLOUR)
         self.image = image
         if image is not None:
             self.rect = self.image.get_rect()
         else:
             self.rect = self.text.get_rect()
+        self.computing = False
+        self._changed = True
+        self._drawn_area = None
 
     def update_name(self, name: str) -> None:
         """Reassigns text attribute based on name.
+
+        Nothing is rendered (or redrawn) if the name is the same as before.
         """
+        if name == self.name:
+            return
+
         self.name = name
-        self.text = self._font.render(self.name, True, (0, 0, 0))
+        self.text = TEXT_CACHE.render(self._font, self.name, TEXT_COLOUR)
+        self._changed = True
+
+    def update_number(self, prefix: str, number: str, suffix: str = '') -> None:
+        """Reassigns the name to prefix + number + suffix, where the text is made from
+        the cached surfaces of the prefix, the suffix and each character of number, so
+        a new number doesn't render the whole name again.
+
+        Nothing is rendered (or redrawn) if the name is the same as before.
+        """
+        name = prefix + number + suffix
+        if name == self.name:
+            return
+
+        self.name = name
+        self.text = TEXT_CACHE.render_parts(self._font, [prefix] + list(number) + [suffix],
+                                            TEXT_COLOUR)
+        self._changed = True
+
+    def set_computing(self, computing: bool) -> None:
+        """Sets whether what the button shows is being computed in the background."""
+        if computing != self.computing:
+            self.computing = computing
+            self._changed = True
+
+    def get_area(self) -> pygame.Rect:
+        """Returns the area of the screen the button's image and text cover."""
+        return self.rect.union(self.text.get_rect(topleft=self.rect.topleft))
+
+    def get_changed_area(self) -> Optional[pygame.Rect]:
+        """Returns the area of the screen that has to be redrawn because the button
+        changed (its text changed or it moved) since it was last drawn, or None if it
+        didn't change.
+        """
+        area = self.get_area()
+        if self._drawn_area is None:
+            return area
+        elif self._changed or area != self._drawn_area:
+            return area.union(self._drawn_area)
+        else:
+            return None
+
+    def mark_drawn(self) -> None:
+        """Records that the button was drawn as it is now."""
+        self._changed = False
+        self._drawn_area = self.get_area()
 
 
 class InputButton(Button):
@@ -62,9 +128,14 @@ class InputButton(Button):
         - output_button: the button's corresponding output button that changes as
         - prompt: the input prompt the button displays
         the input changes
+        - stale: whether the input changed since the output button was last updated
+        - computing: whether what the button shows is being computed in the background
     """
     # Private Instance Attributes:
     #   - _font: the font the button text will be displayed in
+    #   - _changed: whether the text changed since the button was last drawn
+    #   - _drawn_area: the area of the screen the button covered when it was
+    #     last drawn, or None if it hasn't been drawn
 
     tag: str
     name: str
@@ -73,6 +144,8 @@ class InputButton(Button):
     rect: pygame.Rect
     output_button: Button
     prompt: str
+    stale: bool
+    computing: bool
     _font: pygame.font.Font
 
     def __init__(self, tag: str, prompt: str, font: pygame.font.Font,
@@ -80,128 +153,76 @@ class InputButton(Button):
         Button.__init__(self, tag, prompt, font)
         self.output_button = output_button
         self.prompt = prompt
-        self.name = self.prompt + '0'
-        self.text = self._font.render(self.name, True, (0, 0, 0))
+        self.update_number(self.prompt, '0')
+        self.stale = True
 
 
 @dataclass
 class Page:
     """Class to hold a page to be displayed on the screen with all it's buttons.
 
+    The rects of the buttons are kept in a GridIndex built when the page is made, so
+    finding the buttons under the mouse doesn't check every button. A button whose
+    rect is moved after the page is made has to be passed to update_button.
+
     Instance Attributes:
         - background: a pygame surface with the background image for the page
         - buttons: holds all the buttons that the page has
+
+    Sample Usage:
+    >>> pygame.font.init()
+    >>> font = pygame.font.Font(None, 20)
+    >>> first, second = Button('normal', 'First', font), Button('normal', 'Second', font)
+    >>> second.rect.topleft = (200, 200)
+    >>> page = Page(pygame.Surface((400, 400)), [first, second])
+    >>> page.get_buttons_at((205, 205)) == [second]
+    True
+    >>> second.rect.topleft = (0, 0)
+    >>> page.update_button(second)
+    >>> page.get_buttons_at((5, 5)) == [first, second]
+    True
     """
     background: pygame.Surface
     buttons: List[Button]
 
-
-class Selection:
-    """Class to store and handle user's selections.
-
-    Representation Invariants:
-        - 0 <= self._bird <= 8
-        - 0 <= self._ghg <= 9
-
-    >>> my_selection = Selection()
-    """
-
     # Private Instance Attributes:
-    #   - _region: the user selected region
-    #   - _bird: the user selected bird
-    #   - _ghg: the user selected greenhouse gas
-
-    _region: Optional[str] = None
-    _bird: Optional[int] = None
-    _ghg: Optional[int] = None
-
-    def __init__(self) -> None:
-        self._region = None
-        self._bird = None
-        self._ghg = None
-
-    def handle_selection(self, current_page: int, selection: str) -> None:
-        """Handles what selection the user chooses and updates instance attributes
-        accordingly.
-
-        >>> my_selection = Selection()
-        >>> my_selection.handle_selection(0, 'Alberta')
-        >>> my_selection._region
-        'Alberta'
-        """
-        if current_page == 0:
-            self.change_region(selection)
-        elif current_page == 1:
-            self.change_bird(selection)
-        elif current_page == 2:
-            self.change_ghg(selection)
-
-    def get_model(self, ghg_data: Dict[str, List[GreenhouseGas]],
-                  bird_data: Dict[int, List[str]]) -> Union[RegressionModel, MultipleRegression]:
-        """Returns RegressionModel for current selections (the bird index with respect
-        to the amount of ghg's produced for the selected region).
+    #   - _index: the rects of the buttons
+    #   - _last_query: the position of the last call to get_buttons_at and the buttons
+    #     it returned, or None if the buttons changed since
+    _index: GridIndex = field(init=False, repr=False, compare=False)
+    _last_query: Optional[Tuple[Tuple[int, int], List[Button]]] = field(init=False, repr=False,
+                                                                        compare=False)
+
+    def __post_init__(self) -> None:
+        self._index = GridIndex()
+        self._last_query = None
+        for button in self.buttons:
+            self._index.insert(button, button.rect)
+
+    def get_buttons_at(self, pos: Tuple[int, int]) -> List[Button]:
+        """Returns the buttons whose rect contains pos, in the order of self.buttons.
+
+        The result of the last position is remembered, so asking again for the same
+        position (every frame the mouse doesn't move) doesn't search again.
         """
-        # Filtering data
-        filtered_bird_data = filter_bird_data(bird_data, self._bird)
+        if self._last_query is None or self._last_query[0] != pos:
+            self._last_query = (pos, self._index.query_point(pos))
+        return self._last_query[1]
 
-        # Creating class instances
-        region = Region(ghg_data[self._region])
-        bird = Bird(filtered_bird_data)
+    def add_button(self, button: Button) -> None:
+        """Adds button to the page."""
+        self.buttons.append(button)
+        self._index.insert(button, button.rect)
+        self._last_query = None
 
-        # Finding correct start year for the region
-        if self._region == 'Northwest Territories' or self._region == 'Nunavut':
-            start_year = 1999
-        else:
-            start_year = 1990
-
-        bird.adjust_data(start_year, 2016)
-        bird_list = bird.list_data
-        if self._ghg == 9:
-            region.initialize_lists(start_year, 2016)
-            x_vars = {'CO2': region.co2,
-                      'CH4': region.ch4,
-                      'N2O': region.n2o,
-                      'HFC': region.hfc,
-                      'PFC': region.pfc,
-                      'SF6': region.sf6,
-                      'NF3': region.nf3}
-
-            return MultipleRegression(x_vars, bird_list)
+    def update_button(self, button: Button) -> None:
+        """Updates the index after the rect of button was moved or resized.
 
-        else:
-            ghg_list = region.adjust_list(start_year, 2016, self._ghg)
-
-            return RegressionModel(ghg_list, bird_list)
-
-    def change_region(self, province_name: str) -> None:
-        """Changes region selection to selected region."""
-        self._region = province_name
-
-    def change_bird(self, bird_name: str) -> None:
-        """Changes bird selection to selected bird based on bird_index."""
-        bird_dict = {'Waterfowl': 0,
-                     'Birds of Prey': 1,
-                     'Wetland Birds': 2,
-                     'Seabirds': 3,
-                     'Forest Birds': 4,
-                     'All Other Birds': 5,
-                     'Shorebirds': 6,
-                     'Grassland Birds': 7,
-                     'Aerial Insectivores': 8}
-        self._bird = bird_dict[bird_name]
-
-    def change_ghg(self, ghg_name: str) -> None:
-        """Changes ghg selection to selected ghg based on ghg_index."""
-        ghg_dict = {'CO2': 0,
-                    'CH4': 1,
-                    'N2O': 2,
-                    'HFC': 3,
-                    'PFC': 4,
-                    'SF6': 5,
-                    'NF3': 6,
-                    'Total': 7,
-                    'Multiple Regression': 9}
-        self._ghg = ghg_dict[ghg_name]
+        Preconditions:
+            - button in self.buttons
+        """
+        self._index.update(button, button.rect)
+        self._last_query = None
 
 
 if __name__ == '__main__':
@@ -6,12 +6,25 @@ user inputs and interface objects to interact with each other.
 """
 
 import sys
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 import pygame
 from pygame.locals import *
-from modules.interface_objects import Button, InputButton, Page, Selection
-from modules.read_data import GreenhouseGas
+from modules.assets import AssetLoader
+from modules.interface_objects import Button, InputButton, Page
+from modules.selection import Selection
+from modules.read_data import GHGStore, GreenhouseGas
 from modules.create_pages import create_pages
+from modules.model_table import fit_model_table
+from modules.plot_export import PLOT_TITLE, PLOT_X_LABEL, PLOT_Y_LABEL, get_plot_html, \
+    get_plot_surface
+from modules.regression import RegressionModel
+from modules.tasks import TaskExecutor
+
+# the ways "Show Graph" can show a graph (see InterfaceSystem.plot_mode)
+PLOT_MODES = ('browser', 'window', 'html')
+
+# the caption of the program's window
+WINDOW_TITLE = 'CSC110 Final Project'
 
 
 class InterfaceSystem:
@@ -22,53 +35,121 @@ class InterfaceSystem:
         - current_page: a number indicating which page is currently displayed
         - mouse_pos: the coordinates of the mouse
         - mouse_clicked: whether the mouse is clicked or not
+        - retained: whether draw only redraws the parts of the screen that changed
+          since the last frame, instead of the whole screen
+        - prediction_count: the number of predictions made by update_output
+        - plot_mode: how "Show Graph" shows the graph: 'browser' opens it in a web
+          browser, 'window' shows it in the program's window and 'html' writes it to
+          an HTML file in the plots folder, whose path is shown in the window's caption
 
     Representation Invariants:
         - 0 <= self.current_page <= 4
+        - self.plot_mode in PLOT_MODES
     """
     # Private Instance Attributes:
     #   - _selection: holds the region, bird, and gas chosen by the user
     #   - _focused_button: the button the user is typing on
-    #   - _datasets: a tuple containing 2 mappings. The first index has a mapping of
-    #     region names to a list of GreenhouseGas instances. The second index has a
-    #     mapping of years to a list representing a row of bird data.
+    #   - _datasets: a tuple containing the 2 datasets. The first index has a mapping of
+    #     region names to a list of GreenhouseGas instances (or a GHGStore). The second
+    #     index has a mapping of years to a list representing a row of bird data.
+    #   - _drawn_page: the page that is on the screen, or None if the whole screen
+    #     has to be redrawn on the next frame
+    #   - _hovered_buttons: the buttons that were highlighted on the last frame
+    #   - _highlights: mapping of button sizes and colours to highlight surfaces of that
+    #     size and colour
+    #   - _waited_events: events received by wait_for_events that haven't been handled
+    #   - _assets: loads the images of every page except the first in the background
+    #   - _tasks: fits models, makes predictions and plots graphs in the background
+    #   - _plot: the graph shown over the current page, or None if no graph is shown
 
     pages: List[Page]
     current_page: int
     mouse_pos: Tuple[int, int]
     mouse_clicked: bool
+    retained: bool
+    prediction_count: int
+    plot_mode: str
     _selection: Selection
     _focused_button: Optional[InputButton] = None
-    _datasets: Tuple[Dict[str, List[GreenhouseGas]], Dict[int, List[str]]]
-
-    def __init__(self, ghg_data: Dict[str, List[GreenhouseGas]],
-                 bird_data: Dict[int, List[str]]) -> None:
-        self.pages = create_pages()
+    _datasets: Tuple[Union[Dict[str, List[GreenhouseGas]], GHGStore], Dict[int, List[str]]]
+    _drawn_page: Optional[int] = None
+    _hovered_buttons: List[Button]
+    _highlights: Dict[Tuple[Tuple[int, int], Tuple[int, int, int]], pygame.Surface]
+    _waited_events: List[pygame.event.Event]
+    _assets: AssetLoader
+    _tasks: TaskExecutor
+    _plot: Optional[pygame.Surface] = None
+
+    def __init__(self, ghg_data: Union[Dict[str, List[GreenhouseGas]], GHGStore],
+                 bird_data: Dict[int, List[str]], retained: bool = True,
+                 plot_mode: str = 'browser') -> None:
+        self._assets = AssetLoader()
+        self.pages = create_pages(self._assets)
+        self._assets.start()
         self.current_page = 0
         self.mouse_pos = (0, 0)
         self.mouse_clicked = False
+        self.retained = retained
+        self.prediction_count = 0
+        self.plot_mode = plot_mode
+        self._plot = None
+        self._drawn_page = None
+        self._hovered_buttons = []
+        self._highlights = {}
+        self._waited_events = []
         self._selection = Selection()
         self._focused_button = None
         self._datasets = (ghg_data, bird_data)
+        self._tasks = TaskExecutor()
+        if isinstance(ghg_data, GHGStore):
+            self._selection.use_model_table(fit_model_table(ghg_data, bird_data))
+
+    def wait_for_events(self, timeout: int) -> None:
+        """Waits up to timeout milliseconds for an event to arrive if the system is
+        idle, so that the program doesn't use the CPU while nothing is happening.
+
+        The event is handled by the next call to handle_events.
+        """
+        if self.is_idle() and not self._waited_events:
+            event = pygame.event.wait(timeout)
+            if event.type != NOEVENT:
+                self._waited_events.append(event)
 
     def handle_events(self) -> None:
         """Handles the events the pygame receives(handles mouse movement, mouse clicking
         and typing).
         """
-        for event in pygame.event.get():
+        events = self._waited_events + pygame.event.get()
+        self._waited_events = []
+
+        # Images that finished loading replace their placeholders on the screen
+        if self._assets.poll():
+            self.redraw_all()
+        # Shows the results of the models and predictions finished in the background
+        self._tasks.poll()
+
+        for event in events:
             if event.type == QUIT:
+                self._tasks.shutdown()
                 pygame.quit()
                 sys.exit()
             elif event.type == MOUSEMOTION:
                 self.mouse_pos = event.pos
+            elif event.type == MOUSEBUTTONDOWN and self._plot is not None:
+                # Clicking anywhere closes the graph shown over the page
+                self._plot = None
+                self.redraw_all()
             elif event.type == MOUSEBUTTONDOWN:
                 self.mouse_pos = event.pos
                 self.mouse_clicked = True
+            elif event.type == VIDEOEXPOSE:
+                self.redraw_all()
             elif self._focused_button is not None and event.type == KEYDOWN:
                 self._handle_key_press(event)
 
     def handle_mouse_click(self, button: Button) -> None:
         """Tells program what to do based on what the mouse clicks."""
+        previous_page = self.current_page
         if button.name == 'BACK':
             self._clear_all_input()
             self.current_page -= 1
@@ -76,55 +157,207 @@ class InterfaceSystem:
             if self.current_page == len(self.pages) - 2:
                 self.current_page -= 1
         elif button.name == 'Show Graph':
-            self._plot_graph()
+            self._plot_graph(button)
+        elif button.tag == 'sector':
+            self._next_sector(button)
         elif button.name == 'Multiple Regression':
             self._selection.handle_selection(self.current_page, button.name)
             self.current_page += 2
-            self._update_ghg_coefs()
         elif button.tag == 'normal' and self.current_page < len(self.pages) - 2:
             self._selection.handle_selection(self.current_page, button.name)
             self.current_page += 1
         elif isinstance(button, InputButton):
             self._focused_button = button
 
+        # The selections changed, so the results of the tasks that are still running
+        # are out of date, and the outputs of the new page have to be updated
+        if self.current_page != previous_page:
+            self._tasks.cancel_all()
+            self._mark_inputs_stale()
+            for page_button in self.pages[self.current_page].buttons:
+                if page_button.tag == 'sector':
+                    self._show_sector(page_button)
+            if self.current_page == len(self.pages) - 1:
+                self._update_ghg_coefs()
+
+    def update_outputs(self) -> None:
+        """Updates the output buttons of the input buttons on the current page whose
+        input changed since their output was last updated.
+
+        >>> from modules.read_data import read_bird_data, read_ghg_store
+        >>> i_system = InterfaceSystem(read_ghg_store(), read_bird_data())
+        >>> for name in ['Alberta', 'Waterfowl', 'CO2']:
+        ...     page = i_system.pages[i_system.current_page]
+        ...     i_system.handle_mouse_click([b for b in page.buttons if b.name == name][0])
+        >>> i_system.update_outputs()
+        >>> i_system.finish_tasks()
+        >>> i_system.prediction_count
+        1
+        >>> i_system.update_outputs()  # nothing changed, so nothing is predicted
+        >>> i_system.prediction_count
+        1
+        >>> i_system.pages[i_system.current_page].buttons[1].name
+        'Bird Population Change(From 1970): -129.36 %'
+        """
+        updated_outputs = []
+        for button in self.pages[self.current_page].buttons:
+            if isinstance(button, InputButton) and button.stale:
+                # Inputs that share an output button only need one update
+                if all(button.output_button is not output for output in updated_outputs):
+                    self.update_output(button)
+                    updated_outputs.append(button.output_button)
+                button.stale = False
+
     def update_output(self, input_button: InputButton) -> None:
         """Updates button that shows predicted output from user's input.
 
-        Gets input from the input button's name, gets the corresponding output, and changes
-        the output button's name accordingly to be displayed.
+        Gets input from the input button's name and gets the corresponding output in the
+        background. Once it is ready, handle_events changes the output button's name
+        accordingly to be displayed. A newer input replaces an output still being computed.
         """
         ghg_data, bird_data = self._datasets
-        model = self._selection.get_model(ghg_data, bird_data)
+        selection = self._selection.copy()
+        multiple_regression = self.current_page == len(self.pages) - 1
 
         # Handles multiple regression page
-        if self.current_page == len(self.pages) - 1:
+        if multiple_regression:
             amounts_ghg = self._get_multiple_regression_inputs()
-            output = round(model.predict_value(amounts_ghg[0], amounts_ghg[1], amounts_ghg[2],
-                                               amounts_ghg[3], amounts_ghg[4], amounts_ghg[5],
-                                               amounts_ghg[6]), 2)
         # Handles single variable prediction
         else:
-            amount_ghg = float(input_button.name.replace(input_button.prompt, ''))
-            output = round(model.predict_y(amount_ghg), 2)
-
+            amounts_ghg = [float(input_button.name.replace(input_button.prompt, ''))]
+
+        def predict() -> Optional[float]:
+            model = selection.get_model(ghg_data, bird_data)
+            if not model.has_data():
+                return None
+            elif multiple_regression:
+                return round(model.predict_value(amounts_ghg[0], amounts_ghg[1],
+                                                 amounts_ghg[2], amounts_ghg[3],
+                                                 amounts_ghg[4], amounts_ghg[5],
+                                                 amounts_ghg[6]), 2)
+            else:
+                return round(model.predict_y(amounts_ghg[0]), 2)
+
+        def show_output(output: Optional[float]) -> None:
+            if output is None:
+                output_button.update_name('Bird Population Change(From 1970): no data')
+            else:
+                output_button.update_number('Bird Population Change(From 1970): ',
+                                            str(output), ' %')
+
+        self.prediction_count += 1
         output_button = input_button.output_button
-        output_button.update_name(f'Bird Population Change(From 1970): {output} %')
+        self._tasks.submit(output_button, predict, show_output, [output_button])
 
-    def draw(self, screen: pygame.Surface) -> None:
-        """Draws images onto the screen, displaying all visual aspects."""
+    def finish_tasks(self) -> None:
+        """Waits for the models, predictions and graphs being computed in the background
+        and shows their results.
+        """
+        self._tasks.wait()
+
+    def draw(self, screen: pygame.Surface) -> List[pygame.Rect]:
+        """Draws images onto the screen, displaying all visual aspects.
+
+        Returns the list of areas of the screen that were drawn on. If self.retained is
+        True, only the buttons that changed or whose highlight changed since the last
+        frame are redrawn (the whole screen is redrawn after a page switch).
+        """
         page = self.pages[self.current_page]
-        # Draw background
-        screen.blit(page.background, (0, 0))
-        # Draw buttons to screen
+        hovered_buttons = self._get_hovered_buttons(page)
+
+        if not self.retained or self._drawn_page != self.current_page:
+            # Draw background
+            screen.blit(page.background, (0, 0))
+            # Draw buttons to screen
+            for button in page.buttons:
+                self._draw_button(screen, button, hovered_buttons)
+            # Draw the graph over the page
+            if self._plot is not None:
+                screen.blit(self._plot, self._plot.get_rect(center=screen.get_rect().center))
+
+            self._drawn_page = self.current_page
+            self._hovered_buttons = hovered_buttons
+            return [screen.get_rect()]
+
+        # Nothing under the graph is visible, so nothing has to be redrawn
+        if self._plot is not None:
+            return []
+
+        dirty_rects = []
         for button in page.buttons:
-            if button.image is not None:
-                screen.blit(button.image, button.rect)
-            screen.blit(button.text, button.rect)
-            # Draw highlights if mouse is hovering over button
-            if button.tag not in ('display', 'output') and \
-                    button.rect.collidepoint(self.mouse_pos):
-                surf = create_trans_surf(button.rect.width, button.rect.height, 50, (100, 255, 100))
-                screen.blit(surf, button.rect)
+            changed_area = button.get_changed_area()
+            if changed_area is not None:
+                dirty_rects.append(changed_area)
+        if hovered_buttons != self._hovered_buttons:
+            dirty_rects.extend(button.rect for button in self._hovered_buttons + hovered_buttons
+                               if (button in hovered_buttons) != (button in self._hovered_buttons))
+        self._hovered_buttons = hovered_buttons
+
+        # Redraws the background and buttons only inside each changed area
+        for rect in dirty_rects:
+            screen.set_clip(rect)
+            screen.blit(page.background, rect, rect)
+            for button in page.buttons:
+                if button.get_area().colliderect(rect):
+                    self._draw_button(screen, button, hovered_buttons)
+        screen.set_clip(None)
+
+        return dirty_rects
+
+    def is_idle(self) -> bool:
+        """Returns whether there is nothing to do until the next input event, meaning
+        the screen is up to date and nothing is waiting to be updated.
+        """
+        return self._drawn_page == self.current_page and not self._assets.is_loading() and \
+            not self._tasks.is_busy() and \
+            not any(isinstance(button, InputButton) and button.stale
+                    for button in self.pages[self.current_page].buttons)
+
+    def redraw_all(self) -> None:
+        """Makes the next call to draw redraw the whole screen."""
+        self._drawn_page = None
+
+    def _draw_button(self, screen: pygame.Surface, button: Button,
+                     hovered_buttons: List[Button]) -> None:
+        """Draws button onto the screen, highlighted if it is in hovered_buttons, and
+        greyed out if it is computing.
+        """
+        if button.image is not None:
+            screen.blit(button.image, button.rect)
+        screen.blit(button.text, button.rect)
+        # Draw highlights if mouse is hovering over button
+        if button in hovered_buttons:
+            screen.blit(self._get_highlight(button.rect.size, (100, 255, 100)), button.rect)
+        if button.computing:
+            area = button.get_area()
+            screen.blit(self._get_highlight(area.size, (128, 128, 128)), area)
+        button.mark_drawn()
+
+    def _get_hovered_buttons(self, page: Page) -> List[Button]:
+        """Returns the buttons on page the mouse is hovering over that can be
+        highlighted.
+        """
+        return [button for button in page.get_buttons_at(self.mouse_pos)
+                if button.tag not in ('display', 'output')]
+
+    def get_clicked_buttons(self) -> List[Button]:
+        """Returns the buttons of the current page that were clicked this frame, in the
+        order of the page's buttons, which is empty if the mouse wasn't clicked on a
+        button.
+        """
+        if not self.mouse_clicked:
+            return []
+
+        return list(self.pages[self.current_page].get_buttons_at(self.mouse_pos))
+
+    def _get_highlight(self, size: Tuple[int, int],
+                       colour: Tuple[int, int, int]) -> pygame.Surface:
+        """Returns a highlight surface of the given size and colour, only creating it
+        the first time a highlight of that size and colour is needed.
+        """
+        if (size, colour) not in self._highlights:
+            self._highlights[(size, colour)] = create_trans_surf(size[0], size[1], 50, colour)
+        return self._highlights[(size, colour)]
 
     def _handle_key_press(self, event: pygame.event.Event) -> None:
         """Finds which key is pressed and updates input button."""
@@ -151,34 +384,118 @@ class InterfaceSystem:
         elif event.key == K_BACKSPACE:
             self._update_input('BACKSPACE')
 
-    def _plot_graph(self) -> None:
-        """Plots a graph based on current selections."""
+    def _plot_graph(self, button: Button) -> None:
+        """Plots a graph based on current selections in the background, showing button
+        as computing until the graph is shown, in the way given by self.plot_mode.
+        """
         ghg_data, bird_data = self._datasets
-        model = self._selection.get_model(ghg_data, bird_data)
-        model.plot_data('Percent Change in Bird population (from 1970) vs '
-                        'Amount of Greenhouse gas produced in a year',
-                        'Amount of Greenhouse gas produced in a year (kt)',
-                        'Percent Change in Bird population (from 1970)')
+        selection = self._selection.copy()
+        plot_mode = self.plot_mode
+
+        def plot() -> Union[None, str, RegressionModel]:
+            model = selection.get_model(ghg_data, bird_data)
+            if not model.has_data():
+                return model
+            elif plot_mode == 'browser':
+                model.plot_data(PLOT_TITLE, PLOT_X_LABEL, PLOT_Y_LABEL)
+            elif plot_mode == 'html':
+                return get_plot_html(selection.get_key(ghg_data, bird_data), model)
+            else:
+                return model
+            return None
+
+        def show_plot(result: Union[None, str, RegressionModel]) -> None:
+            # The window and fonts are only used from the main thread, so the graph is
+            # drawn and the path of the HTML file is shown here
+            if isinstance(result, str):
+                pygame.display.set_caption(f'{WINDOW_TITLE} - graph saved to {result}')
+            elif result is not None and not result.has_data():
+                pygame.display.set_caption(f'{WINDOW_TITLE} - no data to plot')
+            else:
+                pygame.display.set_caption(WINDOW_TITLE)
+                if result is not None:
+                    self._plot = get_plot_surface(selection.get_key(ghg_data, bird_data),
+                                                  result)
+                    self.redraw_all()
+
+        def show_error(error: Exception) -> None:
+            # The name of the button is what makes it show a graph, so the error is
+            # shown in the caption of the window instead
+            pygame.display.set_caption(f'{WINDOW_TITLE} - the graph could not be made: '
+                                       f'{type(error).__name__}: {error}')
+
+        self._tasks.submit('plot', plot, show_plot, [button], show_error)
 
     def _update_ghg_coefs(self) -> None:
-        """Updates the names of buttons that display the greenhouse gases'
-        multiple regression coefficients.
+        """Fits the multiple regression model of the current selections in the background,
+        then updates the names of buttons that display the greenhouse gases' multiple
+        regression coefficients.
         """
         ghg_data, bird_data = self._datasets
-        model = self._selection.get_model(ghg_data, bird_data)
-        page = self.pages[self.current_page]
-        for button in page.buttons:
-            if button.tag == 'display':
+        selection = self._selection.copy()
+        display_buttons = [button for button in self.pages[self.current_page].buttons
+                           if button.tag == 'display']
+
+        def get_coefs() -> Optional[Dict[str, float]]:
+            model = selection.get_model(ghg_data, bird_data)
+            return model.coef if model.has_data() else None
+
+        def show_coefs(coef: Optional[Dict[str, float]]) -> None:
+            for button in display_buttons:
                 gas = button.name[0:3]
-                weight = '{:.2e}'.format(model.coef[gas])
+                weight = 'no data' if coef is None else '{:.2e}'.format(coef[gas])
                 button.update_name(f'{gas} Weight: {weight}')
 
+        def show_error(error: Exception) -> None:
+            # The names of the buttons start with their gas, so the gas is kept
+            for button in display_buttons:
+                button.update_name(f'{button.name[0:3]} Weight: {type(error).__name__}')
+
+        self._tasks.submit('coefficients', get_coefs, show_coefs, display_buttons, show_error)
+
+    def _next_sector(self, button: Button) -> None:
+        """Changes the sector selection to the next sector that has data for the
+        selected region, and shows its name on button.
+
+        Only the total of every sector can be chosen if the greenhouse gas data isn't
+        a GHGStore.
+        """
+        ghg_data = self._datasets[0]
+        if not isinstance(ghg_data, GHGStore):
+            return
+
+        region = self._selection.get_region()
+        sectors = [category for category in sorted(ghg_data.category_names)
+                   if ghg_data.has_series(region, category)]
+        current = self._selection.get_sector()
+        if current in sectors:
+            sector = sectors[(sectors.index(current) + 1) % len(sectors)]
+        else:
+            sector = sectors[0]
+
+        self._selection.change_sector(sector)
+        self._show_sector(button)
+
+    def _show_sector(self, button: Button) -> None:
+        """Shows the name of the selected sector on button, resizing it to the name so
+        only the name can be clicked.
+
+        Preconditions:
+            - button in self.pages[self.current_page].buttons
+        """
+        ghg_data = self._datasets[0]
+        if isinstance(ghg_data, GHGStore):
+            button.update_name(f'Sector: {ghg_data.category_names[self._selection.get_sector()]}')
+            button.rect = button.text.get_rect(center=button.rect.center)
+            self.pages[self.current_page].update_button(button)
+
     def _clear_all_input(self) -> None:
         """Sets all inputs to 0."""
         page = self.pages[self.current_page]
         for button in page.buttons:
             if isinstance(button, InputButton):
-                button.update_name(button.prompt + '0')
+                button.update_number(button.prompt, '0')
+                button.stale = True
 
     def _update_input(self, character: str) -> None:
         """Updates button that shows user input.
@@ -196,7 +513,16 @@ class InterfaceSystem:
         elif character != 'BACKSPACE':
             input_so_far.append(character)
 
-        button.update_name(button.prompt + ''.join(input_so_far))
+        button.update_number(button.prompt, ''.join(input_so_far))
+        button.stale = True
+
+    def _mark_inputs_stale(self) -> None:
+        """Marks every input button on the current page as changed, so its output
+        is updated by the next call to update_outputs.
+        """
+        for button in self.pages[self.current_page].buttons:
+            if isinstance(button, InputButton):
+                button.stale = True
 
     def _get_multiple_regression_inputs(self) -> List[float]:
         """Returns a list of all the quantities of gas the user inputted
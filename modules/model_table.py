@@ -0,0 +1,370 @@
+"""
+Model Table
+
+Module that contains a class and a function to fit every single variable
+regression model (region x greenhouse gas x bird) in one vectorized pass, and to
+update them when new years are added to the datasets.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from modules.read_data import GAS_NAMES, GHGStore, filter_bird_data, get_year_range
+from modules.regression import RegressionModel, RunningRegression
+
+
+class ModelTable:
+    """A class holding the fitted single variable models of every region, greenhouse
+    gas and bird group.
+
+    Each array is indexed by [region index, gas index, bird index], where the region
+    index is the index of the region in self.regions, the gas index is the same as
+    the one used by Region.adjust_list and the bird index is the same as the one used
+    by filter_bird_data.
+
+    Instance Attributes:
+        - regions: the names of the regions in the table
+        - start_years: the first year of data used for each region
+        - end_year: the last year of data used for every region
+        - category: the CategoryID (sector) of the greenhouse gas data of the models
+        - slopes: the slope of each model
+        - intercepts: the intercept of each model
+        - r_squared: the r squared value of each model
+
+    Representation Invariants:
+        - self.slopes.shape == self.intercepts.shape == self.r_squared.shape
+        - self.slopes.shape == (len(self.regions), len(GAS_NAMES), 9)
+        - len(self.start_years) == len(self.regions)
+
+    Sample Usage:
+    >>> import math
+    >>> from modules.read_data import read_bird_data, read_ghg_store
+    >>> store, bird_data = read_ghg_store(), read_bird_data()
+    >>> table = fit_model_table(store, bird_data)
+    >>> len(table.regions)
+    14
+    >>> model = table.get_model('Alberta', 7, 4)
+    >>> fitted = RegressionModel(store.get_series('Alberta', 7, 1990, 2016),
+    ...                          [filter_bird_data(bird_data, 4)[year]
+    ...                           for year in range(1990, 2017)])
+    >>> math.isclose(model.predict_y(1000.0), fitted.predict_y(1000.0))
+    True
+    >>> math.isclose(model.get_r_squared(), fitted.get_r_squared())
+    True
+
+    The table can be fit up to an earlier year, then extended with the later years:
+
+    >>> table = fit_model_table(store, bird_data, end_year=2010)
+    >>> table.extend(2016)
+    >>> math.isclose(table.get_model('Alberta', 7, 4).predict_y(1000.0),
+    ...              fitted.predict_y(1000.0))
+    True
+    """
+    regions: List[str]
+    start_years: List[int]
+    end_year: int
+    category: int
+    slopes: np.ndarray
+    intercepts: np.ndarray
+    r_squared: np.ndarray
+
+    # Private Instance Attributes:
+    #   - _store: the GHGStore the models were fit from
+    #   - _bird_data: the bird data the models were fit from
+    #   - _region_indexes: mapping of region name to its index in self.regions
+    #   - _bird_series: a 2d array where row i is the bird data of bird index i,
+    #     from the first year of _years to end_year
+    #   - _years: the years of the columns of _bird_series
+    #   - _statistics: the running sums of the fits, which new years are added to
+    _store: GHGStore
+    _bird_data: Dict[int, List[str]]
+    _region_indexes: Dict[str, int]
+    _bird_series: np.ndarray
+    _years: np.ndarray
+    _statistics: RunningRegression
+
+    def __init__(self, store: GHGStore, bird_data: Dict[int, List[str]], regions: List[str],
+                 start_years: List[int], end_year: int, category: int,
+                 bird_series: np.ndarray, statistics: RunningRegression) -> None:
+        """Initialize the table from the output of fit_model_table."""
+        self.regions = regions
+        self.start_years = start_years
+        self.end_year = end_year
+        self.category = category
+        self._store = store
+        self._bird_data = bird_data
+        self._region_indexes = {region: i for i, region in enumerate(regions)}
+        self._bird_series = bird_series
+        self._years = np.arange(end_year - bird_series.shape[1] + 1, end_year + 1)
+        self._statistics = statistics
+        self._update_coefficients()
+
+    def _update_coefficients(self) -> None:
+        """Set the slopes, intercepts and r squared values from self._statistics."""
+        self.slopes = self._statistics.get_slope()
+        self.intercepts = self._statistics.get_intercept()
+        self.r_squared = self._statistics.get_r_squared()
+
+    def extend(self, end_year: Optional[int] = None) -> None:
+        """Update the models with the years after self.end_year up to <end_year>, or up
+        to the last year both datasets have if end_year is None.
+
+        The rows of the new years must already have been added to the datasets the
+        table was fit from (for example with GHGStore.extend), without replacing them.
+        Only the new years are read and added to the running sums of the fits.
+        """
+        if end_year is None:
+            end_year = get_year_range(self._store, self._bird_data)[1]
+        if end_year <= self.end_year:
+            return
+
+        new_birds = _stack_birds(self._bird_data, self.end_year + 1, end_year)
+        ghg, _ = _stack_ghg(self._store, self.regions, self.end_year + 1, end_year,
+                            self.category)
+        self._statistics.add(ghg[:, :, np.newaxis, :], new_birds[np.newaxis, np.newaxis, :, :])
+
+        self._bird_series = np.concatenate((self._bird_series, new_birds), axis=1)
+        self.end_year = end_year
+        self._years = np.arange(end_year - self._bird_series.shape[1] + 1, end_year + 1)
+        self._update_coefficients()
+
+    def is_built_from(self, ghg_data: Any, bird_data: Any) -> bool:
+        """Return whether the table was fit from these exact datasets."""
+        return ghg_data is self._store and bird_data is self._bird_data
+
+    def has_model(self, region: str, start_year: int, end_year: int, category: int = 0) -> bool:
+        """Return whether the table has the models of region fit over the years
+        <start_year> to <end_year> with the emissions of the given category.
+        """
+        return region in self._region_indexes \
+            and self.start_years[self._region_indexes[region]] == start_year \
+            and self.end_year == end_year and self.category == category
+
+    def get_model(self, region: str, ghg: int, bird: int) -> RegressionModel:
+        """Return the RegressionModel of the given region, gas index and bird index,
+        using the fitted coefficients of the table instead of fitting it again.
+
+        Preconditions:
+            - region in self.regions
+            - 0 <= ghg < len(GAS_NAMES)
+            - 0 <= bird <= 8
+        """
+        i = self._region_indexes[region]
+        start = self.start_years[i]
+        ghg_list = self._store.get_series(region, ghg, start, self.end_year, self.category)
+        bird_list = self._bird_series[bird, self._years >= start].tolist()
+
+        return RegressionModel(ghg_list, bird_list,
+                               fit=(float(self.slopes[i, ghg, bird]),
+                                    float(self.intercepts[i, ghg, bird])))
+
+
+def fit_model_table(store: GHGStore, bird_data: Dict[int, List[str]],
+                    regions: Optional[List[str]] = None, start_year: Optional[int] = None,
+                    end_year: Optional[int] = None, category: int = 0) -> ModelTable:
+    """ Return a ModelTable with the single variable model of every region in regions,
+    every greenhouse gas and every bird group, fit over the years <start_year> to
+    <end_year> (or from the first year a region has data, if that is later).
+
+    If start_year or end_year is None, the first or last year that both datasets
+    have is used. If regions is None, every region with data for the category up to
+    end_year is used.
+
+    All the series are stacked into arrays of shape (regions, gases, birds, years),
+    where years outside a region's range are masked out, and the slopes, intercepts and
+    r squared values are computed from the sums of these arrays at once.
+
+    Preconditions:
+        - regions is None or all(store.has_series(region, category) for region in regions)
+        - start_year is None or end_year is None or start_year <= end_year
+        - the bird data has every year that is used
+    """
+    first_year, last_year = get_year_range(store, bird_data)
+    start_year = first_year if start_year is None else start_year
+    end_year = last_year if end_year is None else end_year
+    if regions is None:
+        regions = [region for region in store.region_names
+                   if store.has_series(region, category)
+                   and store.get_years(region, category)[-1] >= end_year]
+
+    bird_series = _stack_birds(bird_data, start_year, end_year)
+    ghg, start_years = _stack_ghg(store, regions, start_year, end_year, category)
+
+    statistics = RunningRegression()
+    statistics.add(ghg[:, :, np.newaxis, :], bird_series[np.newaxis, np.newaxis, :, :])
+
+    return ModelTable(store, bird_data, regions, start_years, end_year, category, bird_series,
+                      statistics)
+
+
+def fit_stacked(x: np.ndarray, y: np.ndarray) -> Dict[str, np.ndarray]:
+    """ Return the slopes, intercepts and r squared values of the least squares fits
+    of y on x along the last axis, where x and y are broadcast together and
+    nan values of x are left out of the fit.
+
+    Like RegressionModel, a constant x gets a slope of 0, and a constant y gets an
+    r squared of 1.0 if it is predicted exactly and 0.0 otherwise. The fits are done
+    with a RunningRegression.
+
+    >>> result = fit_stacked(np.array([[1.0, 2.0, 3.0], [np.nan, 1.0, 2.0]]),
+    ...                       np.array([3.0, 5.0, 7.0]))
+    >>> result['slopes'].tolist(), result['intercepts'].tolist()
+    ([2.0, 2.0], [1.0, 3.0])
+    >>> result['r_squared'].tolist()
+    [1.0, 1.0]
+    """
+    statistics = RunningRegression()
+    statistics.add(x, y)
+
+    return {'slopes': statistics.get_slope(),
+            'intercepts': statistics.get_intercept(),
+            'r_squared': statistics.get_r_squared()}
+
+
+def fit_rolling(x: np.ndarray, y: np.ndarray, width: int) -> Dict[str, np.ndarray]:
+    """ Return the slopes, intercepts, r squared values and counts of the least squares
+    fits of y on x over every window of <width> consecutive values along the last axis,
+    where x and y are broadcast together and nan values are left out like in
+    fit_stacked. The last axis of the results is the window, by its first position.
+
+    The windows aren't fit one by one. The values are split into blocks of <width>,
+    and a RunningRegression keeps the running statistics of the end of each block
+    (adding one value at a time from the right) and of the start of the next block
+    (adding one value at a time from the left). Every window is the end of one block
+    merged with the start of the next, so each window costs one merge. Unlike
+    subtracting the values that leave a window from running sums, merging never
+    cancels large emission values, so a window of constant x still gets a slope of 0.
+
+    Preconditions:
+        - 1 <= width <= x.shape[-1]
+
+    >>> x = np.array([0.0, 0.0, 0.0, 1.0, 2.0, 4.0, 8.0])
+    >>> y = np.array([5.0, 6.0, 4.0, 3.0, 5.0, 9.0, 17.0])
+    >>> result = fit_rolling(x, y, 3)
+    >>> result['slopes'].tolist(), result['counts'].tolist()
+    ([0.0, -2.0, 0.5, 2.0, 2.0], [3.0, 3.0, 3.0, 3.0, 3.0])
+    >>> windows = np.arange(5)[:, np.newaxis] + np.arange(3)  # the positions of each window
+    >>> separate = fit_stacked(x[windows], y[windows])
+    >>> all(bool(np.allclose(result[name], separate[name]))
+    ...     for name in ['slopes', 'intercepts', 'r_squared'])
+    True
+    """
+    x, y = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+    length = x.shape[-1]
+    blocks = -(-length // width)
+
+    # split the values into blocks of width, padding the last block with nan, and line
+    # up each block with the block after it
+    padding = [(0, 0)] * (x.ndim - 1) + [(0, blocks * width - length + width)]
+    x_blocks, y_blocks = (np.pad(values, padding, constant_values=np.nan)
+                          .reshape(x.shape[:-1] + (blocks + 1, width)) for values in (x, y))
+    x_next, y_next = x_blocks[..., 1:, :], y_blocks[..., 1:, :]
+    x_blocks, y_blocks = x_blocks[..., :-1, :], y_blocks[..., :-1, :]
+
+    # starts[j] has the first j + 1 values of the next block
+    starts = []
+    statistics = RunningRegression()
+    for j in range(width - 1):
+        statistics.add(x_next[..., j:j + 1], y_next[..., j:j + 1])
+        starts.append(statistics.copy())
+
+    # windows[j] are the windows starting at position j of each block
+    windows = [RunningRegression() for _ in range(width)]
+    statistics = RunningRegression()
+    for j in range(width - 1, -1, -1):
+        statistics.add(x_blocks[..., j:j + 1], y_blocks[..., j:j + 1])
+        windows[j] = statistics.copy()
+        if j > 0:
+            windows[j].merge(starts[j - 1])
+
+    def stack(results: List[np.ndarray]) -> np.ndarray:
+        stacked = np.stack(np.broadcast_arrays(*results), axis=-1)
+        return stacked.reshape(stacked.shape[:-2] + (-1,))[..., :length - width + 1]
+
+    return {'slopes': stack([window.get_slope() for window in windows]),
+            'intercepts': stack([window.get_intercept() for window in windows]),
+            'r_squared': stack([window.get_r_squared() for window in windows]),
+            'counts': stack([window.count for window in windows])}
+
+
+def fit_rolling_table(store: GHGStore, bird_data: Dict[int, List[str]], regions: List[str],
+                      width: int, start_year: Optional[int] = None,
+                      end_year: Optional[int] = None, category: int = 0) -> Dict[str, np.ndarray]:
+    """ Return the rolling regressions of every region in regions, every greenhouse gas
+    and every bird group over every window of <width> years from <start_year> to
+    <end_year> (the first and last years both datasets have if they are None).
+
+    The slopes, intercepts, r squared values and counts are indexed by [region index,
+    gas index, bird index, window] like the arrays of ModelTable, and 'start_years' has
+    the first year of each window, so they can be plotted against it directly. Years
+    a region has no data for are left out of its windows.
+
+    Preconditions:
+        - all(store.has_series(region, category) for region in regions)
+        - 1 <= width <= end_year - start_year + 1
+        - the bird data has every year that is used
+
+    >>> import math
+    >>> from modules.read_data import read_bird_data, read_ghg_store
+    >>> store, bird_data = read_ghg_store(), read_bird_data()
+    >>> rolling = fit_rolling_table(store, bird_data, ['Alberta', 'Canada'], 10)
+    >>> rolling['start_years'].tolist()[:3], rolling['slopes'].shape
+    ([1990, 1991, 1992], (2, 8, 9, 18))
+    >>> fitted = RegressionModel(store.get_series('Canada', 0, 2000, 2009),
+    ...                          [filter_bird_data(bird_data, 4)[year]
+    ...                           for year in range(2000, 2010)])
+    >>> math.isclose(rolling['slopes'][1, 0, 4, 10], fitted.get_slope())
+    True
+    >>> math.isclose(rolling['r_squared'][1, 0, 4, 10], fitted.get_r_squared(), abs_tol=1e-6)
+    True
+    """
+    first_year, last_year = get_year_range(store, bird_data)
+    start_year = first_year if start_year is None else start_year
+    end_year = last_year if end_year is None else end_year
+
+    bird_series = _stack_birds(bird_data, start_year, end_year)
+    ghg, _ = _stack_ghg(store, regions, start_year, end_year, category)
+
+    result = fit_rolling(ghg[:, :, np.newaxis, :], bird_series[np.newaxis, np.newaxis, :, :],
+                         width)
+    result['start_years'] = np.arange(start_year, end_year - width + 2)
+    return result
+
+
+def _stack_birds(bird_data: Dict[int, List[str]], start_year: int,
+                 end_year: int) -> np.ndarray:
+    """ Return a 2d array where row i is the bird data of bird index i over the years
+    <start_year> to <end_year>.
+    """
+    return np.array([list(filter_bird_data(bird_data, bird, start_year, end_year).values())
+                     for bird in range(9)], dtype=float)
+
+
+def _stack_ghg(store: GHGStore, regions: List[str], start_year: int, end_year: int,
+               category: int) -> Tuple[np.ndarray, List[int]]:
+    """ Return an array where [r, g, t] is the emission of gas g in regions[r] in the
+    year start_year + t (nan if there is no data), and the first year each region has
+    data in this range.
+    """
+    ghg = np.full((len(regions), len(GAS_NAMES), end_year - start_year + 1), np.nan)
+    start_years = []
+    for i, region in enumerate(regions):
+        first, stop = store.get_span(region, category, start_year, end_year)
+        ghg[i][:, store.years[first:stop] - start_year] = store.gases[:, first:stop]
+        start_years.append(int(store.years[first]) if stop > first else start_year)
+
+    return (ghg, start_years)
+
+
+if __name__ == '__main__':
+    # import python_ta
+    # python_ta.check_all(config={
+    #     'max-line-length': 100,
+    #     'extra-imports': ['python_ta.contracts', 'dataclasses', 'datetime'],
+    #     'disable': ['R1705', 'C0200'],
+    # })
+
+    # import python_ta.contracts
+    # python_ta.contracts.DEBUG_CONTRACTS = False
+    # python_ta.contracts.check_all_contracts()
+
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,176 @@
+"""
+Plot Export
+
+Module contains functions to show the plot of a regression model without a web
+browser, either drawn on a pygame surface or written to an HTML file.
+
+Plots are cached on disk in the plots folder, named after the selections they
+were made for and a digest of the data they show, so showing the same plot again
+only reads the file.
+"""
+
+import hashlib
+import os
+from typing import Optional, Tuple
+import numpy as np
+import pygame
+from modules.regression import RegressionModel
+
+# the folder the plots are written to
+PLOT_FOLDER = 'plots'
+
+# labels of the plot shown by the "Show Graph" button
+PLOT_TITLE = 'Percent Change in Bird population (from 1970) vs ' \
+             'Amount of Greenhouse gas produced in a year'
+PLOT_X_LABEL = 'Amount of Greenhouse gas produced in a year (kt)'
+PLOT_Y_LABEL = 'Percent Change in Bird population (from 1970)'
+
+# colours of the plot, the same as plotly's default colours
+POINT_COLOUR = (99, 110, 250)
+LINE_COLOUR = (239, 85, 59)
+AXIS_COLOUR = (60, 60, 60)
+BACKGROUND_COLOUR = (255, 255, 255)
+
+
+def plot_name(key: tuple, model: RegressionModel) -> str:
+    """Return the file name (without an extension) of the plot of model, where key is
+    the selection key of the model (see Selection.get_key).
+
+    >>> model = RegressionModel([1.0, 2.0, 3.0], [2.0, 4.0, 7.0])
+    >>> plot_name(('Alberta', 4, 0, 1990, 2016), model)[:26]
+    'Alberta_4_0_1990_2016_f8b0'
+    """
+    ghg_data, bird_data = model.get_data()
+    digest = hashlib.sha1(np.array([ghg_data, bird_data], dtype=float).tobytes()).hexdigest()
+    name = '_'.join(str(part) for part in key).replace(' ', '-')
+    return f'{name}_{digest[:12]}'
+
+
+def get_plot_surface(key: tuple, model: RegressionModel, size: Tuple[int, int] = (800, 560),
+                     folder: str = PLOT_FOLDER) -> pygame.Surface:
+    """Return a surface of the given size with the plot of model, reading it from the
+    PNG cached in folder if there is one, and drawing and caching it otherwise.
+
+    Preconditions:
+        - model.has_data()
+    """
+    path = os.path.join(folder, f'{plot_name(key, model)}_{size[0]}x{size[1]}.png')
+    surface = read_plot_surface(path)
+    if surface is None:
+        surface = draw_plot(model, size, PLOT_TITLE, PLOT_X_LABEL, PLOT_Y_LABEL)
+        try:
+            os.makedirs(folder, exist_ok=True)
+            pygame.image.save(surface, path)
+        except (OSError, pygame.error):
+            pass
+    return surface
+
+
+def read_plot_surface(path: str) -> Optional[pygame.Surface]:
+    """Return the plot image at path, or None if it isn't there."""
+    if not os.path.exists(path):
+        return None
+    try:
+        return pygame.image.load(path)
+    except pygame.error:
+        return None
+
+
+def get_plot_html(key: tuple, model: RegressionModel, folder: str = PLOT_FOLDER) -> str:
+    """Return the path of an HTML file in folder with the plot of model, only writing
+    the file if it isn't already there.
+
+    Preconditions:
+        - model.has_data()
+    """
+    path = os.path.join(folder, f'{plot_name(key, model)}.html')
+    if not os.path.exists(path):
+        os.makedirs(folder, exist_ok=True)
+        temporary_path = path + '.tmp'
+        model.export_html(temporary_path, PLOT_TITLE, PLOT_X_LABEL, PLOT_Y_LABEL)
+        os.replace(temporary_path, path)
+    return path
+
+
+def draw_plot(model: RegressionModel, size: Tuple[int, int], title: str, x_label: str,
+              y_label: str) -> pygame.Surface:
+    """Return a surface of the given size with a scatter plot of the data of model and
+    its line of best fit, like the figure of RegressionModel.plot_data.
+
+    Preconditions:
+        - model.has_data()
+
+    >>> pygame.font.init()
+    >>> surface = draw_plot(RegressionModel([1.0, 2.0, 3.0], [2.0, 4.0, 7.0]), (400, 300),
+    ...                     'Title', 'x', 'y')
+    >>> surface.get_size()
+    (400, 300)
+    """
+    width, height = size
+    left, right, top, bottom = 80, 40, 50, 60
+    surface = pygame.Surface(size)
+    surface.fill(BACKGROUND_COLOUR)
+
+    font = pygame.font.Font(None, 18)
+    ghg_data, bird_data = model.get_data()
+    x_range = (min(ghg_data), max(ghg_data))
+    line = (model.predict_y(x_range[0]), model.predict_y(x_range[1]))
+    y_range = (min(bird_data + list(line)), max(bird_data + list(line)))
+
+    def to_screen(x: float, y: float) -> Tuple[int, int]:
+        """Return the position on the surface of the point (x, y) of the plot."""
+        x_span = (x_range[1] - x_range[0]) or 1.0
+        y_span = (y_range[1] - y_range[0]) or 1.0
+        return (round(left + (x - x_range[0]) / x_span * (width - left - right)),
+                round(height - bottom - (y - y_range[0]) / y_span * (height - top - bottom)))
+
+    # Axes with 5 labelled ticks each
+    origin = (left, height - bottom)
+    pygame.draw.line(surface, AXIS_COLOUR, origin, (width - right, height - bottom))
+    pygame.draw.line(surface, AXIS_COLOUR, origin, (left, top))
+    for i in range(5):
+        x = x_range[0] + (x_range[1] - x_range[0]) * i / 4
+        y = y_range[0] + (y_range[1] - y_range[0]) * i / 4
+        x_tick, y_tick = to_screen(x, y)
+        pygame.draw.line(surface, AXIS_COLOUR, (x_tick, height - bottom),
+                         (x_tick, height - bottom + 5))
+        pygame.draw.line(surface, AXIS_COLOUR, (left - 5, y_tick), (left, y_tick))
+        x_text = font.render(f'{x:.4g}', True, AXIS_COLOUR)
+        y_text = font.render(f'{y:.4g}', True, AXIS_COLOUR)
+        surface.blit(x_text, x_text.get_rect(midtop=(x_tick, height - bottom + 8)))
+        surface.blit(y_text, y_text.get_rect(midright=(left - 8, y_tick)))
+
+    # Data points and line of best fit
+    for x, y in zip(ghg_data, bird_data):
+        pygame.draw.circle(surface, POINT_COLOUR, to_screen(x, y), 4)
+    pygame.draw.line(surface, LINE_COLOUR, to_screen(x_range[0], line[0]),
+                     to_screen(x_range[1], line[1]), 2)
+
+    # Title and axis labels
+    title_text = font.render(f'{title}    R^2 = {model.get_r_squared()}', True, AXIS_COLOUR)
+    surface.blit(title_text, title_text.get_rect(midtop=(width // 2, 15)))
+    x_text = font.render(x_label, True, AXIS_COLOUR)
+    surface.blit(x_text, x_text.get_rect(midbottom=((left + width - right) // 2, height - 10)))
+    y_text = pygame.transform.rotate(font.render(y_label, True, AXIS_COLOUR), 90)
+    surface.blit(y_text, y_text.get_rect(midleft=(10, (top + height - bottom) // 2)))
+
+    return surface
+
+
+if __name__ == '__main__':
+    # import python_ta
+
+    # python_ta.check_all(config={
+    #     'max-line-length': 100,
+    #     'extra-imports': ['python_ta.contracts', 'dataclasses', 'datetime'],
+    #     'disable': ['R1705', 'C0200'],
+    # })
+
+    # import python_ta.contracts
+
+    # python_ta.contracts.DEBUG_CONTRACTS = False
+    # python_ta.contracts.check_all_contracts()
+
+    import doctest
+
+    doctest.testmod()
@@ -3,14 +3,40 @@ Module that contains classes and functions which
 read and process the data
 """
 import csv
+import os
 from dataclasses import dataclass
-from typing import List, Dict, Optional
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple, Union
+import numpy as np
 
+# names of the greenhouse gas columns, in the order used by the gas indexes
+GAS_NAMES = ('co2', 'ch4', 'n2o', 'hfc', 'pfc', 'sf6', 'nf3', 'total')
 
-@dataclass
+# columns of 'GHG.csv' holding each gas in GAS_NAMES
+_GHG_CSV_COLUMNS = (5, 6, 8, 10, 11, 12, 13, 14)
+
+# headers of the columns of a greenhouse gas csv file read by stream_ghg_store: the
+# year, region, CategoryID and category name, then each gas in GAS_NAMES
+_GHG_CSV_HEADERS = ('Year', 'Region', 'CategoryID', 'Category',
+                    'CO2', 'CH4', 'N2O', 'HFCs', 'PFCs', 'SF6', 'NF3', 'CO2eq')
+
+# other spellings of region names in the greenhouse gas data set: some of the rows of
+# Canada are under 'canada', so they are read as rows of 'Canada'
+_REGION_ALIASES = {'canada': 'Canada'}
+
+# names of the bird groups, in the order of the columns used by filter_bird_data
+BIRD_NAMES = ('Waterfowl', 'Birds of Prey', 'Wetland Birds', 'Seabirds', 'Forest Birds',
+              'All Other Birds', 'Shorebirds', 'Grassland Birds', 'Aerial Insectivores')
+
+
+@dataclass(frozen=True)
 class GreenhouseGas:
     """ dataclass representing greenhouse gas emissions of a region in a given year
 
+    The rows are frozen and use __slots__, so a row has no __dict__. The float values
+    take most of the memory of a row, so this only saves an eighth to a fifth of it
+    (every row of 'GHG.csv' takes 11.6 MB instead of 13.2 MB on Python 3.11 and 14.3 MB
+    on Python 3.8, see benchmarks/memory.py).
+
     Instance Attributes:
         - year: year of the given data
         - region: region of the given data
@@ -36,92 +62,280 @@ class GreenhouseGas:
     nf3: float
     total: float
 
+    # declared by hand, since dataclass only makes __slots__ from Python 3.10
+    __slots__ = ('year', 'region', 'co2', 'ch4', 'n2o', 'hfc', 'pfc', 'sf6', 'nf3', 'total')
+
+    def __getstate__(self) -> tuple:
+        """Return the values of the fields, so the row can be pickled and copied.
+
+        >>> import copy
+        >>> row = GreenhouseGas(1990, 'Yukon', 1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 28.0)
+        >>> copy.copy(row) == row
+        True
+        """
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state: tuple) -> None:
+        """Set the fields to the values in state, which the row is frozen against."""
+        for name, value in zip(self.__slots__, state):
+            object.__setattr__(self, name, value)
+
+
+class GHGStore:
+    """ A class holding every row of the 'GHG.csv' file as columns of numpy arrays
+
+    The rows are sorted by region, category and year, so all the rows of one region
+    and category are next to each other and a series can be returned as a view of
+    the columns instead of a new list.
+
+    Instance Attributes:
+        - years: the year of each row
+        - region_codes: the index in region_names of the region of each row
+        - category_ids: the CategoryID of each row
+        - gases: a 2d array where gases[i] is the column of the gas at index i,
+                 using the same indexes as Region.adjust_list
+        - region_names: the names of all the regions, indexed by region code
+        - category_names: mapping of CategoryID to the name of the category
+
+    Representation Invariants:
+        - self.gases.shape == (len(GAS_NAMES), len(self.years))
+        - len(self.years) == len(self.region_codes) == len(self.category_ids)
+        - all(0 <= code < len(self.region_names) for code in self.region_codes)
+
+    Sample Usage:
+    >>> store = read_ghg_store()
+    >>> len(store)
+    33348
+    >>> store.category_names[510]
+    'Enteric Fermentation'
+    >>> int(store.get_years('Nunavut')[0])
+    1999
+    >>> alberta_co2 = store.get_series('Alberta', 0, 1990, 1991)
+    >>> [round(value, 4) for value in alberta_co2.tolist()]
+    [129920.0044, 129879.9633]
+    >>> alberta_co2.base is not None  # a view, not a copy
+    True
+    """
+    years: np.ndarray
+    region_codes: np.ndarray
+    category_ids: np.ndarray
+    gases: np.ndarray
+    region_names: List[str]
+    category_names: Dict[int, str]
+
+    # Private Attributes
+    #   - _index: mapping of (region name, category id) to the start and stop
+    #     of the rows of that series
+    _index: Dict[Tuple[str, int], Tuple[int, int]]
+
+    def __init__(self, years: np.ndarray, region_codes: np.ndarray, category_ids: np.ndarray,
+                 gases: np.ndarray, region_names: List[str],
+                 category_names: Dict[int, str]) -> None:
+        """Initialize the store, sorting the rows by region, category and year
+
+        Preconditions:
+            - gases.shape == (len(GAS_NAMES), len(years))
+            - len(years) == len(region_codes) == len(category_ids)
+        """
+        self._set_rows(years, region_codes, category_ids, gases, region_names, category_names)
+
+    def __len__(self) -> int:
+        return len(self.years)
+
+    def _set_rows(self, years: np.ndarray, region_codes: np.ndarray, category_ids: np.ndarray,
+                  gases: np.ndarray, region_names: List[str],
+                  category_names: Dict[int, str]) -> None:
+        """ Set the rows of the store, sorted by region, category and year, and
+        rebuild _index.
+
+        Note: This is a private method used only by __init__ and extend.
+        """
+        order = np.lexsort((years, category_ids, region_codes))
+        self.years = years[order]
+        self.region_codes = region_codes[order]
+        self.category_ids = category_ids[order]
+        self.gases = np.ascontiguousarray(gases[:, order])
+        self.region_names = list(region_names)
+        self.category_names = category_names
+        self._index = self._build_index()
+
+    def extend(self, other: 'GHGStore') -> None:
+        """ Add the rows of other to the store, for example the rows of new years that
+        were added to the end of the csv file, without parsing the old rows again.
+
+        Regions and categories that are new are added to region_names and
+        category_names. Series views returned before the call keep the old rows.
+
+        Preconditions:
+            - no region, category and year has a row in both self and other
+
+        >>> store = read_ghg_store()
+        >>> new_rows = GHGStore(np.array([2019]), np.array([0]), np.array([0]),
+        ...                     np.ones((len(GAS_NAMES), 1)), ['Yukon'], {0: 'TOTAL'})
+        >>> store.extend(new_rows)
+        >>> len(store), store.get_years('Yukon').tolist()[-2:]
+        (33349, [2018, 2019])
+        """
+        region_names = self.region_names + [name for name in other.region_names
+                                            if name not in self.region_names]
+        codes = np.array([region_names.index(name) for name in other.region_names],
+                         dtype=self.region_codes.dtype)
+
+        self._set_rows(np.concatenate((self.years, other.years.astype(self.years.dtype))),
+                       np.concatenate((self.region_codes, codes[other.region_codes])),
+                       np.concatenate((self.category_ids,
+                                       other.category_ids.astype(self.category_ids.dtype))),
+                       np.concatenate((self.gases, other.gases), axis=1),
+                       region_names, {**other.category_names, **self.category_names})
+
+    def _build_index(self) -> Dict[Tuple[str, int], Tuple[int, int]]:
+        """ Return a mapping of each (region name, category id) pair to the start
+        and stop of its rows.
+
+        Note: This is a private method used only to initialize _index.
+        """
+        if len(self.years) == 0:
+            return {}
+
+        changes = np.flatnonzero((np.diff(self.region_codes) != 0)
+                                 | (np.diff(self.category_ids) != 0)) + 1
+        starts = [0] + changes.tolist()
+        stops = changes.tolist() + [len(self.years)]
+
+        index = {}
+        for start, stop in zip(starts, stops):
+            region = self.region_names[self.region_codes[start]]
+            index[(region, int(self.category_ids[start]))] = (start, stop)
+
+        return index
+
+    def has_series(self, region: str, category: int = 0) -> bool:
+        """Return whether there is any data for the given region and category"""
+        return (region, category) in self._index
+
+    def get_span(self, region: str, category: int = 0, start: Optional[int] = None,
+                 end: Optional[int] = None) -> Tuple[int, int]:
+        """ Return the start and stop of the rows for the given region and category,
+        limited to the years <start> to <end> inclusive when they are given.
+
+        Preconditions:
+            - self.has_series(region, category)
+        """
+        first, stop = self._index[(region, category)]
+        years = self.years[first:stop]
+        lower = 0 if start is None else int(np.searchsorted(years, start, 'left'))
+        upper = len(years) if end is None else int(np.searchsorted(years, end, 'right'))
+
+        return (first + lower, first + upper)
+
+    def get_years(self, region: str, category: int = 0) -> np.ndarray:
+        """ Return a view of the years that have data for the given region and category
+
+        Preconditions:
+            - self.has_series(region, category)
+        """
+        first, stop = self.get_span(region, category)
+        return self.years[first:stop]
+
+    def get_series(self, region: str, index: int, start: Optional[int] = None,
+                   end: Optional[int] = None, category: int = 0) -> np.ndarray:
+        """ Return a view of the emissions of the gas at <index> for the given region
+        and category, ordered by year and limited to the years <start> to <end>.
+
+        The index is the same as the one used by Region.adjust_list.
+
+        Preconditions:
+            - 0 <= index < 8
+            - self.has_series(region, category)
+        """
+        first, stop = self.get_span(region, category, start, end)
+        return self.gases[index, first:stop]
+
 
 class Region:
     """ A class representing the greenhouse gas emission data of a specific region
     in Canada (a province or territory)
 
+    The data is held in one array per gas (see GHGStore), and the lists returned by
+    adjust_list and set by initialize_lists are views of these arrays, not copies.
+
     Instance attributes:
-        - co2: a list representing the amount of co2 emissions for the given
+        - co2: an array representing the amount of co2 emissions for the given
                region in chronological order
-        - ch4: a list representing the amount of ch4 emissions for the given
+        - ch4: an array representing the amount of ch4 emissions for the given
                region in chronological order
-        - hfc: a list representing the amount of hfc emissions for the given
+        - hfc: an array representing the amount of hfc emissions for the given
                region in chronological order
-        - pfc: a list representing the amount of pfc emissions for the given
+        - pfc: an array representing the amount of pfc emissions for the given
                region in chronological order
-        - sf6: a list representing the amount of sf6 emissions for the given
+        - sf6: an array representing the amount of sf6 emissions for the given
                region in chronological order
-        - nf3: a list representing the amount of nf3 emissions for the given
+        - nf3: an array representing the amount of nf3 emissions for the given
                region in chronological order
         - total: the total amount of greenhouse gas emissions in data
 
     Representation Invariants:
         - the list of GreenhouseGas is a value from the dictionary returned by read_ghg_data
 
-        - all(attribute != [] for attribute in
-              {self.co2, self.ch4, self.n2o, self.hfc, self.pfc, self.sf6, self.nf3})
+        - all(len(element1) == len(element2) or (element1 is None and element2 is None)
+              for element1 in [self.co2, self.ch4, self.n2o, self.hfc, self.pfc, self.sf6,
+                               self.nf3]
+              for element2 in [self.co2, self.ch4, self.n2o, self.hfc, self.pfc, self.sf6,
+                               self.nf3])
 
-        - all(len(element1) == len(element2) or (element1 == None and element2 == None)
-              for element1 in {self.co2, self.ch4, self.n2o, self.hfc, self.pfc, self.sf6, self.nf3}
-              for element2 in {self.co2, self.ch4, self.n2o, self.hfc, self.pfc, self.sf6, self.nf3})
+        - self._gases.shape == (len(GAS_NAMES), len(self._years))
 
-        - all(type(self.co2) == type(element)
-              for element in {self.ch4, self.n2o, self.hfc, self.pfc, self.sf6, self.nf3})
-
-        - len(self._dict_data) >= len(self.co2) or self.co2 == None
+        - self.co2 is None or len(self._years) >= len(self.co2)
 
     Sample Usage:
     >>> data = read_ghg_data(10)
     >>> alberta = Region(data['Alberta'])
-    >>> alberta.co2 == None
+    >>> alberta.co2 is None
     True
-    >>> alberta.initialize_lists
-    >>> alberta.co2 == None
-    False
+    >>> alberta.initialize_lists(1990, 1999)
+    >>> len(alberta.co2)
+    10
     """
-    co2: Optional[List[float]] = None
-    ch4: Optional[List[float]] = None
-    n2o: Optional[List[float]] = None
-    hfc: Optional[List[float]] = None
-    pfc: Optional[List[float]] = None
-    sf6: Optional[List[float]] = None
-    nf3: Optional[List[float]] = None
-    total: Optional[List[float]] = None
+    co2: Optional[np.ndarray] = None
+    ch4: Optional[np.ndarray] = None
+    n2o: Optional[np.ndarray] = None
+    hfc: Optional[np.ndarray] = None
+    pfc: Optional[np.ndarray] = None
+    sf6: Optional[np.ndarray] = None
+    nf3: Optional[np.ndarray] = None
+    total: Optional[np.ndarray] = None
 
     # Private Attributes
-    #   - _data: a list of all the GHG data of the province per year
-    #   - _dict_data: mapping of year to GHG emissions for that year
-    _data: List[GreenhouseGas]
-    _dict_data: Dict[int, List[float]]
-
-    def __init__(self, data: List[GreenhouseGas]) -> None:
-        self._data = data
-        self._dict_data = self._sort_ghg_data()
+    #   - _years: the years that have data, in increasing order
+    #   - _gases: a 2d array where _gases[i][j] is the emission of the gas at index i
+    #     in the year _years[j]; a view of the rows of the GHGStore the region was
+    #     made from, if any
+    _years: np.ndarray
+    _gases: np.ndarray
+
+    def __init__(self, data: Union[List[GreenhouseGas], GHGStore],
+                 name: Optional[str] = None, category: int = 0) -> None:
+        """Initialize the Region from a list of GreenhouseGas, or from the rows of
+        the region <name> and category <category> of a GHGStore.
 
-    def _sort_ghg_data(self) -> Dict[int, List[float]]:
-        """ Return a dictionary mapping year to a list of greenhouse gas
-        emissions for that year
-
-        Note: This is a private method used only to initialize _dict_data.
+        Preconditions:
+            - not isinstance(data, GHGStore) or data.has_series(name, category)
+            - isinstance(data, GHGStore) or the rows in data have different years
         """
-        sorted_dict = {}
-        for row in self._data:
-            sorted_dict[row.year] = [row.co2,
-                                     row.ch4,
-                                     row.n2o,
-                                     row.hfc,
-                                     row.pfc,
-                                     row.sf6,
-                                     row.nf3,
-                                     row.total]
-
-        return sorted_dict
-
-    def adjust_list(self, start: int, end: int, index: int) -> List[float]:
-        """ Return a list representing the data of a specific greenhouse gas
-        emissions for self which starts from the year <start> and ends on <end>,
-        then update the corresponding list attribute respectively.
+        if isinstance(data, GHGStore):
+            first, stop = data.get_span(name, category)
+            self._years = data.years[first:stop]
+            self._gases = data.gases[:, first:stop]
+        else:
+            rows = sorted(data, key=lambda row: row.year)
+            self._years = np.array([row.year for row in rows], dtype=np.int16)
+            self._gases = np.array([[getattr(row, gas) for row in rows] for gas in GAS_NAMES],
+                                   dtype=float).reshape(len(GAS_NAMES), len(rows))
+
+    def adjust_list(self, start: int, end: int, index: int) -> np.ndarray:
+        """ Return a view of the data of a specific greenhouse gas emissions for self
+        which starts from the year <start> and ends on <end>, then update the
+        corresponding list attribute respectively.
 
         The index is based off of the order which the greenhouse gasses appear
         in the dictionary values.
@@ -138,9 +352,7 @@ class Region:
 
         Preconditions:
          - 0 <= index < 8
-         - start < end
-         - 1990 <= start <= 2016
-         - 1990 <= end <= 2016
+         - start <= end
 
         >>> import math
         >>> data = read_ghg_data(2)  # reads two rows of data
@@ -158,22 +370,23 @@ class Region:
         True
         >>> math.isclose(final_list[0], 129920.0044)  # only data from 1990 remains
         True
-        """
-        trimmed_list = []
-        for year in range(start, end + 1):
-            trimmed_list.append(self._dict_data[year][index])
 
-        return trimmed_list
+        When the region was made from a GHGStore, the view is a view of the store.
+
+        >>> store_alberta = Region(read_ghg_store(), 'Alberta')
+        >>> store_list = store_alberta.adjust_list(1990, 1991, 0)
+        >>> [round(value, 4) for value in store_list.tolist()]
+        [129920.0044, 129879.9633]
+        """
+        lower, upper = _year_span(self._years, start, end)
+        return self._gases[index, lower:upper]
 
     def initialize_lists(self, start: int, end: int) -> None:
         """ Initialize the lists for multiple regression. Mutate all instance attributes
-        so that they become lists.
+        so that they become views of the data from <start> to <end>.
 
          Preconditions:
-            - 0 <= index < 8
-            - start < end
-            - 1990 <= start <= 2016
-            - 1990 <= end <= 2016
+            - start <= end
         """
         self.co2 = self.adjust_list(start, end, 0)
         self.ch4 = self.adjust_list(start, end, 1)
@@ -189,61 +402,135 @@ class Bird:
     """ An class representing a the data of a bird species
 
     Instance Attributes:
-        - list_data: list of all indexes of change since 1970,
-                     ordered by year (oldest data to most recent)
+        - list_data: array of all indexes of change since 1970,
+                     ordered by year (oldest data to most recent); a view of
+                     the data, not a copy
 
     Representation Invariants:
-        - min(self._dict_data) >= 1990
-        - max(self._dict_data) <= 2016
-        - len(list_data) <= len(_dict_data)
-        - all(year in self._dict_data for year in range(1990, 2016))
-        - all(element in self._dict_data.values() for element in self.list_data)
+        - len(self.list_data) <= len(self._values)
+        - len(self._years) == len(self._values)
         - the dictionary passed into this class is directly returned from the
           filter_bird_data function
 
     Sample Usage:
     >>> bird_data = {year: float(year) for year in range(1990, 2017)}
     >>> bird = Bird(bird_data)
-    >>> bird._dict_data == {year: year for year in range(1990, 2017)}
+    >>> bird._years.tolist() == list(range(1990, 2017))
     True
-    >>> bird.list_data == [float(n) for n in range(1990, 2017)]
+    >>> bird.list_data.tolist() == [float(n) for n in range(1990, 2017)]
     True
     >>> bird.adjust_data(2000, 2001)
-    >>> bird.list_data
+    >>> bird.list_data.tolist()
     [2000.0, 2001.0]
     """
-    list_data: list
+    list_data: np.ndarray
 
     # Private Attribute:
-    #     - _dict_data: mapping of year to index of change since 1970 for
-    #       the given bird species
-    _dict_data: Dict[int, float]
+    #     - _years: the years that have data, in increasing order
+    #     - _values: the index of change since 1970 for the given bird species in
+    #       each year of _years
+    _years: np.ndarray
+    _values: np.ndarray
 
     def __init__(self, bird_data: Dict[int, float]) -> None:
-        self._dict_data = bird_data
-        self.list_data = _data_to_list(bird_data)
+        self._years = np.array(sorted(bird_data), dtype=np.int16)
+        self._values = np.array([bird_data[year] for year in self._years.tolist()],
+                                dtype=float)
+        self.list_data = self._values
 
     def adjust_data(self, start: int, end: int) -> None:
         """ Adjust self.list_data to start from the year <start> to
         the year <end>.
 
         Preconditions:
-         - start < end
-         - 1990 <= end <= 2016
-         - 1990 <= start <= 2016
+         - start <= end
 
         >>> bird_data = {1999: 1.0, 2000: 2.0, 2001: 3.0, 2002: 4.0}  # an example possible data
         >>> bird = Bird(bird_data)
-        >>> bird.list_data == [1.0, 2.0, 3.0, 4.0]
+        >>> bird.list_data.tolist() == [1.0, 2.0, 3.0, 4.0]
         True
         >>> bird.adjust_data(2000, 2001)
-        >>> bird.list_data
+        >>> bird.list_data.tolist()
         [2.0, 3.0]
         """
-        adjusted_dict = {year: self._dict_data[year] for year in range(start, end + 1)}
+        lower, upper = _year_span(self._years, start, end)
+
+        # updates the list attribute to a view of the trimmed data
+        self.list_data = self._values[lower:upper]
 
-        # updates the list attribute to match the trimmed data
-        self.list_data = _data_to_list(adjusted_dict)
+
+class _GHGColumns:
+    """ A class holding the columns of a GHGStore while its rows are being read, in
+    arrays that are preallocated and grown (doubling their size) when they are full.
+
+    Representation Invariants:
+        - 0 <= self.size <= len(self.years)
+    """
+    size: int
+    years: np.ndarray
+    region_codes: np.ndarray
+    category_ids: np.ndarray
+    gases: np.ndarray
+    region_indexes: Dict[str, int]
+    category_names: Dict[int, str]
+
+    def __init__(self, capacity: int) -> None:
+        self.size = 0
+        self.years = np.empty(capacity, dtype=np.int16)
+        self.region_codes = np.empty(capacity, dtype=np.int16)
+        self.category_ids = np.empty(capacity, dtype=np.int16)
+        self.gases = np.empty((len(GAS_NAMES), capacity))
+        self.region_indexes = {}
+        self.category_names = {}
+
+    def reserve(self, capacity: int) -> None:
+        """Grow the arrays so they can hold at least <capacity> rows."""
+        if capacity <= len(self.years):
+            return
+
+        capacity = max(capacity, 2 * len(self.years))
+        for name in ('years', 'region_codes', 'category_ids'):
+            grown = np.empty(capacity, dtype=getattr(self, name).dtype)
+            grown[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, grown)
+        grown = np.empty((len(GAS_NAMES), capacity))
+        grown[:, :self.size] = self.gases[:, :self.size]
+        self.gases = grown
+
+    def add(self, columns: List[Tuple[str, ...]]) -> None:
+        """Add rows to the arrays, where columns has the values of the rows for each
+        header in _GHG_CSV_HEADERS."""
+        count = len(columns[0])
+        self.reserve(self.size + count)
+        stop = self.size + count
+
+        regions = [_region_name(region) for region in columns[1]]
+        for region in regions:
+            self.region_indexes.setdefault(region, len(self.region_indexes))
+        self.category_names.update(zip(map(int, columns[2]), columns[3]))
+
+        self.years[self.size:stop] = np.array(columns[0], dtype=np.int16)
+        self.region_codes[self.size:stop] = [self.region_indexes[region]
+                                             for region in regions]
+        self.category_ids[self.size:stop] = np.array(columns[2], dtype=np.int16)
+        for i, column in enumerate(columns[4:]):
+            self.gases[i, self.size:stop] = _to_float_array(column)
+        self.size = stop
+
+    def to_store(self) -> GHGStore:
+        """Return a GHGStore with the rows that were added, where the regions are
+        named in alphabetical order like in read_ghg_store."""
+        region_names = sorted(self.region_indexes)
+        recode = np.zeros(len(region_names), dtype=np.int16)
+        for code, region in enumerate(region_names):
+            recode[self.region_indexes[region]] = code
+
+        return GHGStore(years=self.years[:self.size],
+                        region_codes=recode[self.region_codes[:self.size]],
+                        category_ids=self.category_ids[:self.size],
+                        gases=self.gases[:, :self.size],
+                        region_names=region_names,
+                        category_names=self.category_names)
 
 
 def read_ghg_data(last_row: int) -> Dict[str, List[GreenhouseGas]]:
@@ -252,8 +539,10 @@ def read_ghg_data(last_row: int) -> Dict[str, List[GreenhouseGas]]:
 
     The function will read <last_row> number of rows
 
+    Values that are not available in the data set (marked with 'x') are read as nan.
+
     Preconditions:
-        - 0 <= last_row <= 398
+        - 0 <= last_row <= the number of rows in 'GHG.csv'
 
     Note: The list of GreenhouseGas are ordered by year
     """
@@ -267,48 +556,169 @@ def read_ghg_data(last_row: int) -> Dict[str, List[GreenhouseGas]]:
         # reads each row in the dataset, up to the <last_row> row
         for _ in range(last_row):
             row = next(reader)
-            province = str(row[1])
+            province = _region_name(row[1])
 
             if province in ghg_data:
                 ghg_data[province].append(GreenhouseGas(year=int(row[0]),
-                                                        region=row[1],
-                                                        co2=float(row[5]),
-                                                        ch4=float(row[6]),
-                                                        n2o=float(row[8]),
-                                                        hfc=float(row[10]),
-                                                        pfc=float(row[11]),
-                                                        sf6=float(row[12]),
-                                                        nf3=float(row[13]),
-                                                        total=float(row[14])))
+                                                        region=province,
+                                                        co2=_to_float(row[5]),
+                                                        ch4=_to_float(row[6]),
+                                                        n2o=_to_float(row[8]),
+                                                        hfc=_to_float(row[10]),
+                                                        pfc=_to_float(row[11]),
+                                                        sf6=_to_float(row[12]),
+                                                        nf3=_to_float(row[13]),
+                                                        total=_to_float(row[14])))
             else:
                 ghg_data[province] = [GreenhouseGas(year=int(row[0]),
-                                                    region=row[1],
-                                                    co2=float(row[5]),
-                                                    ch4=float(row[6]),
-                                                    n2o=float(row[8]),
-                                                    hfc=float(row[10]),
-                                                    pfc=float(row[11]),
-                                                    sf6=float(row[12]),
-                                                    nf3=float(row[13]),
-                                                    total=float(row[14]))]
+                                                    region=province,
+                                                    co2=_to_float(row[5]),
+                                                    ch4=_to_float(row[6]),
+                                                    n2o=_to_float(row[8]),
+                                                    hfc=_to_float(row[10]),
+                                                    pfc=_to_float(row[11]),
+                                                    sf6=_to_float(row[12]),
+                                                    nf3=_to_float(row[13]),
+                                                    total=_to_float(row[14]))]
 
     return ghg_data
 
 
-def read_bird_data() -> Dict[int, List[str]]:
+def read_ghg_store(file_path: str = 'dataset/GHG.csv') -> GHGStore:
+    """ Return a GHGStore holding every row of the greenhouse gas data set.
+
+    Unlike read_ghg_data, every region, category and year is read. Values that are
+    not available in the data set (marked with 'x') are stored as nan. The file is
+    read in chunks by stream_ghg_store.
+    """
+    return stream_ghg_store(file_path)
+
+
+def ghg_store_from_rows(rows: Iterable[List[str]],
+                        indexes: Optional[List[int]] = None) -> GHGStore:
+    """ Return a GHGStore holding the given rows of a greenhouse gas csv file, where
+    indexes are the columns of the names in _GHG_CSV_HEADERS, or the columns of
+    'GHG.csv' if indexes is None.
+
+    The rows are filtered like in stream_ghg_store: a header row gives the columns of
+    the rows after it, and other rows that don't start with a year are skipped.
+
+    >>> row = ['2019', 'Yukon', '0', 'TOTAL', 'TRUE', '1', '2', '3', '4', '5', '6', '7',
+    ...        '8', '9', '10', 'kt']
+    >>> store = ghg_store_from_rows([row, [], ['Source: Environment Canada, 2020']])
+    >>> len(store), store.get_series('Yukon', 7).tolist()
+    (1, [10.0])
+    """
+    if indexes is None:
+        indexes = [0, 1, 2, 3] + list(_GHG_CSV_COLUMNS)
+    _, rows = _filter_ghg_rows(rows, indexes)
+
+    columns = _GHGColumns(len(rows))
+    if rows:
+        columns.add(list(zip(*rows)))
+    return columns.to_store()
+
+
+def read_ghg_header(file_path: str) -> List[int]:
+    """ Return the columns of the names in _GHG_CSV_HEADERS in the greenhouse gas csv
+    file at file_path, from its first header row.
+
+    Raise ValueError if the file has no header row.
+
+    >>> read_ghg_header('dataset/GHG.csv')
+    [0, 1, 2, 3, 5, 6, 8, 10, 11, 12, 13, 14]
+    """
+    for lines, _ in _read_line_chunks(file_path, 1 << 16):
+        for row in csv.reader(lines):
+            indexes = _header_indexes(row)
+            if indexes is not None:
+                return indexes
+
+    raise ValueError(f'{file_path} has no greenhouse gas header')
+
+
+def stream_ghg_store(file_paths: Union[str, List[str]] = 'dataset/GHG.csv',
+                     regions: Optional[List[str]] = None,
+                     categories: Optional[List[int]] = None,
+                     chunk_size: int = 1 << 20) -> GHGStore:
+    """ Return a GHGStore holding the rows of the greenhouse gas csv files at file_paths
+    (one path or a list of paths) for the given regions and CategoryIDs, or for every
+    region or category if they are None.
+
+    Each file is read <chunk_size> bytes at a time. The rows of a chunk are filtered
+    and written straight into the columns of the store, which are preallocated from
+    an estimate of how many rows the files have and grown if the estimate is too
+    small, so only one chunk of the files is held in memory at once.
+
+    A header is a row with every name in _GHG_CSV_HEADERS, and the columns of the rows
+    after it are found by their names, so files with extra or reordered columns (or
+    several exports joined together) can be read. Other rows that don't start with a
+    year (such as notes) are skipped.
+
+    Preconditions:
+        - chunk_size > 0
+        - no region, category and year has a row in more than one of the files
+
+    >>> store = stream_ghg_store(regions=['Alberta', 'Yukon'], categories=[0, 510],
+    ...                          chunk_size=4096)
+    >>> store.region_names, sorted(store.category_names)
+    (['Alberta', 'Yukon'], [0, 510])
+    >>> full = read_ghg_store()
+    >>> bool(np.allclose(store.get_series('Yukon', 1, category=510),
+    ...                  full.get_series('Yukon', 1, category=510), rtol=0, atol=0,
+    ...                  equal_nan=True))
+    True
+    """
+    if isinstance(file_paths, str):
+        file_paths = [file_paths]
+    region_set = None if regions is None else set(regions)
+    category_set = None if categories is None else {str(category) for category in categories}
+
+    columns = _GHGColumns(0)
+    for file_path in file_paths:
+        file_size = os.path.getsize(file_path)
+        indexes = None
+        read = 0
+        for lines, chunk_bytes in _read_line_chunks(file_path, chunk_size):
+            indexes, rows = _filter_ghg_rows(csv.reader(lines), indexes)
+            count = len(rows)
+            if region_set is not None:
+                rows = [row for row in rows if _region_name(row[1]) in region_set]
+            if category_set is not None:
+                rows = [row for row in rows if row[2] in category_set]
+
+            read += chunk_bytes
+            if count > 0 and read == chunk_bytes:
+                # estimate the rows kept from the file from its first chunk
+                columns.reserve(columns.size + len(rows) * file_size // read)
+            if rows:
+                columns.add(list(zip(*rows)))
+
+        if indexes is None:
+            raise ValueError(f'{file_path} has no greenhouse gas header')
+
+    return columns.to_store()
+
+
+def read_bird_data(file_path: str = 'dataset/bird_data.csv') -> Dict[int, List[str]]:
     """ Read the 'bird_data.csv' file and Return a dictionary
     mapping each year to a list representing a row of bird data
+
+    Every row that starts with a year is read, so years added to the file are read
+    too.
+
+    >>> bird_data = read_bird_data()
+    >>> min(bird_data), max(bird_data)
+    (1970, 2016)
     """
-    with open('dataset/bird_data.csv') as csvfile:
+    with open(file_path) as csvfile:
         reader = csv.reader(csvfile)
-        # skips headers
-        for _ in range(3):
-            next(reader)
-
         bird_data = {}
 
-        for _ in range(47):
-            row = next(reader)
+        for row in reader:
+            # skips the headers and the notes at the end, which don't start with a year
+            if row == [] or not row[0].isdigit():
+                continue
             bird_data[int(row[0])] = [row[1],
                                       row[2],
                                       row[3],
@@ -321,13 +731,15 @@ def read_bird_data() -> Dict[int, List[str]]:
     return bird_data
 
 
-def filter_bird_data(bird_data: Dict[int, List[str]], column: int) -> Dict[int, float]:
-    """ Return a dictionary mapping the years between 1990-2016 inclusive in bird_data
-    to a specific column in the data
+def filter_bird_data(bird_data: Dict[int, List[str]], column: int, start: int = 1990,
+                     end: Optional[int] = None) -> Dict[int, float]:
+    """ Return a dictionary mapping the years between <start> and <end> inclusive in
+    bird_data to a specific column in the data, where end is the last year of bird_data
+    if it is None. Years where the column is not available ('n/a') map to nan.
 
         Preconditions:
             - 0 <= column <= 8
-            - all(year in bird_data for year in range(1990, 2017))
+            - all(year in bird_data for year in range(start, end + 1))
             - the dictionary passed into this function is directly
               from the read_bird_data function
 
@@ -337,34 +749,139 @@ def filter_bird_data(bird_data: Dict[int, List[str]], column: int) -> Dict[int,
 
     >>> data = {yr: ['0.0', '1.0', '2.0', '3.0'] for yr in range(1970, 2020)}
     >>> filtered_data = filter_bird_data(data, 0)
-    >>> filtered_data == {yr: 0.0 for yr in range(1990, 2017)}
+    >>> filtered_data == {yr: 0.0 for yr in range(1990, 2020)}
     True
-    >>> filtered_data = filter_bird_data(data, 1)
+    >>> filtered_data = filter_bird_data(data, 1, 1990, 2016)
     >>> filtered_data == {yr: 1.0 for yr in range(1990, 2017)}
     True
+    >>> filter_bird_data({1990: ['n/a', '1.0']}, 0)
+    {1990: nan}
     """
+    if end is None:
+        end = max(bird_data)
+
     filtered_dict = {}
-    for year in range(1990, 2017):
+    for year in range(start, end + 1):
         column_data = bird_data[year][column]
-        filtered_dict[year] = float(column_data)
+        filtered_dict[year] = float('nan') if column_data == 'n/a' else float(column_data)
 
     return filtered_dict
 
 
-# helper function
-def _data_to_list(data: Dict[int, float]) -> list:
-    """ Return a list containing all the datapoints in data ordered by year
+def get_year_range(store: GHGStore, bird_data: Dict[int, List[str]]) -> Tuple[int, int]:
+    """ Return the first and last year that both the greenhouse gas data in store and
+    bird_data have data for.
+
+    >>> get_year_range(read_ghg_store(), read_bird_data())
+    (1990, 2016)
+    """
+    return (max(int(store.years.min()), min(bird_data)),
+            min(int(store.years.max()), max(bird_data)))
+
+
+# helper functions
+def _read_line_chunks(file_path: str, chunk_size: int) -> Iterator[Tuple[List[str], int]]:
+    """ Yield the complete lines of the file at <file_path>, read <chunk_size> bytes at
+    a time, with the number of bytes read for them. A line split between two chunks
+    is yielded with the second one.
+    """
+    with open(file_path, 'rb') as file:
+        rest = b''
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            lines = (rest + chunk).split(b'\n')
+            rest = lines.pop()
+            yield ([line.decode() for line in lines], len(chunk))
+
+    if rest.strip() != b'':
+        yield ([rest.decode()], 0)
+
+
+def _filter_ghg_rows(rows: Iterable[List[str]], indexes: Optional[List[int]]
+                     ) -> Tuple[Optional[List[int]], List[List[str]]]:
+    """ Return the columns of the names in _GHG_CSV_HEADERS after the given rows of a
+    greenhouse gas csv file, and the rows that start with a year, with their values
+    in the order of _GHG_CSV_HEADERS.
+
+    indexes are the columns before the first row, or None if no header was read yet.
+    A header row (one with every name in _GHG_CSV_HEADERS) gives the columns of the
+    rows after it. Rows before the first header, and other rows that don't start with
+    a year (such as notes), are skipped.
+
+    >>> header = ['CO2eq', 'Year', 'Region', 'CategoryID', 'Category', 'CO2', 'CH4', 'N2O',
+    ...           'HFCs', 'PFCs', 'SF6', 'NF3']
+    >>> row = ['8', '2019', 'Yukon', '0', 'TOTAL', '1', '2', '3', '4', '5', '6', '7']
+    >>> indexes, rows = _filter_ghg_rows([row, ['note'], header, row, ['Source']], None)
+    >>> indexes
+    [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 0]
+    >>> rows
+    [['2019', 'Yukon', '0', 'TOTAL', '1', '2', '3', '4', '5', '6', '7', '8']]
+    """
+    kept = []
+    for row in rows:
+        if indexes is not None and len(row) > indexes[0] and row[indexes[0]].isdigit():
+            kept.append([row[index] for index in indexes])
+        else:
+            indexes = _header_indexes(row) or indexes
+
+    return (indexes, kept)
+
+
+def _header_indexes(row: List[str]) -> Optional[List[int]]:
+    """ Return the columns of the names in _GHG_CSV_HEADERS if row is a header row of a
+    greenhouse gas csv file, or None otherwise.
+
+    >>> _header_indexes(['Year', 'Region', 'CategoryID', 'Category', 'CO2', 'CH4', 'N2O',
+    ...                  'HFCs', 'PFCs', 'SF6', 'NF3', 'CO2eq'])
+    [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11]
+    >>> _header_indexes(['note']) is None
+    True
+    """
+    names = [name.strip() for name in row]
+    if all(header in names for header in _GHG_CSV_HEADERS):
+        return [names.index(header) for header in _GHG_CSV_HEADERS]
+    return None
+
+
+def _region_name(name: str) -> str:
+    """ Return the name of the region that <name> is a spelling of in the greenhouse
+    gas data set.
+
+    >>> _region_name('canada'), _region_name('Yukon')
+    ('Canada', 'Yukon')
+    """
+    return _REGION_ALIASES.get(name, name)
+
+
+def _to_float_array(column: Tuple[str, ...]) -> np.ndarray:
+    """ Return the values of a column of 'GHG.csv' as an array of floats, where
+    values that are not available ('x') become nan.
+
+    >>> _to_float_array(('1.5', 'x', '0'))
+    array([1.5, nan, 0. ])
+    """
+    strings = np.array(column)
+    return np.where(strings == 'x', 'nan', strings).astype(np.float64)
+
+
+def _to_float(value: str) -> float:
+    """ Return the value of a cell of 'GHG.csv' as a float, where a value that is not
+    available ('x') becomes nan.
+
+    >>> _to_float('1.5'), _to_float('x')
+    (1.5, nan)
+    """
+    return float('nan') if value == 'x' else float(value)
+
 
-    The function isn't for the user to use. The doctest below is just to exemplify
-    how the function works.
+def _year_span(years: np.ndarray, start: int, end: int) -> Tuple[int, int]:
+    """ Return the start and stop of the positions in the sorted array years of the
+    years <start> to <end> inclusive.
 
-    >>> example_data = {2000: 0.0, 2001: 1.0, 2002: 2.0}
-    >>> _data_to_list(example_data)
-    [0.0, 1.0, 2.0]
+    >>> _year_span(np.array([1990, 1991, 1992, 1993]), 1991, 1992)
+    (1, 3)
     """
-    start = min(data)
-    end = max(data) + 1
-    return [data[year] for year in range(start, end)]
+    return (int(np.searchsorted(years, start, 'left')),
+            int(np.searchsorted(years, end, 'right')))
 
 
 if __name__ == '__main__':
@@ -1,28 +1,102 @@
 """
 Module that contains class and functions for computations
 and the creation of regression models
+
+scikit-learn, pandas and plotly are only imported when a model uses the 'sklearn'
+engine or is plotted, so the default engine only needs numpy.
 """
+from collections import OrderedDict
 import numpy as np
-import pandas
-import plotly.graph_objects as go
-import plotly.express as px
-from sklearn.linear_model import LinearRegression
-from typing import List, Tuple, Dict
+from modules import regularization, resampling
+from typing import Any, List, Optional, Tuple, Dict, Union, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from sklearn.linear_model import LinearRegression
+
+
+# the engines that can be used to fit the models:
+#   - 'numpy': closed-form least squares computed with numpy
+#   - 'sklearn': scikit-learn's LinearRegression
+ENGINES = ('numpy', 'sklearn')
+
+# the engine used by models that aren't given one
+_default_engine = 'numpy'
+
+
+def set_default_engine(engine: str) -> None:
+    """Set the engine used to fit models that aren't given an engine.
+
+    Preconditions:
+        - engine in ENGINES
+    """
+    global _default_engine
+    _default_engine = engine
+
+
+def get_default_engine() -> str:
+    """Return the engine used to fit models that aren't given an engine."""
+    return _default_engine
 
 
 class RegressionModel:
-    """ A class representing the linear regression model of the given data """
+    """ A class representing the linear regression model of the given data
+
+    The model is fit with closed-form least squares unless the 'sklearn' engine
+    is chosen. Both engines give the same line of best fit:
+
+    >>> import math
+    >>> from modules.read_data import read_bird_data, read_ghg_store, filter_bird_data
+    >>> store, bird_data = read_ghg_store(), read_bird_data()
+    >>> different = []
+    >>> for region in store.region_names:
+    ...     years = store.get_years(region).tolist() if store.has_series(region) else []
+    ...     if years == [] or years[-1] < 2016:
+    ...         continue
+    ...     start, end = max(years[0], 1990), 2016
+    ...     for bird in range(9):
+    ...         birds = filter_bird_data(bird_data, bird)
+    ...         bird_list = [birds[year] for year in range(start, end + 1)]
+    ...         for gas in range(8):
+    ...             ghg_list = store.get_series(region, gas, start, end)
+    ...             numpy_model = RegressionModel(ghg_list, bird_list, engine='numpy')
+    ...             sklearn_model = RegressionModel(ghg_list, bird_list, engine='sklearn')
+    ...             if not (math.isclose(numpy_model.predict_y(1000.0),
+    ...                                  sklearn_model.predict_y(1000.0), abs_tol=1e-6)
+    ...                     and math.isclose(numpy_model.get_r_squared(),
+    ...                                      sklearn_model.get_r_squared(), abs_tol=1e-6)):
+    ...                 different.append((region, bird, gas))
+    >>> different
+    []
+
+    Years where the greenhouse gas value is missing (nan) are left out of the fit:
+
+    >>> RegressionModel([1.0, float('nan'), 3.0], [3.0, 100.0, 7.0]).predict_y(4.0)
+    9.0
+    """
     # Private instance attributes
-    #   -_model: the linear regression model
+    #   -_model: the scikit-learn linear regression model, or None if the
+    #    model was fit with the numpy engine
+    #   -_engine: the engine used to fit the model
+    #   -_slope: the slope of the line of best fit
+    #   -_intercept: the y-intercept of the line of best fit
     #   -_ghg_data: a list of floats representing the ghg emissions of a region
     #   -_bird_data: a list of floats representing the percentage change of a
     #    species of birds since 1970
-    _model: LinearRegression
+    _model: Optional['LinearRegression']
+    _engine: str
+    _slope: float
+    _intercept: float
     _ghg_data: List[float]
     _bird_data: List[float]
 
-    def __init__(self, ghg_data: List[float], bird_data: List[float]) -> None:
-        """ Initialize the RegressionModel
+    def __init__(self, ghg_data: List[float], bird_data: List[float],
+                 engine: Optional[str] = None,
+                 fit: Optional[Tuple[float, float]] = None) -> None:
+        """ Initialize the RegressionModel, fitting it with <engine>, or with the
+        default engine if no engine is given.
+
+        If fit is given, it is the slope and intercept the data was already fit with
+        (for example by fit_model_table), and the model isn't fit again.
 
         Preconditions:
             - ghg_data is a list of floats representing the greenhouse gas emissions
@@ -31,18 +105,31 @@ class RegressionModel:
 
             - bird_data is a list of percentage changes for a specific bird species and
               is directly from the Bird class
+
+            - engine is None or engine in ENGINES
         """
-        self._bird_data = bird_data
-        self._ghg_data = ghg_data
-        self._model = self._build_model()
+        self._ghg_data, self._bird_data = _drop_missing(ghg_data, bird_data)
+        self._engine = _default_engine if engine is None else engine
+        self._model = None
+        if fit is None:
+            self._slope, self._intercept = self._build_model()
+        else:
+            self._slope, self._intercept = fit
 
-    def _build_model(self) -> LinearRegression:
-        """ Return the Linear Regression model from the given data """
+    def _build_model(self) -> Tuple[float, float]:
+        """ Return the slope and intercept of the linear regression model
+        of the given data
+        """
         arrays = _lists_to_array(self._ghg_data, self._bird_data)
         x_data = arrays[0]
         y_data = arrays[1]
-        model = LinearRegression().fit(x_data, y_data)
-        return model
+        if self._engine == 'sklearn':
+            from sklearn.linear_model import LinearRegression
+            self._model = LinearRegression().fit(x_data, y_data)
+            return (float(self._model.coef_[0]), float(self._model.intercept_))
+        else:
+            coefficients, intercept = _fit_least_squares(x_data, y_data)
+            return (float(coefficients[0]), intercept)
 
     def predict_y(self, x: float) -> float:
         """ Return the predicted y value for the given x value based
@@ -50,31 +137,143 @@ class RegressionModel:
 
         In other words, given the quantity of greenhouse gas emissions,
         Return the expected index of change for the bird species
+
+        >>> model = RegressionModel([1.0, 2.0, 3.0], [3.0, 5.0, 7.0])
+        >>> model.predict_y(4.0)
+        9.0
         """
-        m = float(self._model.coef_)
-        b = float(self._model.intercept_)
-        return m * x + b
+        return self._slope * x + self._intercept
+
+    def predict_many(self, x: Any) -> np.ndarray:
+        """ Return an array of the predicted y values for each of the x values in x,
+        which can be a list or an array of any shape.
+
+        This is much faster than calling predict_y for each x value, such as when
+        drawing the response curve of thousands of greenhouse gas amounts.
+
+        >>> model = RegressionModel([1.0, 2.0, 3.0], [3.0, 5.0, 7.0])
+        >>> model.predict_many([4.0, 0.0, -1.0]).tolist()
+        [9.0, 1.0, -1.0]
+        >>> amounts = np.linspace(0.0, 1000.0, 5000)
+        >>> bool(np.allclose(model.predict_many(amounts),
+        ...                  [model.predict_y(amount) for amount in amounts]))
+        True
+        """
+        return self._slope * np.asarray(x, dtype=float) + self._intercept
 
     def predict_x(self, y: float) -> float:
         """ Return a float representing the projected change in ghg emissions
         for an index of change of y based off the LinearRegression model.
+
+        >>> model = RegressionModel([1.0, 2.0, 3.0], [3.0, 5.0, 7.0])
+        >>> model.predict_x(9.0)
+        4.0
         """
-        m = float(self._model.coef_)
-        b = float(self._model.intercept_)
-        return (y - b) / m
+        return (y - self._intercept) / self._slope
+
+    def get_slope(self) -> float:
+        """Return the slope of the line of best fit"""
+        return self._slope
+
+    def get_intercept(self) -> float:
+        """Return the y-intercept of the line of best fit"""
+        return self._intercept
 
     def get_r_squared(self) -> float:
         """Return a float representing the r squared value of the model"""
         x, y = _lists_to_array(self._ghg_data, self._bird_data)
-        return round(self._model.score(x, y), 6)
+        if self._model is not None:
+            return round(self._model.score(x, y), 6)
+        else:
+            return round(_r_squared(y, self._slope * x[:, 0] + self._intercept), 6)
+
+    def get_confidence_intervals(self, resamples: int = 1000, confidence: float = 0.95,
+                                 seed: Optional[int] = None,
+                                 workers: int = 1) -> Dict[str, Tuple[float, float]]:
+        """ Return a dictionary mapping 'slope' and 'intercept' to the lower and upper
+        bounds of their bootstrap confidence intervals, from <resamples> resamples of
+        the years the model was fit on, split across <workers> threads.
+
+        Preconditions:
+            - resamples >= 1
+            - 0 < confidence < 1
+            - workers >= 1
+
+        >>> model = RegressionModel([1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+        ...                         [3.1, 4.9, 7.2, 8.8, 11.1, 13.0])
+        >>> intervals = model.get_confidence_intervals(seed=0)
+        >>> lower, upper = intervals['slope']
+        >>> bool(lower <= model.get_slope() <= upper), bool(1.5 < lower and upper < 2.5)
+        (True, True)
+        """
+        x, y = _lists_to_array(self._ghg_data, self._bird_data)
+        bounds = resampling.bootstrap_intervals(x.astype(float), y.astype(float), resamples,
+                                                confidence, seed, workers).tolist()
+        return {'slope': tuple(bounds[0]), 'intercept': tuple(bounds[1])}
+
+    def get_p_value(self, permutations: int = 1000, seed: Optional[int] = None,
+                    workers: int = 1) -> float:
+        """ Return the p-value of the permutation test of the relationship between
+        the greenhouse gas and the birds: the fraction of <permutations> random
+        orderings of the bird data (counting the real one) that fit at least as well.
+
+        Preconditions:
+            - permutations >= 1
+            - workers >= 1
+
+        >>> model = RegressionModel([1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+        ...                         [3.1, 4.9, 7.2, 8.8, 11.1, 13.0])
+        >>> model.get_p_value(seed=0) < 0.01
+        True
+        """
+        x, y = _lists_to_array(self._ghg_data, self._bird_data)
+        return resampling.permutation_p_value(x.astype(float), y.astype(float), permutations,
+                                              seed, workers)
+
+    def has_data(self) -> bool:
+        """Return whether there was any data left to fit the model on once the missing
+        years were left out. A model without data predicts nan and can't be plotted.
+
+        >>> RegressionModel([float('nan'), float('nan')], [3.0, 7.0]).has_data()
+        False
+        """
+        return len(self._ghg_data) > 0
+
+    def get_data(self) -> Tuple[List[float], List[float]]:
+        """Return the greenhouse gas data and bird data the model was fit on."""
+        return (np.asarray(self._ghg_data, dtype=float).tolist(),
+                np.asarray(self._bird_data, dtype=float).tolist())
 
     def plot_data(self, title: str, x_label: str, y_label: str) -> None:
         """Plot the given data with a line of best fit generated from the
         regression model
+
+        Preconditions:
+            - self.has_data()
+        """
+        self.make_figure(title, x_label, y_label).show()
+
+    def export_html(self, file_path: str, title: str, x_label: str, y_label: str) -> None:
+        """Write the plot of plot_data to an HTML file at file_path, which includes
+        plotly itself so it can be opened without an internet connection.
+
+        Preconditions:
+            - self.has_data()
         """
+        self.make_figure(title, x_label, y_label).write_html(file_path, include_plotlyjs=True)
+
+    def make_figure(self, title: str, x_label: str, y_label: str) -> Any:
+        """Return the plotly figure of the given data with a line of best fit
+        generated from the regression model
+
+        Preconditions:
+            - self.has_data()
+        """
+        import plotly.graph_objects as go
+        import plotly.express as px
+
         x_range = [min(self._ghg_data), max(self._ghg_data)]
-        y_range = [self.predict_y(x_range[0]),
-                   self.predict_y(x_range[1])]
+        y_range = self.predict_many(x_range).tolist()
 
         fig = px.scatter(x=self._ghg_data,
                          y=self._bird_data,
@@ -83,7 +282,7 @@ class RegressionModel:
                                  'y': y_label})
 
         fig.add_traces(go.Scatter(x=x_range, y=y_range, name="Regression Line"))
-        fig.show()
+        return fig
 
 
 class MultipleRegression:
@@ -92,15 +291,84 @@ class MultipleRegression:
     Instance Attributes:
         - coef: a dictionary mapping the name of the GHG to the corresponding
           coefficient/weighting
+
+    The model is fit with least squares computed by numpy unless the 'sklearn'
+    engine is chosen. When the greenhouse gas columns are nearly collinear the
+    coefficients of the two engines can differ, but the numpy fit is never worse:
+
+    >>> from modules.read_data import read_bird_data, read_ghg_store, filter_bird_data
+    >>> store, bird_data = read_ghg_store(), read_bird_data()
+    >>> worse = []
+    >>> for region in ['Alberta', 'Canada', 'Nunavut', 'Ontario', 'Quebec', 'Yukon']:
+    ...     start = int(store.get_years(region)[0])
+    ...     x_vars = {name: store.get_series(region, gas, start, 2016)
+    ...               for gas, name in enumerate(['CO2', 'CH4', 'N2O', 'HFC', 'PFC',
+    ...                                           'SF6', 'NF3'])}
+    ...     for bird in range(9):
+    ...         birds = filter_bird_data(bird_data, bird)
+    ...         bird_list = [birds[year] for year in range(start, 2017)]
+    ...         numpy_model = MultipleRegression(x_vars, bird_list, engine='numpy')
+    ...         sklearn_model = MultipleRegression(x_vars, bird_list, engine='sklearn')
+    ...         if numpy_model.get_r_squared() < sklearn_model.get_r_squared() - 1e-6:
+    ...             worse.append((region, bird))
+    >>> worse
+    []
+
+    On well conditioned data both engines give the same coefficients:
+
+    >>> import math
+    >>> x_vars = {'CO2': [1.0, 2.0, 3.0, 4.0, 6.0], 'CH4': [2.0, 1.0, 4.0, 3.0, 5.0]}
+    >>> y_values = [3.0, 2.0, 7.0, 6.0, 11.0]
+    >>> numpy_model = MultipleRegression(x_vars, y_values, engine='numpy')
+    >>> sklearn_model = MultipleRegression(x_vars, y_values, engine='sklearn')
+    >>> all(math.isclose(numpy_model.coef[gas], sklearn_model.coef[gas]) for gas in x_vars)
+    True
+
+    When gases move together, a penalty keeps the coefficients from blowing up in
+    opposite directions:
+
+    >>> x_vars = {'CO2': [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+    ...           'PFC': [2.01, 3.98, 6.02, 7.99, 10.01, 11.99]}
+    >>> y_values = [3.0, 5.5, 6.5, 9.0, 10.5, 13.0]
+    >>> [round(value, 1) for value in MultipleRegression(x_vars, y_values).coef.values()]
+    [46.8, -22.5]
+    >>> ridge = MultipleRegression(x_vars, y_values, penalty=0.1)
+    >>> [round(value, 2) for value in ridge.coef.values()], ridge.get_r_squared() > 0.98
+    ([0.92, 0.46], True)
     """
     coef: Dict[str, float]
 
     # Private Attributes
-    #   - _model: the multiple regression model
-    _model: LinearRegression
+    #   - _model: the scikit-learn multiple regression model, or None if the
+    #     model was fit with the numpy engine
+    #   - _engine: the engine used to fit the model
+    #   - _x_data: a 2d array where each column is the emissions of a GHG
+    #   - _y_data: an array of the index changes for the species of birds
+    #   - _coef_array: the coefficients of the GHGs, in the same order as coef
+    #   - _coef_floats: the coefficients of _coef_array as floats, which are
+    #     faster than the array to multiply with a single input
+    #   - _intercept: the intercept of the model
+    #   - _gram: the Gram matrix of the data that regularized fits are computed from,
+    #     or None if it hasn't been needed yet
+    _model: Optional['LinearRegression']
+    _engine: str
+    _x_data: np.ndarray
+    _y_data: np.ndarray
+    _coef_array: np.ndarray
+    _coef_floats: Tuple[float, ...]
+    _intercept: float
+    _gram: Optional[regularization.GramMatrix]
 
-    def __init__(self, x_variables: Dict[str, List[float]], y_values: List[float]) -> None:
-        """Initialize the _model attribute
+    def __init__(self, x_variables: Dict[str, List[float]], y_values: List[float],
+                 engine: Optional[str] = None, penalty: float = 0.0,
+                 l1_ratio: float = 0.0) -> None:
+        """Initialize the model, fitting it with <engine>, or with the default engine
+        if no engine is given.
+
+        If penalty is more than 0, the model is instead fit with numpy as an elastic
+        net with the given penalty and l1_ratio (see regularization.fit_path), which
+        is ridge regression for the default l1_ratio of 0 and the lasso for 1. This
+        keeps the coefficients stable when gases are all zero or move together.
 
         Preconditions:
             - x_variables is a dictionary mapping names of GHGs to a list of floats
@@ -108,9 +376,40 @@ class MultipleRegression:
 
             - y_values is a list of floats representing the index change for a species of birds
               and comes directly from the Bird class
+
+            - engine is None or engine in ENGINES
+            - penalty >= 0
+            - 0 <= l1_ratio <= 1
         """
-        self._model = LinearRegression().fit(pandas.DataFrame(x_variables), y_values)
-        self.coef = self._get_coef()
+        self._engine = _default_engine if engine is None else engine
+        self._gram = None
+        self._x_data = np.column_stack([x_variables[name] for name in x_variables])
+        self._y_data = np.array(y_values, dtype=float)
+
+        # Years where any greenhouse gas value is missing (nan) are left out of the fit
+        complete = ~np.isnan(self._x_data).any(axis=1)
+        if not complete.all():
+            self._x_data, self._y_data = self._x_data[complete], self._y_data[complete]
+
+        if penalty > 0 and len(self._y_data) > 0:
+            self._model = None
+            coefficients, intercepts = regularization.fit_path(self._get_gram(), [penalty],
+                                                               l1_ratio)
+            self._coef_array, self._intercept = coefficients[0], float(intercepts[0])
+        elif self._engine == 'sklearn':
+            import pandas
+            from sklearn.linear_model import LinearRegression
+            self._model = LinearRegression().fit(pandas.DataFrame(self._x_data,
+                                                                  columns=list(x_variables)),
+                                                 self._y_data)
+            self._coef_array = np.array(self._model.coef_, dtype=float)
+            self._intercept = float(self._model.intercept_)
+        else:
+            self._model = None
+            self._coef_array, self._intercept = _fit_least_squares(self._x_data, self._y_data)
+
+        self._coef_floats = tuple(self._coef_array.tolist())
+        self.coef = self._get_coef(list(x_variables))
 
     def predict_value(self,
                       co2: float,
@@ -124,27 +423,411 @@ class MultipleRegression:
         """ Return the estimated percentage change since 1970 of birds for the given
         greenhouse gas values base off of the LinearRegression Model.
 
+        Both engines predict with the cached coefficients instead of going through
+        scikit-learn's predict, which gives the same values without its overhead on
+        every call:
+
+        >>> import math
+        >>> rng = np.random.default_rng(0)
+        >>> names = ['CO2', 'CH4', 'N2O', 'HFC', 'PFC', 'SF6', 'NF3']
+        >>> x_vars = {name: rng.uniform(0.0, 10.0, 20).tolist() for name in names}
+        >>> y_values = rng.uniform(-50.0, 50.0, 20).tolist()
+        >>> numpy_model = MultipleRegression(x_vars, y_values, engine='numpy')
+        >>> sklearn_model = MultipleRegression(x_vars, y_values, engine='sklearn')
+        >>> math.isclose(numpy_model.predict_value(5.0, 4.0, 3.0, 2.0, 1.0, 0.0, 1.0),
+        ...              sklearn_model.predict_value(5.0, 4.0, 3.0, 2.0, 1.0, 0.0, 1.0))
+        True
+
         Preconditions:
             - all(value >= 0 for value in {co2, ch4, n2o, hfc, pfc, sf6, nf3})
         """
-        return float(self._model.predict([[co2, ch4, n2o, hfc, pfc, sf6, nf3]]))
+        coef = self._coef_floats
+        return coef[0] * co2 + coef[1] * ch4 + coef[2] * n2o + coef[3] * hfc + \
+            coef[4] * pfc + coef[5] * sf6 + coef[6] * nf3 + self._intercept
+
+    def predict_many(self, values: Any) -> np.ndarray:
+        """ Return an array of the predicted values for each row of values, which is a
+        2d list or array with a column for each greenhouse gas in the order of coef.
+
+        >>> x_vars = {'CO2': [1.0, 2.0, 3.0, 4.0, 6.0], 'CH4': [2.0, 1.0, 4.0, 3.0, 5.0]}
+        >>> model = MultipleRegression(x_vars, [3.0, 4.0, 9.0, 10.0, 16.0], engine='numpy')
+        >>> predicted = model.predict_many([[1.0, 2.0], [6.0, 5.0], [0.0, 0.0]])
+        >>> bool(np.allclose(predicted, [3.0, 16.0, -1.0]))
+        True
+
+        Preconditions:
+            - np.shape(values)[-1] == len(self.coef)
+        """
+        return np.asarray(values, dtype=float) @ self._coef_array + self._intercept
+
+    def has_data(self) -> bool:
+        """Return whether there were any years without a missing greenhouse gas value to
+        fit the model on. A model without data predicts nan.
+
+        >>> MultipleRegression({'CO2': [1.0, 2.0], 'HFC': [float('nan')] * 2},
+        ...                    [3.0, 7.0]).has_data()
+        False
+        """
+        return len(self._y_data) > 0
+
+    def get_intercept(self) -> float:
+        """Return the intercept of the model"""
+        return self._intercept
+
+    def get_r_squared(self) -> float:
+        """Return a float representing the r squared value of the model"""
+        if self._model is not None:
+            import pandas
+            return round(self._model.score(pandas.DataFrame(self._x_data, columns=self.coef),
+                                           self._y_data), 6)
+        else:
+            predicted = self._x_data @ self._coef_array + self._intercept
+            return round(_r_squared(self._y_data, predicted), 6)
+
+    def get_confidence_intervals(self, resamples: int = 1000, confidence: float = 0.95,
+                                 seed: Optional[int] = None,
+                                 workers: int = 1) -> Dict[str, Tuple[float, float]]:
+        """ Return a dictionary mapping the name of each GHG in coef, and 'intercept', to
+        the lower and upper bounds of the bootstrap confidence interval of its
+        coefficient, from <resamples> resamples of the years the model was fit on,
+        split across <workers> threads.
+
+        The resamples are fit with numpy for both engines.
+
+        Preconditions:
+            - resamples >= 1
+            - 0 < confidence < 1
+            - workers >= 1
+
+        >>> x_vars = {'CO2': [1.0, 2.0, 3.0, 4.0, 6.0, 5.0, 7.0, 8.0],
+        ...           'CH4': [2.0, 1.0, 4.0, 3.0, 5.0, 8.0, 6.0, 7.0]}
+        >>> y_values = [5.0, 6.0, 10.1, 11.0, 17.1, 18.0, 20.0, 23.1]
+        >>> model = MultipleRegression(x_vars, y_values)
+        >>> intervals = model.get_confidence_intervals(seed=0)
+        >>> list(intervals)
+        ['CO2', 'CH4', 'intercept']
+        >>> all(lower <= model.coef[gas] <= upper for gas, (lower, upper) in intervals.items()
+        ...     if gas != 'intercept')
+        True
+        """
+        bounds = resampling.bootstrap_intervals(self._x_data, self._y_data, resamples,
+                                                confidence, seed, workers).tolist()
+        return dict(zip(list(self.coef) + ['intercept'], map(tuple, bounds)))
+
+    def get_p_value(self, permutations: int = 1000, seed: Optional[int] = None,
+                    workers: int = 1) -> float:
+        """ Return the p-value of the permutation test of the model: the fraction of
+        <permutations> random orderings of the bird data (counting the real one) whose
+        r squared value is at least as high.
 
-    def _get_coef(self) -> Dict[str, float]:
+        Preconditions:
+            - permutations >= 1
+            - workers >= 1
+        """
+        return resampling.permutation_p_value(self._x_data, self._y_data, permutations,
+                                              seed, workers)
+
+    def get_path(self, penalties: Any,
+                 l1_ratio: float = 1.0) -> Tuple[List[Dict[str, float]], List[float]]:
+        """ Return the coefficients, as a dictionary like coef for each penalty in
+        penalties, and the intercepts of the elastic net fits of the model's data.
+
+        The Gram matrix of the data is computed the first time it is needed and kept
+        with the model, so a whole path costs about the same as one fit.
+
+        Preconditions:
+            - all(penalty >= 0 for penalty in penalties)
+            - 0 <= l1_ratio <= 1
+            - self._y_data is not empty
+
+        >>> x_vars = {'CO2': [1.0, 2.0, 3.0, 4.0, 5.0], 'CH4': [2.0, 1.0, 4.0, 3.0, 6.0],
+        ...           'NF3': [0.0, 0.0, 0.0, 0.0, 0.0]}
+        >>> model = MultipleRegression(x_vars, [3.0, 5.0, 7.0, 9.0, 11.0])
+        >>> path, intercepts = model.get_path([100.0, 0.5, 0.0])
+        >>> [{gas: round(value, 6) for gas, value in coef.items()} for coef in path]
+        ... # doctest: +NORMALIZE_WHITESPACE
+        [{'CO2': 0.0, 'CH4': 0.0, 'NF3': 0.0}, {'CO2': 1.646447, 'CH4': 0.0, 'NF3': 0.0},
+         {'CO2': 2.0, 'CH4': 0.0, 'NF3': 0.0}]
+        >>> [round(intercept, 6) for intercept in intercepts]
+        [7.0, 2.06066, 1.0]
+        """
+        coefficients, intercepts = regularization.fit_path(self._get_gram(), penalties,
+                                                           l1_ratio)
+        return ([dict(zip(self.coef, row)) for row in coefficients.tolist()],
+                intercepts.tolist())
+
+    def choose_penalty(self, penalties: Optional[List[float]] = None, l1_ratio: float = 1.0,
+                       folds: int = 5, workers: int = 1) -> float:
+        """ Return the penalty with the lowest cross-validated error for the model's data
+        (see regularization.choose_penalty), from penalties or from a grid of 50
+        penalties if penalties is None, with the folds fit in <workers> threads. The
+        Gram matrix kept with the model is used for the grid and every fold.
+
+        Preconditions:
+            - 2 <= folds <= number of years the model was fit on
+            - 0 <= l1_ratio <= 1
+            - workers >= 1
+        """
+        return regularization.choose_penalty(self._x_data, self._y_data, penalties,
+                                             l1_ratio, folds, workers, self._get_gram())
+
+    def _get_gram(self) -> regularization.GramMatrix:
+        """Return the Gram matrix of the model's data, computing it the first time."""
+        if self._gram is None:
+            self._gram = regularization.GramMatrix(self._x_data, self._y_data)
+        return self._gram
+
+    def _get_coef(self, names: List[str]) -> Dict[str, float]:
         """Return a dictionary mapping the name of a greenhouse gas to
         the multiple regression coefficient
         """
-        coefficients = self._model.coef_
-        mapping = {'CO2': coefficients[0],
-                   'CH4': coefficients[1],
-                   'N2O': coefficients[2],
-                   'HFC': coefficients[3],
-                   'PFC': coefficients[4],
-                   'SF6': coefficients[5],
-                   'NF3': coefficients[6]}
+        return {name: float(coefficient)
+                for name, coefficient in zip(names, self._coef_array)}
+
+
+class RunningRegression:
+    """A class representing least squares lines of best fit that are kept up to date
+    as more data is added, without fitting all the data again.
+
+    A line only depends on the count and the sums of x, y, xy, x^2 and y^2 of its
+    data. They are kept as the means and the sums of squared deviations from the
+    means, which hold the same information but lose less precision with large
+    emission values, and new data is merged into them with the pairwise update of
+    Chan, Golub and LeVeque.
+
+    Any number of lines can be kept at once: add fits along the last axis of x and y,
+    which are broadcast together, and nan values are left out like in RegressionModel.
+    The statistics and results have the shape of the other axes.
+
+    Instance Attributes:
+        - count: the number of points each line was fit with
+
+    Sample Usage:
+    >>> running = RunningRegression()
+    >>> running.add([1.0, 2.0], [3.0, 5.0])
+    >>> running.add([3.0, float('nan'), 4.0], [7.0, 100.0, 9.0])
+    >>> running.count.tolist(), running.get_slope().tolist(), running.get_intercept().tolist()
+    (4.0, 2.0, 1.0)
+    >>> running.get_r_squared().tolist()
+    1.0
+    """
+    count: np.ndarray
+
+    # Private Instance Attributes:
+    #   - _x_mean: the mean of the x values of each line
+    #   - _y_mean: the mean of the y values of each line
+    #   - _x_variation: the sum of the squared deviations of x from _x_mean
+    #   - _y_variation: the sum of the squared deviations of y from _y_mean
+    #   - _covariation: the sum of the products of the deviations of x and y
+    _x_mean: np.ndarray
+    _y_mean: np.ndarray
+    _x_variation: np.ndarray
+    _y_variation: np.ndarray
+    _covariation: np.ndarray
+
+    def __init__(self) -> None:
+        self.count = np.array(0.0)
+        self._x_mean = np.array(0.0)
+        self._y_mean = np.array(0.0)
+        self._x_variation = np.array(0.0)
+        self._y_variation = np.array(0.0)
+        self._covariation = np.array(0.0)
+
+    def add(self, x: Any, y: Any) -> None:
+        """Add the points (x, y) along the last axis of x and y to the lines.
+
+        Preconditions:
+            - the shape of x and y without the last axis broadcasts with the shape
+              of the lines
+        """
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+        weights = np.isfinite(x) & np.isfinite(y)
+        x = np.where(weights, x, 0.0)
+        y = np.where(weights, y, 0.0)
+        count = weights.sum(axis=-1).astype(float)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_mean = np.where(count > 0, x.sum(axis=-1) / count, 0.0)
+            y_mean = np.where(count > 0, y.sum(axis=-1) / count, 0.0)
+        x_centred = np.where(weights, x - x_mean[..., np.newaxis], 0.0)
+        y_centred = np.where(weights, y - y_mean[..., np.newaxis], 0.0)
+
+        self._merge(count, x_mean, y_mean, (x_centred ** 2).sum(axis=-1),
+                    (y_centred ** 2).sum(axis=-1), (x_centred * y_centred).sum(axis=-1))
+
+    def merge(self, other: 'RunningRegression') -> None:
+        """Add all the points of the lines of other to the lines.
+
+        >>> first, second = RunningRegression(), RunningRegression()
+        >>> first.add([1.0, 2.0], [3.0, 5.0])
+        >>> second.add([3.0, 4.0], [7.0, 9.0])
+        >>> first.merge(second)
+        >>> first.count.tolist(), first.get_slope().tolist(), first.get_intercept().tolist()
+        (4.0, 2.0, 1.0)
+
+        Preconditions:
+            - the shape of the lines of other broadcasts with the shape of the lines
+        """
+        self._merge(other.count, other._x_mean, other._y_mean, other._x_variation,
+                    other._y_variation, other._covariation)
+
+    def copy(self) -> 'RunningRegression':
+        """Return a new RunningRegression with the same lines, which more points can be
+        added to without changing these lines."""
+        copied = RunningRegression()
+        copied.count = self.count
+        copied._x_mean, copied._y_mean = self._x_mean, self._y_mean
+        copied._x_variation, copied._y_variation = self._x_variation, self._y_variation
+        copied._covariation = self._covariation
+        return copied
+
+    def _merge(self, count: np.ndarray, x_mean: np.ndarray, y_mean: np.ndarray,
+               x_variation: np.ndarray, y_variation: np.ndarray,
+               covariation: np.ndarray) -> None:
+        """Merge the statistics of a batch of data into the statistics of the lines."""
+        total = self.count + count
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fraction = np.where(total > 0, count / total, 0.0)
+        x_difference = x_mean - self._x_mean
+        y_difference = y_mean - self._y_mean
+        weight = self.count * fraction
+
+        self._x_variation = self._x_variation + x_variation + x_difference ** 2 * weight
+        self._y_variation = self._y_variation + y_variation + y_difference ** 2 * weight
+        self._covariation = self._covariation + covariation + x_difference * y_difference * weight
+        self._x_mean = self._x_mean + x_difference * fraction
+        self._y_mean = self._y_mean + y_difference * fraction
+        self.count = total
+
+    def get_slope(self) -> np.ndarray:
+        """Return the slopes of the lines, where a constant x gets a slope of 0 like
+        in RegressionModel."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self._x_variation != 0, self._covariation / self._x_variation, 0.0)
+
+    def get_intercept(self) -> np.ndarray:
+        """Return the intercepts of the lines, which are nan for lines without data."""
+        intercepts = self._y_mean - self.get_slope() * self._x_mean
+        return np.where(self.count > 0, intercepts, np.nan)
+
+    def get_r_squared(self) -> np.ndarray:
+        """Return the r squared values of the lines, which are nan for lines without data.
+
+        Like RegressionModel, a constant y gets 1.0 if it is predicted exactly and 0.0
+        otherwise.
+        """
+        residual = self._y_variation - self.get_slope() * self._covariation
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r_squared = np.where(self._y_variation != 0, 1 - residual / self._y_variation,
+                                 np.where(np.isclose(residual, 0), 1.0, 0.0))
+        return np.where(self.count > 0, r_squared, np.nan)
+
+
+class ModelCache:
+    """A class representing a bounded cache of fitted models, which evicts the
+    least recently used model once it is full.
+
+    Instance Attributes:
+        - max_size: the most models the cache holds at once
+        - hits: the number of times a model was found in the cache
+        - misses: the number of times a model was not found in the cache
+
+    Representation Invariants:
+        - self.max_size > 0
+        - len(self._models) <= self.max_size
+
+    Sample Usage:
+    >>> cache = ModelCache(max_size=2)
+    >>> cache.put(('Alberta', 0), 'model 1')
+    >>> cache.put(('Yukon', 0), 'model 2')
+    >>> cache.get(('Alberta', 0))
+    'model 1'
+    >>> cache.put(('Quebec', 0), 'model 3')  # ('Yukon', 0) is the least recently used
+    >>> cache.get(('Yukon', 0)) is None
+    True
+    >>> (cache.hits, cache.misses)
+    (1, 1)
+    """
+    max_size: int
+    hits: int
+    misses: int
+
+    # Private Instance Attributes:
+    #   - _models: mapping of keys to models, ordered from least to most recently used
+    #   - _datasets: the datasets the cached models were built from
+    _models: OrderedDict
+    _datasets: Tuple[Any, ...]
+
+    def __init__(self, max_size: int = 128) -> None:
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._models = OrderedDict()
+        self._datasets = ()
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+    def get(self, key: tuple) -> Optional[Union[RegressionModel, MultipleRegression]]:
+        """Return the model cached for key, or None if there is no such model"""
+        if key not in self._models:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._models.move_to_end(key)
+        return self._models[key]
+
+    def put(self, key: tuple, model: Union[RegressionModel, MultipleRegression]) -> None:
+        """Add model to the cache under key, evicting the least recently used model
+        if the cache is full.
+        """
+        self._models[key] = model
+        self._models.move_to_end(key)
+        if len(self._models) > self.max_size:
+            self._models.popitem(last=False)
+
+    def use_datasets(self, *datasets: Any) -> None:
+        """Clear the cache if the given datasets aren't the ones the cached models
+        were built from, then remember them.
+
+        >>> cache = ModelCache()
+        >>> ghg_data, bird_data = {}, {}
+        >>> cache.use_datasets(ghg_data, bird_data)
+        >>> cache.put(('Alberta', 0), 'model')
+        >>> cache.use_datasets(ghg_data, bird_data)
+        >>> len(cache)
+        1
+        >>> cache.use_datasets({}, bird_data)
+        >>> len(cache)
+        0
+        """
+        if len(datasets) != len(self._datasets) or \
+                any(new is not old for new, old in zip(datasets, self._datasets)):
+            self.clear()
+            self._datasets = datasets
+
+    def clear(self) -> None:
+        """Remove every model from the cache"""
+        self._models.clear()
 
-        return mapping
 
 # Helper Function
+def _drop_missing(x: list, y: list) -> Tuple[list, list]:
+    """ Return x and y without the positions where x is nan, or x and y themselves
+    if nothing is missing.
+
+    >>> _drop_missing([1.0, float('nan'), 3.0], [4.0, 5.0, 6.0])
+    ([1.0, 3.0], [4.0, 6.0])
+    """
+    x_array = np.asarray(x, dtype=float)
+    missing = np.isnan(x_array)
+    if not missing.any():
+        return (x, y)
+
+    return (x_array[~missing].tolist(), np.asarray(y, dtype=float)[~missing].tolist())
+
+
 def _lists_to_array(x: list, y: list) -> Tuple[np.array, np.array]:
     """ Return the x and y as a tuple of numpy arrays and
     reshape the x array to (-1, 1), so that it is one dimensional
@@ -153,3 +836,77 @@ def _lists_to_array(x: list, y: list) -> Tuple[np.array, np.array]:
     y_array = np.array(y)
 
     return (x_array, y_array)
+
+
+def _fit_least_squares(x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, float]:
+    """ Return the coefficients and intercept of the least squares fit of y on the
+    columns of the 2d array x.
+
+    The data is centred so the intercept doesn't need its own column. With one
+    column, the slope is computed directly; otherwise numpy.linalg.lstsq gives the
+    minimum norm solution, so all-zero columns get a coefficient of 0. With no
+    data at all (every year was missing) the coefficients and intercept are nan.
+
+    >>> coefficients, intercept = _fit_least_squares(np.array([[1.0], [2.0], [3.0]]),
+    ...                                              np.array([3.0, 5.0, 7.0]))
+    >>> (coefficients.tolist(), intercept)
+    ([2.0], 1.0)
+    >>> coefficients, intercept = _fit_least_squares(np.array([[1.0, 0.0], [2.0, 0.0],
+    ...                                                        [3.0, 0.0]]),
+    ...                                              np.array([3.0, 5.0, 7.0]))
+    >>> [round(value, 6) for value in coefficients.tolist()]
+    [2.0, 0.0]
+    """
+    if len(y) == 0:
+        return (np.full(x.shape[1], np.nan), float('nan'))
+
+    x_mean = x.mean(axis=0)
+    y_mean = y.mean()
+    x_centred = x - x_mean
+
+    if x.shape[1] == 1:
+        variation = float(x_centred[:, 0] @ x_centred[:, 0])
+        slope = float(x_centred[:, 0] @ (y - y_mean)) / variation if variation != 0 else 0.0
+        coefficients = np.array([slope])
+    else:
+        coefficients = np.linalg.lstsq(x_centred, y - y_mean, rcond=None)[0]
+
+    return (coefficients, float(y_mean - x_mean @ coefficients))
+
+
+def _r_squared(y: np.ndarray, predicted: np.ndarray) -> float:
+    """ Return the coefficient of determination of the predicted values of y.
+
+    Like scikit-learn, constant data gives 1.0 if it is predicted exactly and
+    0.0 otherwise. No data at all gives nan.
+
+    >>> _r_squared(np.array([1.0, 2.0, 3.0]), np.array([1.0, 2.0, 3.0]))
+    1.0
+    >>> _r_squared(np.array([1.0, 1.0]), np.array([1.0, 2.0]))
+    0.0
+    """
+    if len(y) == 0:
+        return float('nan')
+
+    residual = float(np.sum((y - predicted) ** 2))
+    total = float(np.sum((y - y.mean()) ** 2))
+    if total == 0:
+        return 1.0 if residual == 0 else 0.0
+
+    return 1 - residual / total
+
+
+if __name__ == '__main__':
+    # import python_ta
+    # python_ta.check_all(config={
+    #     'max-line-length': 100,
+    #     'extra-imports': ['python_ta.contracts', 'dataclasses', 'datetime'],
+    #     'disable': ['R1705', 'C0200'],
+    # })
+
+    # import python_ta.contracts
+    # python_ta.contracts.DEBUG_CONTRACTS = False
+    # python_ta.contracts.check_all_contracts()
+
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,383 @@
+"""
+Regularization
+
+Module that contains a class and functions to fit ridge, lasso and elastic net
+regressions of the bird data on several greenhouse gases, which keep the
+coefficients stable when some gases are all zero or move together.
+
+Every fit only depends on the sums of products of the columns (the Gram matrix XᵀX
+and Xᵀy), so they are computed once and a whole path of penalties is fit from them,
+without going over the data again.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional, Tuple
+import numpy as np
+
+# a coordinate descent fit stops once no coefficient (of the standardized columns)
+# changes by more than this fraction of the standard deviation of y in a sweep
+_TOLERANCE = 1e-8
+
+# the most sweeps over the coefficients of a coordinate descent fit
+_MAX_SWEEPS = 10000
+
+
+class GramMatrix:
+    """A class holding the sums of products of the columns of x and y that the
+    regularized fits of y on x are computed from.
+
+    The columns are standardized to a mean of 0 and a variance of 1, so a penalty
+    means the same for every gas whatever its units. Columns that are constant (such
+    as a gas that is all zero) can't be standardized and always get a coefficient of 0.
+
+    Instance Attributes:
+        - count: the number of rows of x and y
+        - x_mean: the mean of each column of x
+        - y_mean: the mean of y
+        - scales: the standard deviation of each column of x, or 0 if it is constant
+        - gram: the Gram matrix of the standardized columns divided by count
+        - xty: the products of the standardized columns and y divided by count
+        - y_variance: the variance of y
+
+    Representation Invariants:
+        - self.gram.shape == (len(self.scales), len(self.scales))
+        - all(self.scales >= 0)
+
+    Sample Usage:
+    >>> gram = GramMatrix(np.array([[1.0, 0.0], [2.0, 0.0], [3.0, 0.0]]),
+    ...                   np.array([3.0, 5.0, 7.0]))
+    >>> gram.x_mean.tolist(), gram.scales.tolist()[1]
+    ([2.0, 0.0], 0.0)
+    >>> np.round(gram.gram, 6).tolist()
+    [[1.0, 0.0], [0.0, 0.0]]
+    """
+    count: int
+    x_mean: np.ndarray
+    y_mean: float
+    scales: np.ndarray
+    gram: np.ndarray
+    xty: np.ndarray
+    y_variance: float
+
+    # Private Instance Attributes:
+    #   - _x_shift: the values subtracted from the columns of x before summing, which
+    #     keeps the sums small with large emission values
+    #   - _y_shift: the value subtracted from y before summing
+    #   - _sums: the count, the sums of the shifted columns of x and of y, and the
+    #     sums of the products of the shifted columns of x with each other, with y,
+    #     and of y with itself
+    _x_shift: np.ndarray
+    _y_shift: float
+    _sums: Tuple[int, np.ndarray, float, np.ndarray, np.ndarray, float]
+
+    def __init__(self, x: np.ndarray, y: np.ndarray) -> None:
+        """Initialize the sums of the 2d array x and the array y.
+
+        Preconditions:
+            - x.ndim == 2 and len(x) == len(y) and len(y) > 0
+        """
+        self._x_shift = x.mean(axis=0)
+        self._y_shift = float(y.mean())
+        x_shifted, y_shifted = x - self._x_shift, y - self._y_shift
+        self._set_sums((len(y), x_shifted.sum(axis=0), float(y_shifted.sum()),
+                        x_shifted.T @ x_shifted, x_shifted.T @ y_shifted,
+                        float(y_shifted @ y_shifted)))
+
+    def without(self, x: np.ndarray, y: np.ndarray) -> 'GramMatrix':
+        """ Return the GramMatrix of the data of this one without the rows x and y,
+        which must be some of its rows, by subtracting their sums.
+
+        >>> x = np.array([[1.0, 2.0], [2.0, 1.0], [3.0, 4.0], [4.0, 3.0]])
+        >>> y = np.array([1.0, 2.0, 2.0, 5.0])
+        >>> held_out = GramMatrix(x, y).without(x[:1], y[:1])
+        >>> bool(np.allclose(held_out.gram, GramMatrix(x[1:], y[1:]).gram))
+        True
+
+        Preconditions:
+            - len(y) < self.count
+        """
+        x_shifted, y_shifted = x - self._x_shift, y - self._y_shift
+        count, x_sum, y_sum, x_products, xy_products, y_products = self._sums
+
+        remaining = GramMatrix.__new__(GramMatrix)
+        remaining._x_shift, remaining._y_shift = self._x_shift, self._y_shift
+        remaining._set_sums((count - len(y), x_sum - x_shifted.sum(axis=0),
+                             y_sum - float(y_shifted.sum()),
+                             x_products - x_shifted.T @ x_shifted,
+                             xy_products - x_shifted.T @ y_shifted,
+                             y_products - float(y_shifted @ y_shifted)))
+        return remaining
+
+    def _set_sums(self, sums: Tuple[int, np.ndarray, float, np.ndarray, np.ndarray,
+                                    float]) -> None:
+        """Set the sums and compute the public attributes from them."""
+        self._sums = sums
+        count, x_sum, y_sum, x_products, xy_products, y_products = sums
+        x_offset, y_offset = x_sum / count, y_sum / count
+
+        covariance = x_products / count - np.outer(x_offset, x_offset)
+        x_y_covariance = xy_products / count - x_offset * y_offset
+        variances = np.diag(covariance)
+
+        self.count = count
+        self.x_mean = self._x_shift + x_offset
+        self.y_mean = self._y_shift + y_offset
+        self.y_variance = max(y_products / count - y_offset ** 2, 0.0)
+
+        # a constant column only has a variance from rounding, relative to its size
+        constant = variances <= (1e-10 * np.maximum(np.abs(self.x_mean), 1.0)) ** 2
+        self.scales = np.where(constant, 0.0, np.sqrt(np.maximum(variances, 0.0)))
+        inverse_scales = np.where(constant, 0.0, 1 / np.where(constant, 1.0, self.scales))
+        self.gram = covariance * np.outer(inverse_scales, inverse_scales)
+        self.xty = x_y_covariance * inverse_scales
+
+
+def fit_path(gram: GramMatrix, penalties: Any,
+             l1_ratio: float = 1.0) -> Tuple[np.ndarray, np.ndarray]:
+    """ Return the coefficients, as an array with a row for each penalty, and the
+    intercepts of the elastic net fits of gram for each penalty in penalties.
+
+    Each fit minimizes, over the standardized columns, the mean squared error divided
+    by 2 plus penalty * (l1_ratio * the sum of the absolute coefficients +
+    (1 - l1_ratio) / 2 * the sum of the squared coefficients), so an l1_ratio of 1 is
+    the lasso and 0 is ridge regression. The coefficients are returned in the units of
+    the original columns.
+
+    Ridge fits are computed in closed form from one eigendecomposition of the Gram
+    matrix. The other fits use coordinate descent on the Gram matrix from the
+    largest penalty to the smallest, starting each from the coefficients of the last.
+
+    Preconditions:
+        - all(penalty >= 0 for penalty in penalties)
+        - 0 <= l1_ratio <= 1
+
+    >>> x = np.array([[1.0, 2.0], [2.0, 1.0], [3.0, 4.0], [4.0, 3.0], [5.0, 6.0]])
+    >>> y = 2.0 * x[:, 0] + 1.0
+    >>> coefficients, intercepts = fit_path(GramMatrix(x, y), [0.0, 100.0])
+    >>> np.round(coefficients, 6).tolist(), np.round(intercepts, 6).tolist()
+    ([[2.0, 0.0], [0.0, 0.0]], [1.0, 7.0])
+    >>> coefficients, _ = fit_path(GramMatrix(x, y), [0.0, 1.0, 10.0], l1_ratio=0.0)
+    >>> np.round(coefficients[0], 6).tolist(), bool((np.diff(coefficients[:, 0]) < 0).all())
+    ([2.0, 0.0], True)
+    """
+    penalties = np.asarray(penalties, dtype=float)
+    active = gram.scales > 0
+    standardized = np.zeros((len(penalties), len(gram.scales)))
+
+    if active.any() and l1_ratio == 0:
+        values, vectors = np.linalg.eigh(gram.gram[np.ix_(active, active)])
+        projected = vectors.T @ gram.xty[active]
+        denominators = values[np.newaxis, :] + penalties[:, np.newaxis]
+        cutoff = np.finfo(float).eps * len(values) * max(float(values.max()), 0.0)
+        with np.errstate(divide='ignore'):
+            shrunk = np.where(denominators > cutoff, projected / denominators, 0.0)
+        standardized[:, active] = shrunk @ vectors.T
+    elif active.any():
+        tolerance = _TOLERANCE * max(np.sqrt(gram.y_variance), 1e-12)
+        active_gram, active_xty = gram.gram[np.ix_(active, active)], gram.xty[active]
+        coefficients = np.zeros(int(active.sum()))
+        for i in np.argsort(-penalties, kind='stable'):
+            coefficients = _coordinate_descent(active_gram, active_xty, float(penalties[i]),
+                                               l1_ratio, coefficients, tolerance)
+            standardized[i, active] = coefficients
+
+    scaled = np.where(active, standardized / np.where(active, gram.scales, 1.0), 0.0)
+    return (scaled, gram.y_mean - scaled @ gram.x_mean)
+
+
+def penalty_grid(gram: GramMatrix, l1_ratio: float = 1.0, count: int = 50,
+                 smallest: float = 1e-3) -> np.ndarray:
+    """ Return <count> penalties spaced evenly on a log scale, from the smallest
+    penalty that makes every lasso or elastic net coefficient 0 down to <smallest>
+    times it, largest first.
+
+    Like scikit-learn, an l1_ratio below 0.001 (such as ridge) uses the grid of 0.001.
+
+    Preconditions:
+        - count >= 1
+        - 0 < smallest <= 1
+
+    >>> gram = GramMatrix(np.array([[1.0], [2.0], [3.0]]), np.array([3.0, 5.0, 7.0]))
+    >>> grid = penalty_grid(gram, count=3, smallest=0.01)
+    >>> np.round(grid, 6).tolist()
+    [1.632993, 0.163299, 0.01633]
+    >>> fit_path(gram, grid[:1])[0].tolist()
+    [[0.0]]
+    """
+    largest = float(np.max(np.abs(gram.xty), initial=0.0)) / max(l1_ratio, 1e-3)
+    if largest == 0:
+        largest = 1.0
+    return np.geomspace(largest, largest * smallest, count)
+
+
+def cross_validate(x: np.ndarray, y: np.ndarray, penalties: Any, l1_ratio: float = 1.0,
+                   folds: int = 5, workers: int = 1,
+                   gram: Optional[GramMatrix] = None) -> np.ndarray:
+    """ Return the mean squared error of predicting each row of y when it is held out,
+    for each penalty in penalties, using <folds> blocks of consecutive rows.
+
+    The Gram matrix of all the rows is computed once, or taken from gram if it is given,
+    and the Gram matrix without each block is found by subtracting the sums of the
+    block. The folds are fit in a pool of <workers> threads.
+
+    Preconditions:
+        - x.ndim == 2 and len(x) == len(y)
+        - 2 <= folds <= len(y)
+        - workers >= 1
+        - gram is None or gram is the GramMatrix of x and y
+
+    >>> rng = np.random.default_rng(0)
+    >>> x = rng.normal(0.0, 1.0, (40, 3))
+    >>> y = x @ np.array([3.0, 0.0, -2.0]) + rng.normal(0.0, 1.0, 40)
+    >>> errors = cross_validate(x, y, [0.01, 100.0])
+    >>> bool(errors[0] < errors[1])
+    True
+    >>> bool(np.allclose(cross_validate(x, y, [0.01, 100.0], workers=3), errors))
+    True
+    >>> bool(np.allclose(cross_validate(x, y, [0.01, 100.0], gram=GramMatrix(x, y)), errors))
+    True
+    """
+    penalties = np.asarray(penalties, dtype=float)
+    if gram is None:
+        gram = GramMatrix(x, y)
+
+    def fold_errors(rows: np.ndarray) -> np.ndarray:
+        coefficients, intercepts = fit_path(gram.without(x[rows], y[rows]), penalties,
+                                            l1_ratio)
+        predicted = x[rows] @ coefficients.T + intercepts
+        return np.sum((predicted - y[rows, np.newaxis]) ** 2, axis=0)
+
+    blocks = np.array_split(np.arange(len(y)), folds)
+    if workers == 1:
+        errors = [fold_errors(rows) for rows in blocks]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            errors = list(executor.map(fold_errors, blocks))
+
+    return np.sum(errors, axis=0) / len(y)
+
+
+def choose_penalty(x: np.ndarray, y: np.ndarray, penalties: Optional[List[float]] = None,
+                   l1_ratio: float = 1.0, folds: int = 5, workers: int = 1,
+                   gram: Optional[GramMatrix] = None) -> float:
+    """ Return the penalty in penalties with the lowest cross-validated error (see
+    cross_validate), preferring the largest penalty if several are equally good.
+
+    If penalties is None, the penalties of penalty_grid are used. The Gram matrix of x
+    and y is only computed if gram isn't given.
+
+    Preconditions:
+        - x.ndim == 2 and len(x) == len(y)
+        - 2 <= folds <= len(y)
+        - workers >= 1
+        - gram is None or gram is the GramMatrix of x and y
+
+    >>> rng = np.random.default_rng(1)
+    >>> x = rng.normal(0.0, 1.0, (30, 2))
+    >>> choose_penalty(x, rng.normal(0.0, 1.0, 30), [0.0, 0.1, 10.0])  # y is only noise
+    10.0
+    """
+    if gram is None:
+        gram = GramMatrix(x, y)
+    if penalties is None:
+        penalties = penalty_grid(gram, l1_ratio)
+    penalties = np.sort(np.asarray(penalties, dtype=float))[::-1]
+    errors = cross_validate(x, y, penalties, l1_ratio, folds, workers, gram)
+    return float(penalties[np.argmin(errors)])
+
+
+# Helper functions
+def _coordinate_descent(gram: np.ndarray, xty: np.ndarray, penalty: float, l1_ratio: float,
+                        start: np.ndarray, tolerance: float) -> np.ndarray:
+    """ Return the elastic net coefficients of the standardized Gram matrix gram (with
+    only columns that aren't constant) for one penalty, starting from start.
+
+    Each coefficient in turn is set to its best value given the others, with the
+    covariance updates of Friedman, Hastie and Tibshirani, which only use the Gram
+    matrix and not the data. When gases move together this converges slowly, so once
+    a sweep leaves the same coefficients at 0 as the last one, the others are solved
+    for exactly with _solve_support, which is kept if it is the optimum.
+    """
+    l1_penalty, l2_penalty = penalty * l1_ratio, penalty * (1 - l1_ratio)
+    # with at most a few columns, python floats are faster than numpy scalars
+    rows, targets, coefficients = gram.tolist(), xty.tolist(), start.tolist()
+    columns = range(len(coefficients))
+    zeros = None
+    for _ in range(_MAX_SWEEPS):
+        largest_change = 0.0
+        for j in columns:
+            row = rows[j]
+            residual = targets[j] - sum([row[k] * coefficients[k] for k in columns]) \
+                + row[j] * coefficients[j]
+            if residual > l1_penalty:
+                new_value = (residual - l1_penalty) / (row[j] + l2_penalty)
+            elif residual < -l1_penalty:
+                new_value = (residual + l1_penalty) / (row[j] + l2_penalty)
+            else:
+                new_value = 0.0
+            largest_change = max(largest_change, abs(new_value - coefficients[j]))
+            coefficients[j] = new_value
+        if largest_change <= tolerance:
+            break
+
+        new_zeros = [value == 0.0 for value in coefficients]
+        if new_zeros == zeros:
+            solution = _solve_support(gram, xty, np.array(coefficients), l1_penalty,
+                                      l2_penalty, tolerance)
+            if solution is not None:
+                return solution
+        zeros = new_zeros
+
+    return np.array(coefficients)
+
+
+def _solve_support(gram: np.ndarray, xty: np.ndarray, coefficients: np.ndarray,
+                   l1_penalty: float, l2_penalty: float,
+                   tolerance: float) -> Optional[np.ndarray]:
+    """ Return the elastic net coefficients with the same coefficients at 0 and the same
+    signs as coefficients, solved for exactly, or None if they aren't the optimum.
+
+    With the zero coefficients and the signs fixed, the optimum is the solution of a
+    linear system. It is the optimum of the whole problem if the signs of the solution
+    don't change and no zero coefficient would improve the fit by more than the
+    penalty (the Karush-Kuhn-Tucker conditions).
+
+    >>> gram, xty = np.array([[1.0, 0.5], [0.5, 1.0]]), np.array([1.0, 0.5])
+    >>> _solve_support(gram, xty, np.array([0.9, 0.0]), 0.1, 0.0, 1e-9).tolist()
+    [0.9, 0.0]
+    >>> _solve_support(gram, xty, np.array([0.9, 0.1]), 0.1, 0.0, 1e-9) is None
+    True
+    """
+    support = np.flatnonzero(coefficients)
+    signs = np.sign(coefficients[support])
+    solution = np.zeros(len(coefficients))
+    if len(support) > 0:
+        system = gram[np.ix_(support, support)] + l2_penalty * np.eye(len(support))
+        solution[support] = np.linalg.lstsq(system, xty[support] - l1_penalty * signs,
+                                            rcond=None)[0]
+        if not (np.sign(solution[support]) == signs).all():
+            return None
+
+    gradient = xty - gram @ solution - l2_penalty * solution
+    zero = np.ones(len(coefficients), dtype=bool)
+    zero[support] = False
+    if not np.allclose(gradient[support], l1_penalty * signs, rtol=0.0, atol=tolerance) \
+            or (np.abs(gradient[zero]) > l1_penalty + tolerance).any():
+        return None
+
+    return solution
+
+
+if __name__ == '__main__':
+    # import python_ta
+    # python_ta.check_all(config={
+    #     'max-line-length': 100,
+    #     'extra-imports': ['python_ta.contracts', 'dataclasses', 'datetime'],
+    #     'disable': ['R1705', 'C0200'],
+    # })
+
+    # import python_ta.contracts
+    # python_ta.contracts.DEBUG_CONTRACTS = False
+    # python_ta.contracts.check_all_contracts()
+
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,200 @@
+"""
+Resampling
+
+Module that contains functions to estimate the uncertainty of the regression
+coefficients with the bootstrap, and to test whether a model explains more than
+chance with a permutation test.
+
+All the resamples are drawn at once as one matrix of row indices, and all of them
+are fit by one batched least squares solve instead of a fit per resample.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+import numpy as np
+
+
+def resample_indices(n: int, resamples: int, seed: Optional[int] = None) -> np.ndarray:
+    """ Return a (resamples, n) array where each row is the indices of a bootstrap
+    resample of n data points, drawn with replacement.
+
+    >>> indices = resample_indices(5, 3, seed=0)
+    >>> indices.shape, bool((indices >= 0).all() and (indices < 5).all())
+    ((3, 5), True)
+    >>> bool((resample_indices(5, 3, seed=0) == indices).all())
+    True
+    """
+    return np.random.default_rng(seed).integers(0, n, size=(resamples, n))
+
+
+def permutation_indices(n: int, permutations: int, seed: Optional[int] = None) -> np.ndarray:
+    """ Return a (permutations, n) array where each row is a random permutation of the
+    indices of n data points.
+
+    >>> indices = permutation_indices(4, 2, seed=0)
+    >>> [sorted(row) for row in indices.tolist()]
+    [[0, 1, 2, 3], [0, 1, 2, 3]]
+    """
+    # Sorting random numbers gives a uniformly random permutation of each row
+    # (Generator.permuted would need numpy 1.20)
+    return np.random.default_rng(seed).random((permutations, n)).argsort(axis=1)
+
+
+def fit_batched(x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """ Return the coefficients, as a (r, k) array, and the intercepts, as an array of
+    length r, of the least squares fits of each y[i] on the columns of x[i], where x
+    has the shape (r, n, k) and y has the shape (r, n).
+
+    Like _fit_least_squares in regression, the data is centred and the minimum norm
+    solution is used, so a column that is constant within a resample gets a
+    coefficient of 0.
+
+    >>> x = np.array([[[1.0], [2.0], [3.0]], [[1.0], [1.0], [1.0]]])
+    >>> y = np.array([[3.0, 5.0, 7.0], [2.0, 4.0, 6.0]])
+    >>> coefficients, intercepts = fit_batched(x, y)
+    >>> np.round(coefficients, 6).tolist(), np.round(intercepts, 6).tolist()
+    ([[2.0], [0.0]], [1.0, 4.0])
+    """
+    x_mean = x.mean(axis=1, keepdims=True)
+    y_mean = y.mean(axis=1, keepdims=True)
+    cutoff = np.finfo(float).eps * max(x.shape[1], x.shape[2])
+    inverses = np.linalg.pinv(x - x_mean, cutoff)
+    coefficients = np.einsum('rkn,rn->rk', inverses, y - y_mean)
+    intercepts = y_mean[:, 0] - np.einsum('rk,rk->r', x_mean[:, 0], coefficients)
+    return (coefficients, intercepts)
+
+
+def bootstrap_coefficients(x: np.ndarray, y: np.ndarray, resamples: int = 1000,
+                           seed: Optional[int] = None, workers: int = 1) -> np.ndarray:
+    """ Return a (resamples, k + 1) array of the coefficients of the least squares fit
+    of y on the k columns of the 2d array x for each bootstrap resample of the rows,
+    with the intercept as the last column.
+
+    The resamples are split across <workers> threads; since they are all drawn before
+    being split, the result only depends on the seed.
+
+    Preconditions:
+        - x.ndim == 2 and len(x) == len(y) and len(y) > 0
+        - resamples >= 1
+        - workers >= 1
+
+    >>> x = np.arange(20.0).reshape(-1, 1)
+    >>> y = 3.0 * x[:, 0] + 2.0
+    >>> np.round(bootstrap_coefficients(x, y, resamples=4, seed=1), 6).tolist()
+    [[3.0, 2.0], [3.0, 2.0], [3.0, 2.0], [3.0, 2.0]]
+    """
+    indices = resample_indices(len(y), resamples, seed)
+
+    def fit_chunk(chunk: np.ndarray) -> np.ndarray:
+        coefficients, intercepts = fit_batched(x[chunk], y[chunk])
+        return np.column_stack([coefficients, intercepts])
+
+    return _map_chunks(fit_chunk, indices, workers)
+
+
+def bootstrap_intervals(x: np.ndarray, y: np.ndarray, resamples: int = 1000,
+                        confidence: float = 0.95, seed: Optional[int] = None,
+                        workers: int = 1) -> np.ndarray:
+    """ Return a (k + 1, 2) array of the lower and upper bounds of the percentile
+    bootstrap confidence intervals of the coefficients of the least squares fit of y
+    on the k columns of x, with the interval of the intercept last.
+
+    Preconditions:
+        - x.ndim == 2 and len(x) == len(y) and len(y) > 0
+        - resamples >= 1
+        - 0 < confidence < 1
+        - workers >= 1
+
+    >>> rng = np.random.default_rng(0)
+    >>> x = rng.uniform(0.0, 10.0, (30, 2))
+    >>> y = x @ np.array([2.0, -1.0]) + 5.0 + rng.normal(0.0, 0.5, 30)
+    >>> intervals = bootstrap_intervals(x, y, resamples=2000, seed=0)
+    >>> coefficients, intercepts = fit_batched(x[np.newaxis], y[np.newaxis])
+    >>> estimates = coefficients[0].tolist() + intercepts.tolist()
+    >>> [bool(lower < estimate < upper) for (lower, upper), estimate
+    ...  in zip(intervals.tolist(), estimates)]
+    [True, True, True]
+    >>> bool(intervals[0, 1] - intervals[0, 0] < 0.2)  # 2.0 +- 0.5 noise over 30 points
+    True
+    >>> bool((bootstrap_intervals(x, y, resamples=2000, seed=0, workers=4) == intervals).all())
+    True
+    """
+    coefficients = bootstrap_coefficients(x, y, resamples, seed, workers)
+    tail = (1 - confidence) / 2
+    return np.quantile(coefficients, [tail, 1 - tail], axis=0).T
+
+
+def permutation_p_value(x: np.ndarray, y: np.ndarray, permutations: int = 1000,
+                        seed: Optional[int] = None, workers: int = 1) -> float:
+    """ Return the p-value of the permutation test of whether the columns of x explain
+    y better than chance: the fraction of random orderings of y (counting the real
+    one) whose least squares fit on x has an r squared value at least as high.
+
+    Since x is the same for every ordering, its pseudo-inverse is computed once and
+    all the orderings are fit by one matrix product.
+
+    Preconditions:
+        - x.ndim == 2 and len(x) == len(y) and len(y) > 1
+        - permutations >= 1
+        - workers >= 1
+
+    >>> rng = np.random.default_rng(0)
+    >>> x = rng.uniform(0.0, 10.0, (25, 1))
+    >>> permutation_p_value(x, 2.0 * x[:, 0] + rng.normal(0.0, 1.0, 25), seed=0)
+    0.000999000999000999
+    >>> permutation_p_value(x, rng.normal(0.0, 1.0, 25), seed=0) > 0.05
+    True
+    """
+    x_centred = x - x.mean(axis=0)
+    inverse = np.linalg.pinv(x_centred, np.finfo(float).eps * max(x.shape))
+    y_centred = y - y.mean()
+    total = float(y_centred @ y_centred)
+    if total == 0:
+        return 1.0
+
+    def r_squared(orderings: np.ndarray) -> np.ndarray:
+        y_orderings = y_centred[orderings]
+        fitted = (y_orderings @ inverse.T) @ x_centred.T
+        return 1 - np.sum((y_orderings - fitted) ** 2, axis=1) / total
+
+    observed = float(r_squared(np.arange(len(y))[np.newaxis])[0])
+    permuted = _map_chunks(r_squared, permutation_indices(len(y), permutations, seed),
+                           workers)
+    # a small tolerance, so orderings that fit exactly as well aren't lost to rounding
+    at_least = int(np.sum(permuted >= observed - 1e-12))
+    return (at_least + 1) / (permutations + 1)
+
+
+# Helper functions
+def _map_chunks(function: Callable[[np.ndarray], np.ndarray], rows: np.ndarray,
+                workers: int) -> np.ndarray:
+    """ Return the results of function on the rows of rows, concatenated in order,
+    calling it on <workers> chunks of the rows in a thread pool if workers > 1.
+
+    numpy releases the GIL in its linear algebra, so the chunks can run in parallel;
+    this helps with many resamples when numpy's own linear algebra is single threaded.
+
+    >>> _map_chunks(lambda chunk: chunk.sum(axis=1), np.arange(12).reshape(6, 2), 4).tolist()
+    [1, 5, 9, 13, 17, 21]
+    """
+    if workers == 1:
+        return function(rows)
+
+    chunks = [chunk for chunk in np.array_split(rows, workers) if len(chunk) > 0]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return np.concatenate(list(executor.map(function, chunks)))
+
+
+if __name__ == '__main__':
+    # import python_ta
+    # python_ta.check_all(config={
+    #     'max-line-length': 100,
+    #     'extra-imports': ['python_ta.contracts', 'dataclasses', 'datetime'],
+    #     'disable': ['R1705', 'C0200'],
+    # })
+
+    # import python_ta.contracts
+    # python_ta.contracts.DEBUG_CONTRACTS = False
+    # python_ta.contracts.check_all_contracts()
+
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,307 @@
+"""
+Selection
+
+Module contains the Selection class that stores the user's selections and
+builds the regression model for them.
+
+This module doesn't import pygame, so models can be built without the interface.
+"""
+
+import threading
+from typing import Dict, List, Optional, Tuple, Union
+from modules.read_data import Bird, GHGStore, GreenhouseGas, Region, filter_bird_data
+from modules.regression import ModelCache, RegressionModel, MultipleRegression
+from modules.model_table import ModelTable
+
+
+class Selection:
+    """Class to store and handle user's selections.
+
+    Representation Invariants:
+        - 0 <= self._bird <= 8
+        - 0 <= self._ghg <= 9
+        - self._category >= 0
+
+    >>> my_selection = Selection()
+    """
+
+    # Private Instance Attributes:
+    #   - _region: the user selected region
+    #   - _bird: the user selected bird
+    #   - _ghg: the user selected greenhouse gas
+    #   - _category: the CategoryID of the user selected sector (0 is the total of
+    #     every sector)
+    #   - _model_cache: the models already built, keyed by the selections and year range
+    #   - _model_table: precomputed single variable models to build models from, if any
+    #   - _lock: held while a model is looked up or built, so copies of the selection
+    #     can use the shared model cache from other threads
+
+    _region: Optional[str] = None
+    _bird: Optional[int] = None
+    _ghg: Optional[int] = None
+    _category: int = 0
+    _model_cache: ModelCache
+    _model_table: Optional[ModelTable] = None
+    _lock: threading.Lock
+
+    def __init__(self, cache_size: int = 64) -> None:
+        self._region = None
+        self._bird = None
+        self._ghg = None
+        self._category = 0
+        self._model_cache = ModelCache(cache_size)
+        self._model_table = None
+        self._lock = threading.Lock()
+
+    def copy(self) -> 'Selection':
+        """Returns a copy of the current selections that shares this selection's model
+        cache and model table, so a model can be built for the current selections on
+        another thread while this selection keeps changing.
+
+        >>> my_selection = Selection()
+        >>> my_selection.change_region('Alberta')
+        >>> snapshot = my_selection.copy()
+        >>> my_selection.change_region('Quebec')
+        >>> snapshot._region
+        'Alberta'
+        """
+        snapshot = Selection.__new__(Selection)
+        snapshot._region = self._region
+        snapshot._bird = self._bird
+        snapshot._ghg = self._ghg
+        snapshot._category = self._category
+        snapshot._model_cache = self._model_cache
+        snapshot._model_table = self._model_table
+        snapshot._lock = self._lock
+        return snapshot
+
+    def use_model_table(self, model_table: Optional[ModelTable]) -> None:
+        """Serves single variable models from model_table (made by fit_model_table)
+        instead of fitting them, for the datasets the table was fit from.
+        """
+        self._model_table = model_table
+
+    def handle_selection(self, current_page: int, selection: str) -> None:
+        """Handles what selection the user chooses and updates instance attributes
+        accordingly.
+
+        >>> my_selection = Selection()
+        >>> my_selection.handle_selection(0, 'Alberta')
+        >>> my_selection._region
+        'Alberta'
+        """
+        if current_page == 0:
+            self.change_region(selection)
+        elif current_page == 1:
+            self.change_bird(selection)
+        elif current_page == 2:
+            self.change_ghg(selection)
+
+    def get_model(self, ghg_data: Union[Dict[str, List[GreenhouseGas]], GHGStore],
+                  bird_data: Dict[int, List[str]]) -> Union[RegressionModel, MultipleRegression]:
+        """Returns RegressionModel for current selections (the bird index with respect
+        to the amount of ghg's produced for the selected region).
+
+        If ghg_data is a GHGStore, the greenhouse gas data is taken as views of the store,
+        and comes from the selected sector.
+        Models are only built the first time they are asked for; after that they are
+        returned from the model cache until the datasets change.
+
+        >>> from modules.read_data import read_bird_data, read_ghg_store
+        >>> ghg_data, bird_data = read_ghg_store(), read_bird_data()
+        >>> my_selection = Selection()
+        >>> my_selection.change_region('Alberta')
+        >>> my_selection.change_bird('Seabirds')
+        >>> my_selection.change_ghg('CO2')
+        >>> model = my_selection.get_model(ghg_data, bird_data)
+        >>> my_selection.get_model(ghg_data, bird_data) is model
+        True
+        >>> my_selection.get_cache_info()
+        {'hits': 1, 'misses': 1, 'size': 1, 'max_size': 64}
+        """
+        key = self.get_key(ghg_data, bird_data)
+        _, _, _, _, start_year, end_year = key
+
+        with self._lock:
+            self._model_cache.use_datasets(ghg_data, bird_data)
+            model = self._model_cache.get(key)
+            if model is None:
+                model = self._build_model(ghg_data, bird_data, start_year, end_year)
+                self._model_cache.put(key, model)
+
+        return model
+
+    def get_key(self, ghg_data: Union[Dict[str, List[GreenhouseGas]], GHGStore],
+                bird_data: Dict[int, List[str]]
+                ) -> Tuple[Optional[str], Optional[int], Optional[int], int, int, int]:
+        """Returns the region, bird index, gas index, sector CategoryID, start year and
+        end year of the model for the current selections.
+
+        The years are the first and last years that both the selected region (and
+        sector) and the bird data have data for, so years added to the datasets are used.
+
+        Preconditions:
+            - self._region is not None
+
+        >>> from modules.read_data import read_bird_data, read_ghg_store
+        >>> ghg_data, bird_data = read_ghg_store(), read_bird_data()
+        >>> my_selection = Selection()
+        >>> my_selection.change_region('Nunavut')
+        >>> my_selection.get_key(ghg_data, bird_data)
+        ('Nunavut', None, None, 0, 1999, 2016)
+        """
+        start_year, end_year = self._get_years(ghg_data, bird_data)
+        return (self._region, self._bird, self._ghg, self._category, start_year, end_year)
+
+    def get_region(self) -> Optional[str]:
+        """Returns the selected region."""
+        return self._region
+
+    def get_cache_info(self) -> Dict[str, int]:
+        """Returns the hits, misses, size and maximum size of the model cache."""
+        return {'hits': self._model_cache.hits,
+                'misses': self._model_cache.misses,
+                'size': len(self._model_cache),
+                'max_size': self._model_cache.max_size}
+
+    def _get_years(self, ghg_data: Union[Dict[str, List[GreenhouseGas]], GHGStore],
+                   bird_data: Dict[int, List[str]]) -> Tuple[int, int]:
+        """Returns the first and last year that both the selected region (and sector)
+        and the bird data have data for."""
+        if isinstance(ghg_data, GHGStore):
+            years = ghg_data.get_years(self._region, self._category)
+            first, last = int(years[0]), int(years[-1])
+        else:
+            years = [row.year for row in ghg_data[self._region]]
+            first, last = min(years), max(years)
+
+        return (max(first, min(bird_data)), min(last, max(bird_data)))
+
+    def _build_model(self, ghg_data: Union[Dict[str, List[GreenhouseGas]], GHGStore],
+                     bird_data: Dict[int, List[str]], start_year: int,
+                     end_year: int) -> Union[RegressionModel, MultipleRegression]:
+        """Returns a new model for the current selections using the data from
+        <start_year> to <end_year>.
+
+        Preconditions:
+            - isinstance(ghg_data, GHGStore) or self._category == 0
+        """
+        if self._ghg != 9 and self._model_table is not None \
+                and self._model_table.is_built_from(ghg_data, bird_data) \
+                and self._model_table.has_model(self._region, start_year, end_year,
+                                                self._category):
+            return self._model_table.get_model(self._region, self._ghg, self._bird)
+
+        # Filtering data
+        filtered_bird_data = filter_bird_data(bird_data, self._bird, start_year, end_year)
+
+        # Creating class instances
+        if isinstance(ghg_data, GHGStore):
+            region = Region(ghg_data, self._region, self._category)
+        else:
+            region = Region(ghg_data[self._region])
+        bird = Bird(filtered_bird_data)
+
+        bird.adjust_data(start_year, end_year)
+        bird_list = bird.list_data
+        if self._ghg == 9:
+            region.initialize_lists(start_year, end_year)
+            x_vars = {'CO2': region.co2,
+                      'CH4': region.ch4,
+                      'N2O': region.n2o,
+                      'HFC': region.hfc,
+                      'PFC': region.pfc,
+                      'SF6': region.sf6,
+                      'NF3': region.nf3}
+
+            return MultipleRegression(x_vars, bird_list)
+
+        else:
+            ghg_list = region.adjust_list(start_year, end_year, self._ghg)
+
+            return RegressionModel(ghg_list, bird_list)
+
+    def change_region(self, province_name: str) -> None:
+        """Changes region selection to selected region. The sector is reset to the total
+        of every sector when the region changes, since not every region has data for
+        every sector.
+
+        >>> my_selection = Selection()
+        >>> my_selection.change_region('Alberta')
+        >>> my_selection.change_sector(540)
+        >>> my_selection.change_region('Alberta')
+        >>> my_selection.get_sector()
+        540
+        >>> my_selection.change_region('Canada')
+        >>> my_selection.get_sector()
+        0
+        """
+        if province_name != self._region:
+            self._category = 0
+        self._region = province_name
+
+    def change_sector(self, category: int) -> None:
+        """Changes sector selection to the sector with the given CategoryID (0 for the
+        total of every sector).
+
+        >>> from modules.read_data import read_bird_data, read_ghg_store
+        >>> ghg_data, bird_data = read_ghg_store(), read_bird_data()
+        >>> my_selection = Selection()
+        >>> for region, bird, ghg in [('Alberta', 'Forest Birds', 'CH4')]:
+        ...     my_selection.change_region(region)
+        ...     my_selection.change_bird(bird)
+        ...     my_selection.change_ghg(ghg)
+        >>> total = my_selection.get_model(ghg_data, bird_data)
+        >>> my_selection.change_sector(510)  # Enteric Fermentation
+        >>> enteric = my_selection.get_model(ghg_data, bird_data)
+        >>> enteric is total, enteric.get_data()[0][0] < total.get_data()[0][0]
+        (False, True)
+        """
+        self._category = category
+
+    def get_sector(self) -> int:
+        """Returns the CategoryID of the selected sector."""
+        return self._category
+
+    def change_bird(self, bird_name: str) -> None:
+        """Changes bird selection to selected bird based on bird_index."""
+        bird_dict = {'Waterfowl': 0,
+                     'Birds of Prey': 1,
+                     'Wetland Birds': 2,
+                     'Seabirds': 3,
+                     'Forest Birds': 4,
+                     'All Other Birds': 5,
+                     'Shorebirds': 6,
+                     'Grassland Birds': 7,
+                     'Aerial Insectivores': 8}
+        self._bird = bird_dict[bird_name]
+
+    def change_ghg(self, ghg_name: str) -> None:
+        """Changes ghg selection to selected ghg based on ghg_index."""
+        ghg_dict = {'CO2': 0,
+                    'CH4': 1,
+                    'N2O': 2,
+                    'HFC': 3,
+                    'PFC': 4,
+                    'SF6': 5,
+                    'NF3': 6,
+                    'Total': 7,
+                    'Multiple Regression': 9}
+        self._ghg = ghg_dict[ghg_name]
+
+
+if __name__ == '__main__':
+    # import python_ta
+    # python_ta.check_all(config={
+    #     'max-line-length': 100,
+    #     'extra-imports': ['python_ta.contracts', 'dataclasses', 'datetime'],
+    #     'disable': ['R1705', 'C0200'],
+    # })
+
+    # import python_ta.contracts
+    # python_ta.contracts.DEBUG_CONTRACTS = False
+    # python_ta.contracts.check_all_contracts()
+
+    import doctest
+
+    doctest.testmod()
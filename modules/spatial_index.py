@@ -0,0 +1,157 @@
+"""
+Spatial Index
+
+Module contains the GridIndex class, which finds the rectangles (such as the rects
+of buttons) under a point without checking every rectangle.
+
+This module doesn't import pygame; a rectangle is anything that unpacks to
+(x, y, width, height), which includes pygame.Rect.
+"""
+
+from typing import Dict, Hashable, List, Sequence, Set, Tuple
+
+# a rectangle as (x, y, width, height)
+Rectangle = Tuple[int, int, int, int]
+
+
+class GridIndex:
+    """Class to find the items whose rectangles contain a point or overlap an area.
+
+    The screen is split into square cells of cell_size pixels, and each item is listed
+    in every cell its rectangle overlaps, so a query only checks the items of the cells
+    it touches. Items are returned in the order they were first inserted.
+
+    Instance Attributes:
+        - cell_size: the width and height of the cells in pixels
+
+    Representation Invariants:
+        - self.cell_size > 0
+        - all(item in self._order for item in self._rects)
+
+    Sample Usage:
+    >>> index = GridIndex(cell_size=50)
+    >>> index.insert('a', (0, 0, 100, 40))
+    >>> index.insert('b', (60, 0, 30, 30))
+    >>> index.query_point((70, 10))
+    ['a', 'b']
+    >>> index.update('b', (300, 300, 30, 30))
+    >>> index.query_point((70, 10)), index.query_point((310, 310))
+    (['a'], ['b'])
+    >>> index.query_rect((0, 0, 400, 400))
+    ['a', 'b']
+    """
+    cell_size: int
+
+    # Private Instance Attributes:
+    #   - _cells: mapping of a cell (column, row) to the items whose rectangle overlaps it
+    #   - _rects: mapping of each item to its rectangle
+    #   - _order: mapping of each item to the number of items inserted before it
+    _cells: Dict[Tuple[int, int], List[Hashable]]
+    _rects: Dict[Hashable, Rectangle]
+    _order: Dict[Hashable, int]
+
+    def __init__(self, cell_size: int = 64) -> None:
+        self.cell_size = cell_size
+        self._cells = {}
+        self._rects = {}
+        self._order = {}
+
+    def __len__(self) -> int:
+        return len(self._rects)
+
+    def insert(self, item: Hashable, rect: Sequence[int]) -> None:
+        """Adds item with the given rectangle, replacing its rectangle if it was
+        already added."""
+        if item in self._rects:
+            self.remove(item)
+        self._order.setdefault(item, len(self._order))
+
+        rect = _to_rectangle(rect)
+        self._rects[item] = rect
+        for cell in self._get_cells(rect):
+            self._cells.setdefault(cell, []).append(item)
+
+    def remove(self, item: Hashable) -> None:
+        """Removes item, if it was added."""
+        rect = self._rects.pop(item, None)
+        if rect is None:
+            return
+
+        for cell in self._get_cells(rect):
+            self._cells[cell].remove(item)
+            if not self._cells[cell]:
+                del self._cells[cell]
+
+    def update(self, item: Hashable, rect: Sequence[int]) -> None:
+        """Moves item to the given rectangle, if it isn't already there."""
+        if self._rects.get(item) != _to_rectangle(rect):
+            self.insert(item, rect)
+
+    def query_point(self, point: Tuple[int, int]) -> List[Hashable]:
+        """Returns the items whose rectangle contains point, like pygame's
+        Rect.collidepoint (the right and bottom edges are outside the rectangle).
+        """
+        x, y = point
+        cell = (int(x) // self.cell_size, int(y) // self.cell_size)
+        items = [item for item in self._cells.get(cell, [])
+                 if _contains(self._rects[item], x, y)]
+        return sorted(items, key=self._order.__getitem__)
+
+    def query_rect(self, rect: Sequence[int]) -> List[Hashable]:
+        """Returns the items whose rectangle overlaps rect."""
+        rect = _to_rectangle(rect)
+        found: Set[Hashable] = set()
+        for cell in self._get_cells(rect):
+            found.update(item for item in self._cells.get(cell, [])
+                         if _overlaps(self._rects[item], rect))
+        return sorted(found, key=self._order.__getitem__)
+
+    def _get_cells(self, rect: Rectangle) -> List[Tuple[int, int]]:
+        """Returns the cells that rect overlaps (at least one, even if rect is empty)."""
+        x, y, width, height = rect
+        first_column, first_row = x // self.cell_size, y // self.cell_size
+        last_column = (x + max(width, 1) - 1) // self.cell_size
+        last_row = (y + max(height, 1) - 1) // self.cell_size
+        return [(column, row) for column in range(first_column, last_column + 1)
+                for row in range(first_row, last_row + 1)]
+
+
+# Helper functions
+def _to_rectangle(rect: Sequence[int]) -> Rectangle:
+    """Returns rect as a tuple of integers (x, y, width, height).
+
+    >>> _to_rectangle([1.0, 2, 3, 4])
+    (1, 2, 3, 4)
+    """
+    x, y, width, height = rect
+    return (int(x), int(y), int(width), int(height))
+
+
+def _contains(rect: Rectangle, x: int, y: int) -> bool:
+    """Returns whether the point (x, y) is inside rect."""
+    return rect[0] <= x < rect[0] + rect[2] and rect[1] <= y < rect[1] + rect[3]
+
+
+def _overlaps(rect: Rectangle, other: Rectangle) -> bool:
+    """Returns whether rect and other overlap, like pygame's Rect.colliderect."""
+    return rect[0] < other[0] + other[2] and other[0] < rect[0] + rect[2] and \
+        rect[1] < other[1] + other[3] and other[1] < rect[1] + rect[3]
+
+
+if __name__ == '__main__':
+    # import python_ta
+
+    # python_ta.check_all(config={
+    #     'max-line-length': 100,
+    #     'extra-imports': ['python_ta.contracts', 'dataclasses', 'datetime'],
+    #     'disable': ['R1705', 'C0200'],
+    # })
+
+    # import python_ta.contracts
+
+    # python_ta.contracts.DEBUG_CONTRACTS = False
+    # python_ta.contracts.check_all_contracts()
+
+    import doctest
+
+    doctest.testmod()
@@ -0,0 +1,173 @@
+"""
+Tasks
+
+Module contains the TaskExecutor class, which runs slow work (fitting models and
+plotting graphs) on background threads so the pygame window keeps responding, and
+hands the results back to the main loop.
+"""
+
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Optional
+from modules.interface_objects import Button
+
+
+@dataclass
+class Task:
+    """Class to hold a task submitted to a TaskExecutor.
+
+    Instance Attributes:
+        - future: the future of the function running in the background
+        - on_done: called on the main thread with the result of the function
+        - buttons: the buttons that show the result of the task
+        - submitted: the time the task was submitted, from time.perf_counter
+        - on_error: called on the main thread with the error the function raised, or
+          None if the error is shown on the buttons instead
+    """
+    future: Future
+    on_done: Callable[[Any], None]
+    buttons: List[Button]
+    submitted: float
+    on_error: Optional[Callable[[Exception], None]] = None
+
+
+class TaskExecutor:
+    """Class to run functions on a pool of background threads.
+
+    Every task has a key, and there is at most one task for each key: submitting a
+    task cancels the task with the same key, and the result of a cancelled task is
+    never used, even if it was already running. The results of finished tasks are
+    handled by poll, which has to be called from the main loop.
+
+    Instance Attributes:
+        - computing_delay: how long in seconds a task can run before its buttons are
+          shown as computing
+
+    Sample Usage:
+    >>> results = []
+    >>> executor = TaskExecutor()
+    >>> _ = executor.submit('square', lambda: 3 ** 2, results.append)
+    >>> _ = executor.submit('square', lambda: 4 ** 2, results.append)
+    >>> executor.wait()
+    >>> executor.is_busy()
+    False
+    >>> results
+    [16]
+
+    An error raised by a task is shown on its buttons, unless it has an on_error:
+
+    >>> _ = executor.submit('divide', lambda: 1 / 0, results.append,
+    ...                     on_error=lambda error: results.append(type(error).__name__))
+    >>> executor.wait()
+    >>> results
+    [16, 'ZeroDivisionError']
+    """
+    computing_delay: float
+
+    # Private Instance Attributes:
+    #   - _executor: the thread pool running the tasks
+    #   - _tasks: mapping of key to the task with that key that hasn't been handled yet
+    _executor: ThreadPoolExecutor
+    _tasks: Dict[Hashable, Task]
+
+    def __init__(self, max_workers: int = 2, computing_delay: float = 0.05) -> None:
+        self.computing_delay = computing_delay
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._tasks = {}
+
+    def submit(self, key: Hashable, function: Callable[[], Any],
+               on_done: Callable[[Any], None], buttons: Optional[List[Button]] = None,
+               on_error: Optional[Callable[[Exception], None]] = None) -> Future:
+        """Runs function in the background, cancelling the task with the same key if
+        there is one. Once function returns, the next call to poll calls on_done with
+        its result. If function raises an error, poll calls on_error with it instead,
+        or shows it on the buttons if on_error is None.
+
+        Function must not use anything the main thread changes while it runs.
+        """
+        self.cancel(key)
+        future = self._executor.submit(function)
+        self._tasks[key] = Task(future, on_done, list(buttons or []), time.perf_counter(),
+                                on_error)
+        return future
+
+    def cancel(self, key: Hashable) -> None:
+        """Cancels the task with this key, if there is one."""
+        task = self._tasks.pop(key, None)
+        if task is not None:
+            task.future.cancel()
+            for button in task.buttons:
+                button.set_computing(False)
+
+    def cancel_all(self) -> None:
+        """Cancels every task."""
+        for key in list(self._tasks):
+            self.cancel(key)
+
+    def poll(self) -> bool:
+        """Calls on_done for each task that finished, and shows the buttons of the
+        tasks that have run for longer than self.computing_delay as computing.
+
+        Returns whether any task finished. An error raised by a task is passed to its
+        on_error, or shown on its buttons, so it doesn't stop the main loop.
+        """
+        now = time.perf_counter()
+        finished = False
+        for key, task in list(self._tasks.items()):
+            if task.future.done():
+                del self._tasks[key]
+                for button in task.buttons:
+                    button.set_computing(False)
+                error = task.future.exception()
+                if error is None:
+                    task.on_done(task.future.result())
+                elif task.on_error is not None:
+                    task.on_error(error)
+                else:
+                    for button in task.buttons:
+                        button.update_name(f'Error: {type(error).__name__}: {error}')
+                finished = True
+            elif now - task.submitted >= self.computing_delay:
+                for button in task.buttons:
+                    button.set_computing(True)
+
+        return finished
+
+    def wait(self) -> None:
+        """Waits for every task to finish, and handles the results with poll."""
+        while self._tasks:
+            wait([task.future for task in self._tasks.values()])
+            self.poll()
+
+    def is_busy(self) -> bool:
+        """Returns whether there are tasks whose results haven't been handled."""
+        return len(self._tasks) > 0
+
+    def shutdown(self) -> None:
+        """Cancels every task and stops the threads once the running tasks finish,
+        without waiting for them.
+        """
+        # every queued task is one of self._tasks, so cancelling them leaves only the
+        # running ones (shutdown's cancel_futures needs Python 3.9)
+        self.cancel_all()
+        self._executor.shutdown(wait=False)
+
+
+if __name__ == '__main__':
+    # import python_ta
+
+    # python_ta.check_all(config={
+    #     'max-line-length': 100,
+    #     'extra-imports': ['python_ta.contracts', 'dataclasses', 'datetime'],
+    #     'disable': ['R1705', 'C0200'],
+    # })
+
+    # import python_ta.contracts
+
+    # python_ta.contracts.DEBUG_CONTRACTS = False
+    # python_ta.contracts.check_all_contracts()
+
+    import doctest
+
+    doctest.testmod()
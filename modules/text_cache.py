@@ -0,0 +1,126 @@
+"""
+Text Cache
+
+Module contains the TextCache class, which keeps the text surfaces rendered by
+pygame fonts so the same text is only rendered once, and a shared cache used by
+the interface buttons.
+"""
+
+from collections import OrderedDict
+from typing import List, Tuple
+import pygame
+
+
+class TextCache:
+    """Class to store rendered text surfaces, keyed by font, text and colour. Once the
+    cache is full the least recently used surface is removed.
+
+    Instance Attributes:
+        - max_size: the most surfaces the cache holds at once
+        - hits: the number of times a surface was found in the cache
+        - misses: the number of times a surface had to be rendered
+
+    Representation Invariants:
+        - self.max_size > 0
+        - len(self._surfaces) <= self.max_size
+
+    >>> pygame.font.init()
+    >>> font = pygame.font.Font(None, 20)
+    >>> cache = TextCache(max_size=2)
+    >>> cache.render(font, 'CO2', (0, 0, 0)) is cache.render(font, 'CO2', (0, 0, 0))
+    True
+    >>> (cache.hits, cache.misses)
+    (1, 1)
+    """
+    max_size: int
+    hits: int
+    misses: int
+
+    # Private Instance Attributes:
+    #   - _surfaces: mapping of (font, text, colour) to the rendered text, ordered from
+    #     least to most recently used
+    _surfaces: OrderedDict
+
+    def __init__(self, max_size: int = 512) -> None:
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._surfaces = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._surfaces)
+
+    def render(self, font: pygame.font.Font, text: str,
+               colour: Tuple[int, int, int]) -> pygame.Surface:
+        """Returns the antialiased text rendered with font and colour, only rendering
+        it if it isn't already in the cache.
+
+        The returned surface is shared, so it must not be drawn on.
+        """
+        key = (font, text, colour)
+        if key in self._surfaces:
+            self.hits += 1
+            self._surfaces.move_to_end(key)
+            return self._surfaces[key]
+
+        self.misses += 1
+        surface = font.render(text, True, colour)
+        self._surfaces[key] = surface
+        if len(self._surfaces) > self.max_size:
+            self._surfaces.popitem(last=False)
+
+        return surface
+
+    def render_parts(self, font: pygame.font.Font, parts: List[str],
+                     colour: Tuple[int, int, int]) -> pygame.Surface:
+        """Returns a new surface with each of the parts placed side by side, where each
+        part is rendered through the cache.
+
+        This is used for labels made of a fixed prefix and a number, so that only the
+        prefix and the glyphs of the digits are ever rendered, instead of the whole
+        label each time the number changes.
+
+        >>> pygame.font.init()
+        >>> font = pygame.font.Font(None, 20)
+        >>> cache = TextCache()
+        >>> label = cache.render_parts(font, ['Amount: ', '1', '0', '1'], (0, 0, 0))
+        >>> label.get_height() == font.get_height()
+        True
+        >>> cache.misses  # the second '1' came from the cache
+        3
+        """
+        surfaces = [self.render(font, part, colour) for part in parts if part != '']
+        width = sum(surface.get_width() for surface in surfaces)
+        height = max([surface.get_height() for surface in surfaces] + [font.get_height()])
+
+        label = pygame.Surface((max(width, 1), height), pygame.SRCALPHA)
+        x = 0
+        for surface in surfaces:
+            # The parts don't overlap, so taking the maximum copies them exactly
+            label.blit(surface, (x, 0), special_flags=pygame.BLEND_RGBA_MAX)
+            x += surface.get_width()
+
+        return label
+
+
+# the cache shared by all the buttons
+TEXT_CACHE = TextCache()
+
+
+if __name__ == '__main__':
+    # import python_ta
+
+    # python_ta.check_all(config={
+    #     'max-line-length': 100,
+    #     'extra-imports': ['python_ta.contracts', 'dataclasses', 'datetime'],
+    #     'disable': ['R1705', 'C0200'],
+    # })
+
+    # import python_ta.contracts
+
+    # python_ta.contracts.DEBUG_CONTRACTS = False
+    # python_ta.contracts.check_all_contracts()
+
+    import doctest
+
+    doctest.testmod()
@@ -0,0 +1,256 @@
+"""
+Report
+
+Module with a function to run the analysis without the pygame interface, and
+write the coefficients, r squared values and predictions of the models to a
+CSV or JSON file.
+
+Example (every region, bird and gas, written to report.csv):
+    python report.py --output report.csv
+
+Example (two regions, forest birds, CO2 and multiple regression, as JSON):
+    python report.py --regions Alberta Quebec --birds 'Forest Birds' \
+        --gases CO2 'Multiple Regression' --amounts 1000 50000 --output report.json
+
+Example (the total and two sectors, Enteric Fermentation and Forest Land):
+    python report.py --categories 0 510 710 --output sectors.csv
+
+Example (the 5 gas series of any region and sector that best explain each bird group):
+    python report.py --rank 5 --output ranking.csv
+"""
+import argparse
+import csv
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from modules.analysis import rank_features
+from modules.data_cache import load_bird_data, load_ghg_store
+from modules.read_data import BIRD_NAMES, GAS_NAMES, Bird, GHGStore, Region, filter_bird_data, \
+    get_year_range
+from modules.regression import ENGINES, MultipleRegression, RegressionModel
+
+# names of the single variable gases, in the order of the gas indexes of Region.adjust_list
+GHG_LABELS = ('CO2', 'CH4', 'N2O', 'HFC', 'PFC', 'SF6', 'NF3', 'Total')
+
+# name of the selection that fits all the gases (except Total) at once
+MULTIPLE_REGRESSION = 'Multiple Regression'
+
+# the datasets used by the current process, loaded by _load_datasets
+_datasets: Optional[Tuple[GHGStore, Dict[int, List[str]]]] = None
+
+
+def build_report(regions: List[str], birds: List[str], gases: List[str], start_year: int,
+                 end_year: int, amounts: List[float], workers: int = 1,
+                 engine: str = 'numpy', categories: Optional[List[int]] = None) -> List[dict]:
+    """ Return a list of rows, one for each combination of region, sector, bird and gas,
+    with the coefficients, r squared value and predictions of the model of that combination.
+
+    The sectors are the CategoryIDs in categories, or only the total (0) if categories
+    is None. Regions are split across <workers> processes. Each region uses the years
+    <start_year> to <end_year>, or a later start if its data begins later.
+
+    Preconditions:
+        - all(bird in BIRD_NAMES for bird in birds)
+        - all(gas in GHG_LABELS or gas == MULTIPLE_REGRESSION for gas in gases)
+        - start_year <= end_year
+        - workers >= 1
+
+    >>> rows = build_report(['Alberta'], ['Forest Birds'], ['CO2', 'Multiple Regression'],
+    ...                     1990, 2016, [1000.0])
+    >>> [(row['region'], row['ghg'], row['start_year']) for row in rows]
+    [('Alberta', 'CO2', 1990), ('Alberta', 'Multiple Regression', 1990)]
+    >>> sorted(rows[0])[:6]
+    ['bird', 'category', 'end_year', 'ghg', 'intercept', 'prediction_at_1000.0']
+    >>> rows = build_report(['Alberta'], ['Forest Birds'], ['CH4'], 1990, 2016, [],
+    ...                     categories=[0, 510])
+    >>> [row['sector'] for row in rows]
+    ['TOTAL', 'Enteric Fermentation']
+    """
+    categories = [0] if categories is None else categories
+    tasks = [(region, birds, gases, start_year, end_year, amounts, engine, categories)
+             for region in regions]
+
+    if workers == 1:
+        _load_datasets()
+        results = [_region_report(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_load_datasets) as executor:
+            results = list(executor.map(_region_report, tasks))
+
+    return [row for region_rows in results for row in region_rows]
+
+
+def build_ranking(top: int, regions: Optional[List[str]], categories: Optional[List[int]],
+                  start_year: int, end_year: int, workers: int = 1) -> List[dict]:
+    """ Return a list of rows with the <top> greenhouse gas series that best explain
+    each bird group (see rank_features), where regions and categories of None mean
+    every region and every sector.
+
+    >>> rows = build_ranking(2, ['Alberta'], [0], 1990, 2016)
+    >>> [(row['bird'], row['rank']) for row in rows[:2]]
+    [('Waterfowl', 1), ('Waterfowl', 2)]
+    """
+    ranking = rank_features(load_ghg_store(), load_bird_data(), top, regions, categories,
+                            start_year, end_year, workers=workers)
+    return [{'bird': bird_name, 'rank': rank, 'region': feature.region,
+             'category': feature.category, 'sector': feature.sector,
+             'ghg': GHG_LABELS[GAS_NAMES.index(feature.gas)],
+             'r_squared': feature.r_squared, 'correlation': feature.correlation,
+             'years': feature.years}
+            for bird_name, features in ranking.items()
+            for rank, feature in enumerate(features, start=1)]
+
+
+def write_report(rows: List[dict], output: str) -> None:
+    """ Write rows to the file at <output> as JSON if it ends in '.json', and as CSV
+    otherwise. An output of '-' writes CSV to standard output.
+    """
+    if output.endswith('.json'):
+        with open(output, 'w') as json_file:
+            json.dump(rows, json_file, indent=2)
+        return
+
+    fieldnames = []
+    for row in rows:
+        fieldnames.extend(name for name in row if name not in fieldnames)
+
+    if output == '-':
+        _write_csv(rows, fieldnames, sys.stdout)
+    else:
+        with open(output, 'w', newline='') as csv_file:
+            _write_csv(rows, fieldnames, csv_file)
+
+
+def _write_csv(rows: List[dict], fieldnames: List[str], file: object) -> None:
+    """Write rows to the open file as CSV with the given columns."""
+    writer = csv.DictWriter(file, fieldnames=fieldnames)
+    writer.writeheader()
+    writer.writerows(rows)
+
+
+def _load_datasets() -> None:
+    """Load the datasets used by _region_report in this process."""
+    global _datasets
+    if _datasets is None:
+        _datasets = (load_ghg_store(), load_bird_data())
+
+
+def _region_report(task: tuple) -> List[dict]:
+    """ Return the report rows of one region, where task is a tuple of the region,
+    birds, gases, start year, end year, prediction amounts, regression engine and
+    sector CategoryIDs.
+    """
+    region_name, birds, gases, start_year, end_year, amounts, engine, categories = task
+    store, _ = _datasets
+
+    rows = []
+    for category in categories:
+        if store.has_series(region_name, category):
+            rows.extend(_sector_report(region_name, category, birds, gases, start_year,
+                                       end_year, amounts, engine))
+
+    return rows
+
+
+def _sector_report(region_name: str, category: int, birds: List[str], gases: List[str],
+                   start_year: int, end_year: int, amounts: List[float],
+                   engine: str) -> List[dict]:
+    """Return the report rows of one region and sector."""
+    store, bird_data = _datasets
+
+    # regions such as Nunavut only have data from 1999
+    years = store.get_years(region_name, category)
+    start_year = max(start_year, int(years[0]))
+    end_year = min(end_year, int(years[-1]))
+
+    region = Region(store, region_name, category)
+    rows = []
+    for bird_name in birds:
+        bird = Bird(filter_bird_data(bird_data, BIRD_NAMES.index(bird_name), start_year,
+                                     end_year))
+
+        for gas in gases:
+            row = {'region': region_name, 'category': category,
+                   'sector': store.category_names[category], 'bird': bird_name, 'ghg': gas,
+                   'start_year': start_year, 'end_year': end_year}
+
+            if gas == MULTIPLE_REGRESSION:
+                region.initialize_lists(start_year, end_year)
+                x_vars = {label: getattr(region, label.lower()) for label in GHG_LABELS[:7]}
+                model = MultipleRegression(x_vars, bird.list_data, engine)
+                row['intercept'] = model.get_intercept()
+                row.update({f'coef_{gas_label}': value
+                            for gas_label, value in model.coef.items()})
+            else:
+                ghg_list = region.adjust_list(start_year, end_year, GHG_LABELS.index(gas))
+                model = RegressionModel(ghg_list, bird.list_data, engine)
+                row['slope'] = model.get_slope()
+                row['intercept'] = model.get_intercept()
+                row.update({f'prediction_at_{amount}': model.predict_y(amount)
+                            for amount in amounts})
+
+            row['r_squared'] = model.get_r_squared()
+            rows.append(row)
+
+    return rows
+
+
+def _parse_arguments(arguments: Optional[List[str]] = None) -> argparse.Namespace:
+    """Return the parsed command line arguments."""
+    parser = argparse.ArgumentParser(description='Fit the regression models without the '
+                                                 'interface and write them to a file.')
+    parser.add_argument('--regions', nargs='+', default=None,
+                        help='regions to fit (default: every region with data up to the '
+                             'end year)')
+    parser.add_argument('--birds', nargs='+', default=list(BIRD_NAMES), choices=BIRD_NAMES)
+    parser.add_argument('--gases', nargs='+', default=list(GHG_LABELS) + [MULTIPLE_REGRESSION],
+                        choices=list(GHG_LABELS) + [MULTIPLE_REGRESSION])
+    parser.add_argument('--categories', nargs='+', type=int, default=None,
+                        help='CategoryIDs of the sectors to fit (default: 0, the total, or '
+                             'every sector with --rank)')
+    parser.add_argument('--start-year', type=int, default=None,
+                        help='first year to fit (default: the first year both datasets have)')
+    parser.add_argument('--end-year', type=int, default=None,
+                        help='last year to fit (default: the last year both datasets have)')
+    parser.add_argument('--amounts', nargs='*', type=float, default=[],
+                        help='amounts of gas (kt) to predict the bird change for')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of processes to split the regions across')
+    parser.add_argument('--engine', default='numpy', choices=ENGINES)
+    parser.add_argument('--rank', type=int, default=None, metavar='K',
+                        help='instead of the models, write the K gas series that best '
+                             'explain each bird group')
+    parser.add_argument('--output', default='-',
+                        help="file to write, as JSON if it ends in '.json' (default: stdout)")
+    return parser.parse_args(arguments)
+
+
+def run(arguments: Optional[List[str]] = None) -> None:
+    """Runs the report from the command line arguments."""
+    args = _parse_arguments(arguments)
+    store = load_ghg_store()
+    first_year, last_year = get_year_range(store, load_bird_data())
+    if args.start_year is None:
+        args.start_year = first_year
+    if args.end_year is None:
+        args.end_year = last_year
+
+    if args.rank is not None:
+        write_report(build_ranking(args.rank, args.regions, args.categories, args.start_year,
+                                   args.end_year, args.workers), args.output)
+        return
+
+    regions = args.regions
+    if regions is None:
+        regions = [region for region in store.region_names
+                   if store.has_series(region) and store.get_years(region)[-1] >= args.end_year]
+
+    rows = build_report(regions, args.birds, args.gases, args.start_year, args.end_year,
+                        args.amounts, args.workers, args.engine, args.categories)
+    write_report(rows, args.output)
+
+
+if __name__ == '__main__':
+    run()